@@ -0,0 +1,103 @@
+"""Session and prompt size for image-heavy sessions, with and without blobs.
+
+    python -m benchmarks.blob_store --images 50 --image-kb 200
+
+An image agent (``ScriptedLlm``) calls an MCP-style tool once per turn;
+the tool returns a distinct base64 image of ``--image-kb`` KB. Without
+offloading every image stays in the session as base64 and is resent in
+every later model request; with ``BlobStore.offload`` as the
+``after_tool_callback`` the events carry only handles.
+"""
+
+import argparse
+import asyncio
+import base64
+import os
+import time
+import tracemalloc
+
+from google.adk.agents import LlmAgent
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from helpers.blobs import BlobStore
+from helpers.events import EventIndex
+from helpers.stub_model import ScriptedLlm, function_call
+
+
+async def run(name: str, images: int, image_kb: int, blobs: BlobStore | None):
+    def get_image(prompt: str) -> dict:
+        """Returns an image for the prompt, shaped like an MCP tool result."""
+        data = base64.b64encode(os.urandom(image_kb * 1024)).decode()
+        return {
+            "content": [{"type": "image", "data": data, "mimeType": "image/png"}],
+            "isError": False,
+        }
+
+    request_bytes = []
+
+    def measure(callback_context, llm_request):
+        request_bytes.append(len(llm_request.model_dump_json()))
+
+    agent = LlmAgent(
+        name="image_agent",
+        model=ScriptedLlm(
+            responses=[function_call("get_image", prompt="a cat"), "Here you go."]
+        ),
+        tools=[get_image],
+        before_model_callback=measure,
+        after_tool_callback=blobs.offload if blobs else None,
+    )
+    runner = InMemoryRunner(agent=agent)
+    session = await runner.session_service.create_session(
+        app_name=runner.app_name, user_id="user"
+    )
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    index = EventIndex()
+    for turn in range(images):
+        message = types.Content(role="user", parts=[types.Part(text=f"image {turn}")])
+        async for event in runner.run_async(
+            user_id="user", session_id=session.id, new_message=message
+        ):
+            index.add(event)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    session = await runner.session_service.get_session(
+        app_name=runner.app_name, user_id="user", session_id=session.id
+    )
+    session_bytes = sum(len(event.model_dump_json()) for event in session.events)
+    # Reading every image back, the way the display loop does
+    decoded = sum(
+        len(blobs.read(item) if blobs else base64.b64decode(item["data"]))
+        for item in index.images
+    )
+    print(
+        f"{name:<12}{session_bytes / 1e6:>12.2f}{request_bytes[-1] / 1e6:>14.2f}"
+        f"{peak / 1e6:>12.1f}{elapsed:>10.2f}{decoded / 1e6:>10.1f}"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, default=50)
+    parser.add_argument("--image-kb", type=int, default=200)
+    args = parser.parse_args()
+
+    print(
+        f"{'':<12}{'session':>12}{'last request':>14}{'peak heap':>12}"
+        f"{'time':>10}{'images':>10}"
+    )
+    print(f"{'':<12}{'(MB)':>12}{'(MB)':>14}{'(MB)':>12}{'(s)':>10}{'(MB)':>10}")
+    await run("base64", args.images, args.image_kb, None)
+    blobs = BlobStore()
+    await run("blob store", args.images, args.image_kb, blobs)
+    print(f"\nblob store: {blobs.stats()}")
+    blobs.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
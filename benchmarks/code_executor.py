@@ -0,0 +1,98 @@
+"""Execution latency of agent-written code: fresh interpreters vs warm workers.
+
+    python -m benchmarks.code_executor --executions 50
+
+Runs the kind of snippet ``calculation_agent`` writes ``--executions``
+times three ways: a fresh ``python -I -c`` per snippet, a ``SandboxPool``
+with no warm workers (every snippet starts and locks down a worker), and
+a ``SandboxPool`` that keeps workers warm. Then checks that hostile
+snippets can't forge a result or affect the next snippet.
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+
+from helpers.bench import percentile
+from helpers.sandbox import SandboxPool
+
+CODE = """
+import statistics
+amount, fee, rate = 1250, 0.01, 83.58
+print(round(amount * (1 - fee) * rate, 2), statistics.mean([amount, rate]))
+"""
+
+
+# A snippet writing a reply to every descriptor it might have inherited
+# from the worker, e.g. the protocol channel
+FORGE = """
+import os
+reply = b'{"stdout": "FORGED 42", "stderr": ""}\\n'
+for fd in range(3, 64):
+    try:
+        os.write(fd, reply)
+    except OSError:
+        pass
+"""
+POISON = "import builtins; builtins.round = lambda *args: 42"
+
+
+def fresh_interpreter(code: str) -> tuple[str, str]:
+    result = subprocess.run(
+        [sys.executable, "-I", "-c", code],
+        capture_output=True,
+        text=True,
+        timeout=10,
+        check=False,
+    )
+    return result.stdout, result.stderr
+
+
+def measure(name: str, execute, executions: int) -> None:
+    latencies = []
+    for _ in range(executions):
+        start = time.perf_counter()
+        stdout, stderr = execute(CODE)
+        latencies.append(time.perf_counter() - start)
+        assert stdout and not stderr, stderr
+    print(
+        f"{name:<20}{percentile(latencies, 50) * 1e3:>10.1f}"
+        f"{percentile(latencies, 95) * 1e3:>10.1f}{max(latencies) * 1e3:>10.1f}"
+    )
+
+
+def check_isolation(pool: SandboxPool) -> None:
+    for _ in range(pool.size + 1):  # reaches every warm worker
+        stdout, stderr = pool.execute(FORGE)
+        assert "FORGED" not in stdout, (stdout, stderr)
+        pool.execute(POISON)
+        stdout, stderr = pool.execute("print(round(2.5))")
+        assert stdout == "2\n" and not stderr, (stdout, stderr)
+    stats = pool.stats()
+    assert not stats["crashes"], stats
+    print("isolation: forged replies and poisoned builtins don't get through")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--executions", type=int, default=50)
+    parser.add_argument("--pool-size", type=int, default=2)
+    args = parser.parse_args()
+
+    print(f"{'':<20}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    measure("fresh interpreter", fresh_interpreter, args.executions)
+
+    cold = SandboxPool(size=0)
+    measure("sandbox, no pool", cold.execute, args.executions)
+
+    warm = SandboxPool(size=args.pool_size)
+    time.sleep(0.5)  # let the pre-forked workers finish starting
+    measure("sandbox, warm pool", warm.execute, args.executions)
+    print(f"\nwarm pool: {warm.stats()}")
+    check_isolation(warm)
+    warm.close()
+
+
+if __name__ == "__main__":
+    main()
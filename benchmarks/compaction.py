@@ -0,0 +1,127 @@
+"""Prompt size and turn latency over a long chat, with and without compaction.
+
+    python -m benchmarks.compaction --turns 500
+
+Drives the day03 ``text_chat_bot`` with a ``ScriptedLlm`` whose latency
+grows with the prompt (``--latency-per-token``), the way prefill does on
+a real model. Without compaction every turn resends the whole history;
+with ``RollingSummarizer`` and ``keep_latest_summary`` the prompt stays
+at one summary plus at most one window of turns, and with
+``SqliteSessionService(compacted_reads=True)`` so does the history the
+runner loads before each turn.
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from google.adk.agents import Agent
+from google.adk.apps.app import App, EventsCompactionConfig
+from google.adk.runners import Runner
+from google.genai import types
+
+from helpers.compaction import RollingSummarizer, keep_latest_summary
+from helpers.sessions import SqliteSessionService
+from helpers.stub_model import ScriptedLlm, request_text
+
+FILLER = "Tell me something new about the history of the city, with a fact or two."
+
+
+def answer(llm_request) -> str:
+    turns = sum(content.role == "user" for content in llm_request.contents)
+    return f"Here is fact number {turns} about the city you asked about. " * 3
+
+
+def summary(llm_request) -> str:
+    """Stub summarizer: keeps the tail of what it was given, capped in size."""
+    return request_text(llm_request)[-600:]
+
+
+async def run(
+    name: str, path: Path, turns: int, interval: int | None, per_token: float
+) -> None:
+    agent = Agent(
+        name="text_chat_bot",
+        model=ScriptedLlm(responses=[answer], latency_per_token=per_token),
+        description="A text chatbot",
+        before_model_callback=keep_latest_summary if interval else None,
+    )
+    config = None
+    if interval:
+        config = EventsCompactionConfig(
+            compaction_interval=interval,
+            overlap_size=1,
+            summarizer=RollingSummarizer(llm=ScriptedLlm(responses=[summary])),
+        )
+    app = App(name="bench", root_agent=agent, events_compaction_config=config)
+    service = SqliteSessionService(path, compacted_reads=bool(interval))
+    runner = Runner(app=app, session_service=service)
+    session = await runner.session_service.create_session(
+        app_name="bench", user_id="user"
+    )
+
+    buckets = max(1, turns // 10)
+    rows = []
+    prompt_tokens, latencies = [], []
+    for turn in range(1, turns + 1):
+        message = types.Content(
+            role="user", parts=[types.Part(text=f"Turn {turn}. {FILLER}")]
+        )
+        start = time.perf_counter()
+        async for event in runner.run_async(
+            user_id="user", session_id=session.id, new_message=message
+        ):
+            if event.usage_metadata:
+                prompt_tokens.append(event.usage_metadata.prompt_token_count)
+        latencies.append(time.perf_counter() - start)
+
+        # Compaction runs as a background task after the turn; let it land
+        # before the next turn so every turn sees the latest summary.
+        pending = asyncio.all_tasks() - {asyncio.current_task()}
+        await asyncio.gather(*pending)
+
+        if turn % buckets == 0 or turn == turns:
+            rows.append(
+                (
+                    turn,
+                    sum(prompt_tokens) / len(prompt_tokens),
+                    sum(latencies) / len(latencies) * 1e3,
+                )
+            )
+            prompt_tokens, latencies = [], []
+
+    print(f"\n{name}")
+    print(f"{'up to turn':>12}{'prompt tokens':>16}{'turn (ms)':>12}")
+    for turn, tokens, latency in rows:
+        print(f"{turn:>12}{tokens:>16.0f}{latency:>12.1f}")
+    await service.close()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=500)
+    parser.add_argument("--interval", type=int, default=10)
+    parser.add_argument("--latency-per-token", type=float, default=2e-6)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        await run(
+            "no compaction",
+            Path(tmp) / "plain.sqlite",
+            args.turns,
+            None,
+            args.latency_per_token,
+        )
+        await run(
+            f"rolling compaction every {args.interval} turns",
+            Path(tmp) / "compacted.sqlite",
+            args.turns,
+            args.interval,
+            args.latency_per_token,
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
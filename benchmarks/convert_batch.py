@@ -0,0 +1,71 @@
+"""Per-transaction tool calls vs one vectorized ``convert_batch`` call.
+
+    python -m benchmarks.convert_batch --transactions 100000
+
+The per-transaction path is what the currency agent does today, minus the
+model: a fee lookup, an exchange rate lookup and the arithmetic for each
+transaction, each as its own Python call. Time spent in the model (one
+round trip per tool call, ~3 per transaction) comes on top of that and
+is what the batch tool really saves.
+"""
+
+import argparse
+import random
+import time
+
+from helpers.currency import convert_batch, rate_store
+
+
+def get_fee_for_payment_method(method: str) -> dict:
+    fee = rate_store.fee(method)
+    if fee is not None:
+        return {"status": "success", "fee_percentage": fee}
+    return {"status": "error", "error_message": f"Payment method '{method}' not found"}
+
+
+def get_exchange_rate(base_currency: str, target_currency: str) -> dict:
+    rate = rate_store.rate(base_currency, target_currency)
+    if rate is not None:
+        return {"status": "success", "rate": rate}
+    return {"status": "error", "error_message": "Unsupported currency pair"}
+
+
+def calculate(amount: float, fee_percentage: float, rate: float) -> dict:
+    return {"result": (amount - amount * fee_percentage) * rate}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transactions", type=int, default=100_000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    amounts = [round(rng.uniform(1, 5000), 2) for _ in range(args.transactions)]
+    bases = ["USD"] * args.transactions
+    targets = rng.choices(["EUR", "JPY", "INR"], k=args.transactions)
+    methods = rng.choices(
+        ["platinum credit card", "gold debit card", "bank transfer"],
+        k=args.transactions,
+    )
+
+    start = time.perf_counter()
+    total = 0.0
+    for amount, base, target, method in zip(amounts, bases, targets, methods):
+        fee = get_fee_for_payment_method(method)
+        rate = get_exchange_rate(base, target)
+        total += calculate(amount, fee["fee_percentage"], rate["rate"])["result"]
+    per_call = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = convert_batch(amounts, bases, targets, methods)
+    batch = time.perf_counter() - start
+    batch_total = sum(pair["converted_amount"] for pair in result["totals"].values())
+
+    print(f"{'':<16}{'tool calls':>12}{'time (ms)':>12}")
+    print(f"{'per transaction':<16}{3 * args.transactions:>12}{per_call * 1e3:>12.1f}")
+    print(f"{'convert_batch':<16}{1:>12}{batch * 1e3:>12.1f}")
+    print(f"\nconverted total matches: {abs(total - batch_total) < 1e-6 * total}")
+
+
+if __name__ == "__main__":
+    main()
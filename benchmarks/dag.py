@@ -0,0 +1,104 @@
+"""Wall time of day01's pipelines as written vs run as a dependency graph.
+
+    python -m benchmarks.dag --runs 20 --latency 0.1
+
+Builds day01's ResearchSystem (three researchers in a ``ParallelAgent``,
+then the aggregator) and BlogPipeline (outline, writer, editor) on
+``ScriptedLlm`` models that take ``--latency`` seconds, one researcher
+``--slow-latency``. Runs each as written and through ``dag_from``, then
+both one after the other in a ``SequentialAgent`` vs one ``DagAgent``.
+Prints the stage timings and the critical path of the last graph run.
+"""
+
+import argparse
+import asyncio
+
+from google.adk.agents import BaseAgent, LlmAgent, ParallelAgent, SequentialAgent
+
+from helpers.bench import benchmark, print_report
+from helpers.dag import DagAgent, dag_from
+from helpers.stub_model import ScriptedLlm
+
+
+def stage(name: str, latency: float, instruction: str, output_key: str) -> LlmAgent:
+    return LlmAgent(
+        name=name,
+        model=ScriptedLlm(responses=[f"{name} output"], latency=latency),
+        instruction=instruction,
+        output_key=output_key,
+    )
+
+
+def research_system(args: argparse.Namespace) -> SequentialAgent:
+    researchers = [
+        stage("TechResearcher", args.slow_latency, "Research tech.", "tech_research"),
+        stage("HealthResearcher", args.latency, "Research health.", "health_research"),
+        stage(
+            "FinanceResearcher", args.latency, "Research finance.", "finance_research"
+        ),
+    ]
+    aggregator = stage(
+        "AggregatorAgent",
+        args.latency,
+        "Combine {tech_research}, {health_research} and {finance_research}.",
+        "executive_summary",
+    )
+    return SequentialAgent(
+        name="ResearchSystem",
+        sub_agents=[
+            ParallelAgent(name="ParallelResearchTeam", sub_agents=researchers),
+            aggregator,
+        ],
+    )
+
+
+def blog_pipeline(args: argparse.Namespace) -> SequentialAgent:
+    return SequentialAgent(
+        name="BlogPipeline",
+        sub_agents=[
+            stage("OutlineAgent", args.latency, "Outline the post.", "blog_outline"),
+            stage("WriterAgent", args.latency, "Follow {blog_outline}.", "blog_draft"),
+            stage("EditorAgent", args.latency, "Edit {blog_draft}.", "final_blog"),
+        ],
+    )
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    pipelines: list[tuple[BaseAgent, BaseAgent]] = [
+        (research_system(args), dag_from(research_system(args), name="ResearchDag")),
+        (blog_pipeline(args), dag_from(blog_pipeline(args), name="BlogDag")),
+        (
+            SequentialAgent(
+                name="DailyContent",
+                sub_agents=[research_system(args), blog_pipeline(args)],
+            ),
+            dag_from(research_system(args), blog_pipeline(args), name="DailyDag"),
+        ),
+    ]
+    results = []
+    for pipeline in pipelines:
+        for agent in pipeline:
+            results.append(
+                await benchmark(agent, "Run the daily content.", args.runs, 1)
+            )
+    print_report(results)
+
+    dag: DagAgent = pipelines[-1][1]
+    print(f"\n{dag.name} dependencies: {dag.dependencies()}")
+    print(f"{'stage':<24}{'start ms':>10}{'end ms':>10}")
+    for timing in dag.timings():
+        print(f"{timing.name:<24}{timing.start_ms:>10.1f}{timing.end_ms:>10.1f}")
+    print(f"critical path: {' -> '.join(dag.critical_path())}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--slow-latency", type=float, default=0.3)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
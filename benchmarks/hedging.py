@@ -0,0 +1,94 @@
+"""Tail latency of the research fan-out, with and without hedged model calls.
+
+    python -m benchmarks.hedging --runs 200 --straggler-rate 0.03
+
+Builds day01's ResearchSystem (three researchers in a ``ParallelAgent``,
+then the aggregator) on ``ScriptedLlm`` models that take ``--latency``
+seconds, except for ``--straggler-rate`` of the calls which take
+``--straggler-latency``. Runs it ``--runs`` times as is and with every
+researcher hedged by ``hedged_all``, as in day01. The first ``--warmup``
+runs fill the shared hedging latency window and are left out.
+"""
+
+import argparse
+import asyncio
+import random
+
+from google.adk.agents import LlmAgent, ParallelAgent, SequentialAgent
+
+from helpers.bench import benchmark, print_report
+from helpers.hedging import hedged_all
+from helpers.stub_model import ScriptedLlm
+
+RESEARCHERS = {
+    "TechResearcher": "tech_research",
+    "HealthResearcher": "health_research",
+    "FinanceResearcher": "finance_research",
+}
+
+
+def research_system(args: argparse.Namespace, hedge: bool) -> SequentialAgent:
+    researchers = []
+    for name, output_key in RESEARCHERS.items():
+        researcher = LlmAgent(
+            name=name,
+            model=ScriptedLlm(
+                responses=[f"{name} report"],
+                latency=args.latency,
+                straggler_rate=args.straggler_rate,
+                straggler_latency=args.straggler_latency,
+            ),
+            instruction=f"Research {name} topics.",
+            output_key=output_key,
+        )
+        researchers.append(researcher)
+    if hedge:
+        researchers = hedged_all(researchers, max_extra=args.max_extra)
+    aggregator = LlmAgent(
+        name="AggregatorAgent",
+        model=ScriptedLlm(responses=["Executive summary"], latency=args.latency),
+        instruction="Combine {tech_research}, {health_research} and {finance_research}.",
+        output_key="executive_summary",
+    )
+    return SequentialAgent(
+        name="ResearchSystem" + ("Hedged" if hedge else ""),
+        sub_agents=[
+            ParallelAgent(name="ParallelResearchTeam", sub_agents=researchers),
+            aggregator,
+        ],
+    )
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    results = []
+    for hedge in (False, True):
+        random.seed(args.seed)
+        agent = research_system(args, hedge)
+        results.append(
+            await benchmark(
+                agent, "Run the daily executive briefing.", args.runs, args.warmup
+            )
+        )
+        if hedge:
+            researchers = agent.sub_agents[0].sub_agents
+            print_report(results)
+            print()
+            for researcher in researchers:
+                print(f"{researcher.name:<20}{researcher.model.stats()}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--straggler-rate", type=float, default=0.03)
+    parser.add_argument("--straggler-latency", type=float, default=1.0)
+    parser.add_argument("--max-extra", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Bulk image generation throughput against the concurrency cap.
+
+    python -m benchmarks.image_batch --images 50 --image-latency 0.2
+
+Calls ``getTinyImage`` on the local MCP stand-in through one pooled
+session, ``--images`` times per run, with a growing cap. Each call takes
+``--image-latency`` seconds and ``--failure-rate`` of them fail and are
+retried.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from google.adk.tools.mcp_tool.mcp_session_manager import StdioConnectionParams
+from mcp import StdioServerParameters
+
+from helpers.blobs import BlobStore
+from helpers.image_batch import generate_images
+from helpers.mcp_pool import McpPool
+
+
+async def main(errlog) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, default=50)
+    parser.add_argument("--image-latency", type=float, default=0.2)
+    parser.add_argument("--failure-rate", type=float, default=0.1)
+    parser.add_argument("--caps", type=int, nargs="+", default=[1, 4, 16, 64])
+    args = parser.parse_args()
+
+    params = StdioConnectionParams(
+        server_params=StdioServerParameters(
+            command=sys.executable,
+            args=[
+                "-m",
+                "helpers.stub_mcp_server",
+                "--image-latency",
+                str(args.image_latency),
+                "--failure-rate",
+                str(args.failure_rate),
+            ],
+        ),
+        timeout=30,
+    )
+    pool = McpPool(errlog=errlog)
+    blobs = BlobStore()
+    await pool.warm(params)
+
+    print(f"{'cap':>6}{'time (s)':>10}{'images/s':>10}{'generated':>11}{'failed':>8}")
+    for cap in args.caps:
+        start = time.perf_counter()
+        result = await generate_images(
+            lambda: pool.session(params),
+            args.images,
+            blobs,
+            concurrency=cap,
+            retries=2,
+        )
+        elapsed = time.perf_counter() - start
+        print(
+            f"{cap:>6}{elapsed:>10.2f}{result['generated'] / elapsed:>10.1f}"
+            f"{result['generated']:>11}{len(result['failed']):>8}"
+        )
+
+    print(f"\nblob store: {blobs.stats()}")
+    blobs.close()
+    await pool.close()
+
+
+if __name__ == "__main__":
+    # Keep the server's request logging out of the table
+    with open(os.devnull, "w") as devnull:
+        asyncio.run(main(devnull))
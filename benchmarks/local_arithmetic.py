@@ -0,0 +1,90 @@
+"""Currency conversion latency: calculation_agent vs the local calculate tool.
+
+    python -m benchmarks.local_arithmetic --latency 0.5 --runs 5
+
+Both pipelines are the enhanced currency agent on ``ScriptedLlm``: one
+model turn fetches the fee and the rate (two parallel function calls),
+one does the arithmetic, one answers. Delegating the arithmetic to
+``calculation_agent`` adds that agent's own model call, which on Gemini
+also runs the generated code (``--exec-latency``); ``calculate`` runs
+in-process.
+"""
+
+import argparse
+import asyncio
+
+from google.adk.agents import LlmAgent
+from google.adk.tools import AgentTool
+
+from helpers.arithmetic import calculate
+from helpers.bench import benchmark, print_report
+from helpers.currency import rate_store
+from helpers.stub_model import ScriptedLlm, function_call
+
+QUERY = "Convert 1,250 USD to INR using a Bank Transfer."
+EXPRESSION = "1250 * (1 - 0.01) * 83.58"
+
+
+def get_fee_for_payment_method(method: str) -> dict:
+    return {"status": "success", "fee_percentage": rate_store.fee(method)}
+
+
+def get_exchange_rate(base_currency: str, target_currency: str) -> dict:
+    return {
+        "status": "success",
+        "rate": rate_store.rate(base_currency, target_currency),
+    }
+
+
+def currency_agent(arithmetic, latency: float) -> LlmAgent:
+    lookups = [
+        function_call("get_fee_for_payment_method", method="bank transfer"),
+        function_call("get_exchange_rate", base_currency="USD", target_currency="INR"),
+    ]
+    if isinstance(arithmetic, AgentTool):
+        calculation = function_call(arithmetic.name, request=EXPRESSION)
+    else:
+        calculation = function_call("calculate", expression=EXPRESSION)
+    return LlmAgent(
+        name="enhanced_currency_agent",
+        model=ScriptedLlm(
+            responses=[lookups, calculation, "You will receive 103,430.25 INR."],
+            latency=latency,
+        ),
+        tools=[get_fee_for_payment_method, get_exchange_rate, arithmetic],
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--exec-latency", type=float, default=0.5)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    calculation_agent = LlmAgent(
+        name="CalculationAgent",
+        model=ScriptedLlm(
+            responses=[f"```python\nprint({EXPRESSION})\n```\n103430.25"],
+            latency=args.latency + args.exec_latency,
+        ),
+    )
+    results = [
+        await benchmark(
+            currency_agent(AgentTool(agent=calculation_agent), args.latency),
+            QUERY,
+            runs=args.runs,
+            name="calculation_agent",
+        ),
+        await benchmark(
+            currency_agent(calculate, args.latency),
+            QUERY,
+            runs=args.runs,
+            name="calculate",
+        ),
+    ]
+    print_report(results)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,119 @@
+"""Model calls of the story refinement loop: exit_loop tool vs state predicates.
+
+    python -m benchmarks.loop_exit --runs 20
+
+Builds day01's StoryPipeline (initial writer, then a ``LoopAgent`` of
+critic and refiner with ``max_iterations=5``) on ``ScriptedLlm`` models
+and counts the model calls per run in three scenarios: the critic
+approves the second draft, the drafts stop changing after the third
+one, or neither. Once the way day01 ends the loop, with the refiner
+calling an ``exit_loop`` tool that escalates, and once with
+``stop_loop_when(approved(...), converged(...))`` on both agents.
+"""
+
+import argparse
+import asyncio
+import re
+
+from google.adk.agents import Agent, LoopAgent, SequentialAgent
+from google.adk.tools import ToolContext
+
+from helpers.bench import benchmark
+from helpers.loop_control import approved, converged, stop_loop_when
+from helpers.stub_model import ScriptedLlm, function_call, request_text
+
+
+def story(version: int) -> str:
+    words = " ".join(f"w{(i * version) % 97}" for i in range(100))
+    return f"Draft v{version}: {words}"
+
+
+def draft_version(llm_request) -> int:
+    match = re.search(r"Draft v(\d+)", request_text(llm_request))
+    return int(match.group(1)) if match else 1
+
+
+def exit_loop(tool_context: ToolContext) -> dict:
+    """Call this function ONLY when the critique is 'APPROVED'."""
+    tool_context.actions.escalate = True
+    return {"status": "approved"}
+
+
+def story_pipeline(
+    approve_at: int | None, converge_at: int | None, predicates: bool
+) -> tuple[SequentialAgent, list[ScriptedLlm]]:
+    def critique(llm_request) -> str:
+        if approve_at and draft_version(llm_request) >= approve_at:
+            return "APPROVED"
+        return "Tighten the middle and sharpen the ending."
+
+    def refine(llm_request):
+        if "Critique: APPROVED" in request_text(llm_request):
+            return function_call("exit_loop")
+        version = draft_version(llm_request)
+        if converge_at and version >= converge_at:
+            return story(version)
+        return story(version + 1)
+
+    models = [
+        ScriptedLlm(responses=[story(1)]),
+        ScriptedLlm(responses=[critique]),
+        ScriptedLlm(responses=[refine, "Story approved."]),
+    ]
+    stop = (
+        stop_loop_when(approved("critique"), converged("current_story"))
+        if predicates
+        else None
+    )
+    writer = Agent(
+        name="InitialWriterAgent",
+        model=models[0],
+        instruction="Write the first draft.",
+        output_key="current_story",
+    )
+    critic = Agent(
+        name="CriticAgent",
+        model=models[1],
+        instruction="Story: {current_story}",
+        output_key="critique",
+        after_agent_callback=stop,
+    )
+    refiner = Agent(
+        name="RefinerAgent",
+        model=models[2],
+        instruction="Story Draft: {current_story}\nCritique: {critique}",
+        output_key="current_story",
+        tools=[] if predicates else [exit_loop],
+        after_agent_callback=stop,
+    )
+    loop = LoopAgent(
+        name="StoryRefinementLoop", sub_agents=[critic, refiner], max_iterations=5
+    )
+    return SequentialAgent(name="StoryPipeline", sub_agents=[writer, loop]), models
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    scenarios = {
+        "approved at v2": (2, None),
+        "converged at v3": (None, 3),
+        "neither": (None, None),
+    }
+    print(f"{'scenario':<20}{'exit_loop calls':>18}{'predicate calls':>18}")
+    for name, (approve_at, converge_at) in scenarios.items():
+        calls = []
+        for predicates in (False, True):
+            agent, models = story_pipeline(approve_at, converge_at, predicates)
+            await benchmark(agent, "Write a story.", runs=args.runs, warmup=0)
+            calls.append(sum(model.calls for model in models) / args.runs)
+        print(f"{name:<20}{calls[0]:>18.1f}{calls[1]:>18.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
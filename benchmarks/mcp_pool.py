@@ -0,0 +1,110 @@
+"""Image agent startup: fresh MCP server per runner vs warm pool vs catalog.
+
+    python -m benchmarks.mcp_pool --runners 10 --startup-delay 2
+
+Each round builds a new toolset and ``InMemoryRunner`` the way the day02
+cells do, and times the first tool discovery (what happens before the
+image agent's first model call). The server is the local stand-in from
+``helpers.stub_mcp_server``; ``--startup-delay`` mimics npx/Node startup.
+With the tool catalog, discovery is served from memory and no
+``tools/list`` round trip is made at all.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from google.adk.agents import LlmAgent
+from google.adk.runners import InMemoryRunner
+from google.adk.tools.mcp_tool.mcp_session_manager import StdioConnectionParams
+from google.adk.tools.mcp_tool.mcp_toolset import McpToolset
+from mcp import StdioServerParameters
+
+from helpers.bench import percentile
+from helpers.mcp_catalog import ToolCatalog
+from helpers.mcp_pool import McpPool, PooledMcpToolset
+from helpers.stub_model import ScriptedLlm
+
+
+async def run(name: str, make_toolset, runners: int) -> None:
+    times = []
+    for _ in range(runners):
+        toolset = make_toolset()
+        agent = LlmAgent(name="image_agent", model=ScriptedLlm(), tools=[toolset])
+        runner = InMemoryRunner(agent=agent)
+        start = time.perf_counter()
+        tools = await toolset.get_tools()
+        times.append(time.perf_counter() - start)
+        assert [tool.name for tool in tools] == ["getTinyImage"]
+        # Close from this task: the stdio client can't be closed from the
+        # helper task runner.close() uses. Pooled toolsets make it a no-op.
+        await toolset.close()
+        del runner
+
+    print(
+        f"{name:<16}{times[0] * 1e3:>12.1f}"
+        f"{percentile(times[1:] or times, 50) * 1e3:>12.1f}"
+        f"{sum(times):>12.2f}"
+    )
+
+
+async def main(errlog) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runners", type=int, default=10)
+    parser.add_argument("--startup-delay", type=float, default=2.0)
+    args = parser.parse_args()
+
+    params = StdioConnectionParams(
+        server_params=StdioServerParameters(
+            command=sys.executable,
+            args=[
+                "-m",
+                "helpers.stub_mcp_server",
+                "--startup-delay",
+                str(args.startup_delay),
+            ],
+        ),
+        timeout=30 + args.startup_delay,
+    )
+    pool = McpPool(errlog=errlog)
+    catalog = ToolCatalog(path=None)
+
+    print(f"{'toolset':<16}{'first':>12}{'next p50':>12}{'total':>12}")
+    print(f"{'':<16}{'(ms)':>12}{'(ms)':>12}{'(s)':>12}")
+    await run(
+        "McpToolset",
+        lambda: McpToolset(
+            connection_params=params, tool_filter=["getTinyImage"], errlog=errlog
+        ),
+        args.runners,
+    )
+    await run(
+        "pooled",
+        lambda: PooledMcpToolset(
+            connection_params=params,
+            tool_filter=["getTinyImage"],
+            pool=pool,
+            catalog=None,
+        ),
+        args.runners,
+    )
+    await run(
+        "pooled+catalog",
+        lambda: PooledMcpToolset(
+            connection_params=params,
+            tool_filter=["getTinyImage"],
+            pool=pool,
+            catalog=catalog,
+        ),
+        args.runners,
+    )
+    print(f"\npool: {pool.stats()}, catalog: {catalog.stats()}")
+    await pool.close()
+
+
+if __name__ == "__main__":
+    # Keep the servers' request logging out of the table
+    with open(os.devnull, "w") as devnull:
+        asyncio.run(main(devnull))
@@ -0,0 +1,126 @@
+"""TLS handshakes and first-call latency: a Gemini per agent vs shared clients.
+
+    python -m benchmarks.model_pool --agents 15 --team 3 --calls 3
+
+Serves ``helpers.fake_gemini.FakeGemini`` over TLS (self-signed, trusted
+through ``SSL_CERT_FILE``) and runs ``--agents`` agents against it the
+way day01 does: in teams of ``--team`` that call the model concurrently,
+like the ParallelResearchTeam's researchers, one team after another. Each
+agent makes ``--calls`` calls in a row. Once with its own ``Gemini``,
+once with ``ModelRegistry.gemini``. The server counts connections, i.e.
+TLS handshakes, and delays each new one by ``--connect-delay`` as two
+round trips of a 25 ms network would.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from google.adk.models.google_llm import Gemini
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+
+from helpers.bench import percentile
+from helpers.fake_gemini import FakeGemini, self_signed_cert
+from helpers.model_registry import ModelRegistry
+
+MODEL = "gemini-2.5-flash-lite"
+
+
+def request(agent: int, call: int) -> LlmRequest:
+    text = f"Agent {agent}, question {call}: what is the capital of France?"
+    return LlmRequest(
+        model=MODEL,
+        contents=[types.Content(role="user", parts=[types.Part(text=text)])],
+    )
+
+
+async def run_agents(models: list, team: int, calls: int) -> tuple[list, list]:
+    first, later = [], []
+
+    async def agent(index: int, model) -> None:
+        for call in range(calls):
+            start = time.perf_counter()
+            async for _ in model.generate_content_async(request(index, call)):
+                pass
+            (later if call else first).append(time.perf_counter() - start)
+
+    for start in range(0, len(models), team):
+        members = range(start, min(start + team, len(models)))
+        await asyncio.gather(*(agent(i, models[i]) for i in members))
+    return first, later
+
+
+async def measure(
+    name: str, server: FakeGemini, models: list, team: int, calls: int
+) -> None:
+    server.reset()
+    start = time.perf_counter()
+    first, later = await run_agents(models, team, calls)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:<20}{server.stats()['connections']:>12}"
+        f"{percentile(first, 50) * 1e3:>12.1f}{percentile(later, 50) * 1e3:>12.1f}"
+        f"{elapsed:>10.2f}"
+    )
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    retry_config = types.HttpRetryOptions(attempts=1)
+    with tempfile.TemporaryDirectory() as directory:
+        certfile, keyfile = self_signed_cert(directory)
+        with FakeGemini(
+            capacity_per_sec=1000,
+            latency=args.latency,
+            certfile=certfile,
+            keyfile=keyfile,
+            connect_delay=args.connect_delay,
+        ) as server:
+            # Read when each model creates its client
+            os.environ["GOOGLE_GEMINI_BASE_URL"] = server.url
+            os.environ["GOOGLE_API_KEY"] = "fake-key"
+            os.environ["SSL_CERT_FILE"] = str(certfile)
+
+            print(
+                f"{'':<20}{'handshakes':>12}{'first ms':>12}{'later ms':>12}"
+                f"{'wall s':>10}"
+            )
+            separate = [
+                Gemini(model=MODEL, retry_options=retry_config)
+                for _ in range(args.agents)
+            ]
+            await measure("Gemini per agent", server, separate, args.team, args.calls)
+
+            registry = ModelRegistry(max_connections=args.max_connections)
+            shared = [
+                registry.gemini(MODEL, retry_options=retry_config)
+                for _ in range(args.agents)
+            ]
+            await measure("shared registry", server, shared, args.team, args.calls)
+            print(f"\nregistry: {registry.stats()}")
+            await registry.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agents", type=int, default=15)
+    parser.add_argument("--team", type=int, default=3)
+    parser.add_argument("--calls", type=int, default=3)
+    parser.add_argument("--max-connections", type=int, default=10)
+    parser.add_argument(
+        "--latency", type=float, default=0.02, help="seconds the endpoint takes"
+    )
+    parser.add_argument(
+        "--connect-delay",
+        type=float,
+        default=0.05,
+        help="seconds a new connection costs (TCP + TLS round trips)",
+    )
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
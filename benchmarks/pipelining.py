@@ -0,0 +1,119 @@
+"""Wall time of the blog pipeline, stage after stage vs section by section.
+
+    python -m benchmarks.pipelining --runs 5 --sections 5
+
+Builds day01's BlogPipeline (outline, writer, editor) on streaming
+``ScriptedLlm`` models: each call takes ``--latency`` seconds to its
+first chunk and ``--chunk-latency`` per further chunk of four words. The
+outline has ``--sections`` sections; the writer and the editor write
+``--words`` words for every section they are given. Runs the turn with
+``stream_turn`` as a ``SequentialAgent`` and as ``pipelined``, checks
+both write a final blog of the same length and prints the wall time and
+the time to the first streamed token.
+"""
+
+import argparse
+import asyncio
+import re
+
+from google.adk.agents import BaseAgent, LlmAgent, SequentialAgent
+from google.adk.runners import InMemoryRunner
+
+from helpers.bench import percentile
+from helpers.pipelining import pipelined
+from helpers.streaming import stream_turn
+from helpers.stub_model import ScriptedLlm
+
+
+def sections_of(llm_request) -> list[str]:
+    instruction = llm_request.config.system_instruction or ""
+    return list(dict.fromkeys(re.findall(r"## Section \d+", instruction)))
+
+
+def write(name: str, words: int):
+    def respond(llm_request) -> str:
+        body = " ".join(f"{name.lower()}{i}" for i in range(words))
+        return "\n".join(f"{heading}\n{body}" for heading in sections_of(llm_request))
+
+    return respond
+
+
+def blog_pipeline(args: argparse.Namespace) -> SequentialAgent:
+    def model(response) -> ScriptedLlm:
+        return ScriptedLlm(
+            responses=[response],
+            latency=args.latency,
+            chunk_latency=args.chunk_latency,
+        )
+
+    outline = "\n".join(
+        f"## Section {i}\n" + " ".join(f"point{j}" for j in range(args.outline_words))
+        for i in range(1, args.sections + 1)
+    )
+    return SequentialAgent(
+        name="BlogPipeline",
+        sub_agents=[
+            LlmAgent(
+                name="OutlineAgent",
+                model=model(outline),
+                instruction="Create a blog outline.",
+                output_key="blog_outline",
+            ),
+            LlmAgent(
+                name="WriterAgent",
+                model=model(write("Draft", args.words)),
+                instruction="Following this outline strictly: {blog_outline}",
+                output_key="blog_draft",
+            ),
+            LlmAgent(
+                name="EditorAgent",
+                model=model(write("Edited", args.words)),
+                instruction="Edit this draft: {blog_draft}",
+                output_key="final_blog",
+            ),
+        ],
+    )
+
+
+async def measure(agent: BaseAgent, runs: int) -> None:
+    runner = InMemoryRunner(agent=agent, app_name="bench")
+    walls, first_tokens = [], []
+    for _ in range(runs):
+        session = await runner.session_service.create_session(
+            app_name="bench", user_id="bench_user"
+        )
+        stream = stream_turn(runner, "bench_user", session.id, "Write a blog post.")
+        async for _ in stream:
+            pass
+        walls.append(stream.elapsed)
+        first_tokens.append(stream.time_to_first_token)
+    session = await runner.session_service.get_session(
+        app_name="bench", user_id="bench_user", session_id=session.id
+    )
+    words = len(session.state["final_blog"].split())
+    print(
+        f"{agent.name:<24}{percentile(walls, 50) * 1e3:>10.0f}"
+        f"{percentile(first_tokens, 50) * 1e3:>12.0f}{words:>8}"
+    )
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    print(f"{'pipeline':<24}{'p50 ms':>10}{'ttft ms':>12}{'words':>8}")
+    await measure(blog_pipeline(args), args.runs)
+    await measure(pipelined(blog_pipeline(args)), args.runs)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--sections", type=int, default=5)
+    parser.add_argument("--outline-words", type=int, default=20)
+    parser.add_argument("--words", type=int, default=60)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--chunk-latency", type=float, default=0.02)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Many agents against a throttling endpoint: per-model retries vs a shared limiter.
+
+    python -m benchmarks.rate_limit --agents 30 --calls 5
+
+Starts ``helpers.fake_gemini.FakeGemini`` with a fixed capacity and points
+the real ``Gemini`` model at it. ``--agents`` concurrent agents each make
+``--calls`` model calls in a row, two ways:
+
+- every agent has its own ``Gemini`` with the notebooks' old retry options
+  (5 attempts, ``exp_base=7``);
+- every agent wraps a single-attempt ``Gemini`` in ``LimitedLlm`` on one
+  shared ``ModelLimiter``, configured at twice the endpoint's capacity as
+  a quota guess would be.
+
+All delays are multiplied by ``--time-scale`` (and rates divided by it) so
+the comparison takes about a minute; the ratios are what matter.
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from google.adk.models.google_llm import Gemini
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+
+from helpers.fake_gemini import FakeGemini
+from helpers.ratelimit import LimitedLlm, ModelLimiter
+
+MODEL = "gemini-2.5-flash-lite"
+
+
+def request(agent: int, call: int) -> LlmRequest:
+    text = f"Agent {agent}, question {call}: what is the capital of France?"
+    return LlmRequest(
+        model=MODEL,
+        contents=[types.Content(role="user", parts=[types.Part(text=text)])],
+    )
+
+
+async def run_agents(models: list, calls: int) -> tuple[int, int]:
+    async def agent(index: int, model) -> tuple[int, int]:
+        ok = failed = 0
+        for call in range(calls):
+            try:
+                async for _ in model.generate_content_async(request(index, call)):
+                    pass
+                ok += 1
+            except Exception:  # counted per agent below
+                failed += 1
+        return ok, failed
+
+    results = await asyncio.gather(*(agent(i, m) for i, m in enumerate(models)))
+    return sum(ok for ok, _ in results), sum(failed for _, failed in results)
+
+
+async def measure(name: str, server: FakeGemini, models: list, calls: int) -> None:
+    server.reset()
+    start = time.perf_counter()
+    ok, failed = await run_agents(models, calls)
+    elapsed = time.perf_counter() - start
+    stats = server.stats()
+    print(
+        f"{name:<22}{elapsed:>8.1f}{ok:>6}{failed:>8}{stats['requests']:>10}"
+        f"{stats['throttled']:>7}{stats['requests'] / (ok + failed):>10.2f}"
+    )
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    scale = args.time_scale
+    with FakeGemini(
+        capacity_per_sec=args.capacity / scale,
+        error_rate=args.error_rate,
+        latency=0.5 * scale,
+        retry_delay=1.0 * scale,
+    ) as server:
+        # Read when each model creates its client
+        os.environ["GOOGLE_GEMINI_BASE_URL"] = server.url
+        os.environ["GOOGLE_API_KEY"] = "fake-key"
+
+        print(
+            f"{'':<22}{'wall s':>8}{'ok':>6}{'failed':>8}{'requests':>10}"
+            f"{'429s':>7}{'per call':>10}"
+        )
+        retry_config = types.HttpRetryOptions(
+            attempts=5,
+            exp_base=7,
+            initial_delay=1 * scale,
+            max_delay=60 * scale,
+            http_status_codes=[429, 500, 503, 504],
+        )
+        independent = [
+            Gemini(model=MODEL, retry_options=retry_config) for _ in range(args.agents)
+        ]
+        await measure("per-model retries", server, independent, args.calls)
+
+        limiter = ModelLimiter(
+            requests_per_min=2 * args.capacity * 60 / scale,
+            base_delay=1.0 * scale,
+            max_delay=30 * scale,
+            reset_timeout=20 * scale,
+        )
+        single_attempt = types.HttpRetryOptions(attempts=1)
+        shared = [
+            LimitedLlm(
+                llm=Gemini(model=MODEL, retry_options=single_attempt), limiter=limiter
+            )
+            for _ in range(args.agents)
+        ]
+        await measure("shared limiter", server, shared, args.calls)
+        print(f"\nlimiter: {limiter.stats()}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agents", type=int, default=30)
+    parser.add_argument("--calls", type=int, default=5)
+    parser.add_argument(
+        "--capacity", type=float, default=5, help="requests/s the endpoint serves"
+    )
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--time-scale", type=float, default=0.5)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Lookup cost of ``RateStore`` vs rebuilding the tables on every call.
+
+    python -m benchmarks.rate_store --currencies 200 --cross-pairs 3000 --methods 300
+
+Writes production-sized tables (rates against USD for ``--currencies``
+currencies, ``--cross-pairs`` directly listed crosses, ``--methods``
+payment methods) to a temp dir, loads them into a ``RateStore`` and times
+single lookups with ``timeit``. The baseline is the original day02 tools,
+which build their three-entry dicts on every call; at production size
+they would rebuild thousands of entries.
+"""
+
+import argparse
+import csv
+import random
+import tempfile
+import time
+import timeit
+from pathlib import Path
+
+from helpers.currency import RateStore
+
+
+def get_fee_for_payment_method(method: str) -> float | None:
+    """The original day02 lookup: the table is rebuilt per call."""
+    fee_database = {
+        "platinum credit card": 0.02,
+        "gold debit card": 0.035,
+        "bank transfer": 0.01,
+    }
+    return fee_database.get(method.lower())
+
+
+def get_exchange_rate(base_currency: str, target_currency: str) -> float | None:
+    """The original day02 lookup: the table is rebuilt per call."""
+    rate_database = {
+        "usd": {
+            "eur": 0.93,
+            "jpy": 157.50,
+            "inr": 83.58,
+        }
+    }
+    return rate_database.get(base_currency.lower(), {}).get(target_currency.lower())
+
+
+def write_tables(
+    directory: Path, currencies: int, cross_pairs: int, methods: int
+) -> tuple[Path, Path, list[str]]:
+    rng = random.Random(0)
+    codes = [f"C{i:03d}" for i in range(currencies)]
+    rates_path = directory / "rates.csv"
+    with rates_path.open("w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["base", "target", "rate"])
+        for code in codes:
+            writer.writerow(["USD", code, round(rng.uniform(0.01, 500), 6)])
+        for _ in range(cross_pairs):
+            base, target = rng.sample(codes, 2)
+            writer.writerow([base, target, round(rng.uniform(0.01, 500), 6)])
+
+    fees_path = directory / "fees.csv"
+    with fees_path.open("w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["method", "fee_percentage"])
+        for i in range(methods):
+            writer.writerow([f"method {i}", round(rng.uniform(0, 0.05), 4)])
+    return rates_path, fees_path, codes
+
+
+def per_call_ns(statement, number: int) -> float:
+    return min(timeit.repeat(statement, number=number, repeat=5)) / number * 1e9
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--currencies", type=int, default=200)
+    parser.add_argument("--cross-pairs", type=int, default=3000)
+    parser.add_argument("--methods", type=int, default=300)
+    parser.add_argument("--number", type=int, default=200_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        rates_path, fees_path, codes = write_tables(
+            Path(tmp), args.currencies, args.cross_pairs, args.methods
+        )
+        start = time.perf_counter()
+        store = RateStore(rates_path, fees_path)
+        load = time.perf_counter() - start
+        print(f"loaded {store.stats()} in {load * 1e3:.1f} ms\n")
+
+        a, b = codes[1], codes[2]
+        rows = [
+            (
+                "day02 fee (rebuilds table)",
+                lambda: get_fee_for_payment_method("Bank Transfer"),
+            ),
+            ("day02 rate (rebuilds table)", lambda: get_exchange_rate("USD", "EUR")),
+            ("store fee", lambda: store.fee("Method 42")),
+            ("store rate, pivot pair", lambda: store.rate("USD", a)),
+            ("store rate, triangulated", lambda: store.rate(a, b)),
+        ]
+        print(f"{'lookup':<30}{'ns/call':>10}")
+        for name, statement in rows:
+            print(f"{name:<30}{per_call_ns(statement, args.number):>10.0f}")
+
+        # Hot reload: rewrite the rates file and wait for the next check
+        lines = rates_path.read_text().splitlines()
+        lines = [
+            f"USD,{a},1.0" if line.startswith(f"USD,{a},") else line for line in lines
+        ]
+        rates_path.write_text("\n".join(lines) + "\n")
+        start = time.perf_counter()
+        while store.stats()["reloads"] == 0 and time.perf_counter() - start < 5:
+            time.sleep(0.01)
+        print(
+            f"\nreloaded {time.perf_counter() - start:.2f} s after the file "
+            f"changed: USD/{a} is now {store.rate('USD', a)}"
+        )
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Append/get latency of the session services at 10k+ events per session.
+
+    python -m benchmarks.session_store --events 10000
+
+Events are appended the way the runner does it: a few tool events per
+turn followed by a final text response, so ``SqliteSessionService``
+writes one batch per turn.
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from google.adk.events import Event, EventActions
+from google.adk.sessions import BaseSessionService, InMemorySessionService
+from google.genai import types
+
+from helpers.bench import percentile
+from helpers.sessions import SqliteSessionService
+
+
+def make_turn(turn: int, events_per_turn: int) -> list[Event]:
+    """Tool-call events followed by a final text response."""
+    events = [
+        Event(
+            author="text_chat_bot",
+            invocation_id=f"inv-{turn}",
+            content=types.Content(
+                role="model",
+                parts=[
+                    types.Part.from_function_call(
+                        name="lookup", args={"turn": turn, "step": step}
+                    )
+                ],
+            ),
+        )
+        for step in range(events_per_turn - 1)
+    ]
+    events.append(
+        Event(
+            author="text_chat_bot",
+            invocation_id=f"inv-{turn}",
+            content=types.Content(
+                role="model", parts=[types.Part(text=f"Answer for turn {turn}.")]
+            ),
+            actions=EventActions(state_delta={"last_turn": turn}),
+        )
+    )
+    return events
+
+
+async def run(
+    name: str, service: BaseSessionService, num_events: int, events_per_turn: int
+) -> None:
+    session = await service.create_session(app_name="bench", user_id="user")
+    append_times = []
+    for turn in range(num_events // events_per_turn):
+        for event in make_turn(turn, events_per_turn):
+            start = time.perf_counter()
+            await service.append_event(session, event)
+            append_times.append(time.perf_counter() - start)
+
+    get_times = []
+    for _ in range(5):
+        start = time.perf_counter()
+        loaded = await service.get_session(
+            app_name="bench", user_id="user", session_id=session.id
+        )
+        get_times.append(time.perf_counter() - start)
+
+    print(
+        f"{name:<24}{len(loaded.events):>8}"
+        f"{percentile(append_times, 50) * 1e6:>12.1f}"
+        f"{percentile(append_times, 99) * 1e6:>12.1f}"
+        f"{percentile(get_times, 50) * 1e3:>12.1f}"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=10_000)
+    parser.add_argument("--events-per-turn", type=int, default=4)
+    args = parser.parse_args()
+
+    print(
+        f"{'service':<24}{'events':>8}{'append p50':>12}"
+        f"{'append p99':>12}{'get p50':>12}"
+    )
+    print(f"{'':<32}{'(µs)':>12}{'(µs)':>12}{'(ms)':>12}")
+    await run(
+        "InMemorySessionService",
+        InMemorySessionService(),
+        args.events,
+        args.events_per_turn,
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        service = SqliteSessionService(Path(tmp) / "sessions.sqlite")
+        await run("SqliteSessionService", service, args.events, args.events_per_turn)
+        await service.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
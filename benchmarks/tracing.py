@@ -0,0 +1,172 @@
+"""Span tracing of day02's enhanced currency agent, and what it costs.
+
+    python -m benchmarks.tracing --runs 20
+
+Builds ``enhanced_currency_agent`` on ``ScriptedLlm`` models: it calls
+the fee and rate function tools, ``calculate``, the calculation agent
+through an ``AgentTool`` (whose code runs in a ``SandboxedCodeExecutor``)
+and the ``echo`` tool of the local MCP stand-in from
+``helpers.stub_mcp_server`` (through the MCP pool), then answers. Runs
+it ``--runs`` times without tracing and with ``enable_tracing`` writing
+to a JSON lines file and a ``FakeCollector``, prints the wall-time
+overhead and the flame graph, and checks that the memory buffer, the
+file and the collector got the same spans and that the AgentTool's and
+MCP's spans nest under the ``execute_tool`` span that made them.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+from google.adk.agents import LlmAgent
+from google.adk.tools import AgentTool
+from google.adk.tools.mcp_tool.mcp_session_manager import StdioConnectionParams
+from mcp import StdioServerParameters
+
+from helpers.arithmetic import calculate
+from helpers.bench import benchmark
+from helpers.fake_collector import FakeCollector
+from helpers.mcp_pool import McpPool, PooledMcpToolset
+from helpers.sandbox import SandboxedCodeExecutor
+from helpers.stub_model import ScriptedLlm, function_call
+from helpers.tracing import enable_tracing
+
+CODE = "```python\nprint(round(1250 * (1 - 0.01) * 83.58, 2))\n```"
+
+
+def write_code(llm_request) -> str:
+    # The execution result comes back as user text, which restarts the
+    # script, so answer from the result once there is one
+    results = [
+        part.text
+        for content in llm_request.contents
+        for part in content.parts or []
+        if part.text and "Code execution result:" in part.text
+    ]
+    if not results:
+        return CODE
+    return results[-1].split("Code execution result:")[1].strip("`\n ")
+
+
+def currency_agent(args: argparse.Namespace, pool: McpPool, executor) -> LlmAgent:
+    async def get_fee_for_payment_method(method: str) -> dict:
+        """Looks up the transaction fee percentage for a payment method."""
+        await asyncio.sleep(args.tool_latency)
+        return {"status": "success", "fee_percentage": 0.01}
+
+    async def get_exchange_rate(base_currency: str, target_currency: str) -> dict:
+        """Looks up the exchange rate between two currencies."""
+        await asyncio.sleep(args.tool_latency)
+        return {"status": "success", "rate": 83.58}
+
+    def model(*responses) -> ScriptedLlm:
+        return ScriptedLlm(responses=list(responses), latency=args.latency)
+
+    calculation_agent = LlmAgent(
+        name="CalculationAgent",
+        model=model(write_code),
+        instruction="Respond with Python code only.",
+        code_executor=executor,
+    )
+    receipts = PooledMcpToolset(
+        connection_params=StdioConnectionParams(
+            server_params=StdioServerParameters(
+                command=sys.executable, args=["-m", "helpers.stub_mcp_server"]
+            ),
+            timeout=30,
+        ),
+        tool_filter=["echo"],
+        pool=pool,
+        catalog=None,
+    )
+    return LlmAgent(
+        name="enhanced_currency_agent",
+        model=model(
+            function_call("get_fee_for_payment_method", method="bank transfer"),
+            function_call(
+                "get_exchange_rate", base_currency="USD", target_currency="INR"
+            ),
+            function_call("calculate", expression="1250 * (1 - 0.01) * 83.58"),
+            function_call("CalculationAgent", request="1250 * (1 - 0.01) * 83.58"),
+            function_call("echo", message="1,250 USD is 103,430.25 INR"),
+            "1,250 USD is 103,430.25 INR after a 1% fee.",
+        ),
+        instruction="Convert currencies with the tools.",
+        tools=[
+            get_fee_for_payment_method,
+            get_exchange_rate,
+            calculate,
+            AgentTool(agent=calculation_agent),
+            receipts,
+        ],
+    )
+
+
+def ancestors(span: dict, by_id: dict[str, dict]) -> list[str]:
+    names = []
+    while span["parentSpanId"] in by_id:
+        span = by_id[span["parentSpanId"]]
+        names.append(span["name"])
+    return names
+
+
+async def main_async(args: argparse.Namespace, errlog) -> None:
+    query = "Convert 1,250 USD to INR using a Bank Transfer."
+    pool = McpPool(errlog=errlog)
+    executor = SandboxedCodeExecutor(pool_size=1, timeout=10)
+
+    plain = await benchmark(
+        currency_agent(args, pool, executor), query, args.runs, name="untraced"
+    )
+    with tempfile.TemporaryDirectory() as directory, FakeCollector() as collector:
+        path = Path(directory) / "spans.jsonl"
+        tracing = enable_tracing(path=path, otlp_endpoint=collector.url)
+        traced = await benchmark(
+            currency_agent(args, pool, executor), query, args.runs, name="traced"
+        )
+        tracing.flush()
+        spans = tracing.spans()
+        in_file = len(path.read_text().splitlines())
+        tracing.close()
+    await pool.close()
+    executor.close()
+
+    for result in (plain, traced):
+        print(f"{result.name:<24}p50 {result.summary()['p50_ms']:>8.2f} ms")
+    print(f"\n{tracing.flame_graph()}\n")
+
+    by_id = {span["spanId"]: span for span in spans}
+    nested = {
+        name: all(
+            parent in ancestors(span, by_id) for span in spans if span["name"] == name
+        )
+        for name, parent in (
+            ("invoke_agent CalculationAgent", "execute_tool CalculationAgent"),
+            ("execute_code", "execute_tool CalculationAgent"),
+            ("mcp tools/call", "execute_tool echo"),
+        )
+    }
+    print(
+        f"{len(spans)} spans in memory, {in_file} in the file,"
+        f" {collector.stats()['spans']} at the collector"
+        f" ({collector.stats()['requests']} requests)"
+    )
+    print(f"nested under their tool call: {nested}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.01)
+    parser.add_argument("--tool-latency", type=float, default=0.005)
+    args = parser.parse_args()
+    # Keep the MCP server's request logging out of the report
+    with open(os.devnull, "w") as devnull:
+        asyncio.run(main_async(args, devnull))
+
+
+if __name__ == "__main__":
+    main()
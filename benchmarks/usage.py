@@ -0,0 +1,116 @@
+"""Per-agent token and cost accounting of a nested agent tree, and its overhead.
+
+    python -m benchmarks.usage --runs 50
+
+Builds a tree with every kind of nesting day01 uses: day01's
+ResearchSystem (three researchers in a ``ParallelAgent``, then the
+aggregator), a ``LoopAgent`` of critic and refiner, and a coordinator
+that calls a summarizer through an ``AgentTool``. All agents run on
+``ScriptedLlm`` models, which report prompt and output tokens like
+Gemini. Runs it ``--runs`` times without plugins and with a
+``UsageTracker``, prints the wall-time overhead, then the tracker's
+per-agent report and checks that the per-agent, per-invocation and
+per-session totals agree.
+"""
+
+import argparse
+import asyncio
+import tempfile
+from pathlib import Path
+
+from google.adk.agents import LlmAgent, LoopAgent, ParallelAgent, SequentialAgent
+from google.adk.tools import AgentTool
+
+from helpers.bench import benchmark
+from helpers.stub_model import ScriptedLlm, function_call
+from helpers.usage import UsageTracker
+
+
+def agent(name: str, instruction: str, output_key: str, **options) -> LlmAgent:
+    return LlmAgent(
+        name=name,
+        model=ScriptedLlm(responses=options.pop("responses", [f"{name} " * 50])),
+        instruction=instruction,
+        output_key=output_key,
+        **options,
+    )
+
+
+def agent_tree() -> SequentialAgent:
+    researchers = [
+        agent(f"{topic}Researcher", f"Research {topic}.", f"{topic.lower()}_research")
+        for topic in ("Tech", "Health", "Finance")
+    ]
+    aggregator = agent(
+        "AggregatorAgent",
+        "Combine {tech_research}, {health_research} and {finance_research}.",
+        "executive_summary",
+    )
+    loop = LoopAgent(
+        name="RefinementLoop",
+        max_iterations=2,
+        sub_agents=[
+            agent("CriticAgent", "Critique {executive_summary}.", "critique"),
+            agent(
+                "RefinerAgent",
+                "Refine {executive_summary} using {critique}.",
+                "executive_summary",
+            ),
+        ],
+    )
+    summarizer = agent("SummarizerAgent", "Summarize the findings.", "final_summary")
+    coordinator = agent(
+        "ResearchCoordinator",
+        "Call SummarizerAgent on {executive_summary}.",
+        "coordinator_reply",
+        responses=[function_call("SummarizerAgent", request="Summarize."), "Done."],
+        tools=[AgentTool(agent=summarizer)],
+    )
+    return SequentialAgent(
+        name="ResearchSystem",
+        sub_agents=[
+            ParallelAgent(name="ParallelResearchTeam", sub_agents=researchers),
+            aggregator,
+            loop,
+            coordinator,
+        ],
+    )
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    query = "Run the daily executive briefing."
+    with tempfile.TemporaryDirectory() as directory:
+        tracker = UsageTracker(jsonl_path=Path(directory) / "usage.jsonl")
+        plain = await benchmark(agent_tree(), query, args.runs, warmup=0)
+        tracked = await benchmark(
+            agent_tree(), query, args.runs, warmup=0, plugins=[tracker]
+        )
+        lines = (Path(directory) / "usage.jsonl").read_text().splitlines()
+
+    for result in (plain, tracked):
+        print(f"{result.name:<24}p50 {result.summary()['p50_ms']:>8.2f} ms")
+    print(f"\n{tracker.report()}\n")
+
+    totals = {
+        "agents": sum(u.cost_usd for u in tracker.by_agent.values()),
+        "invocations": sum(u.cost_usd for u in tracker.by_invocation.values()),
+        "sessions": sum(u.cost_usd for u in tracker.by_session.values()),
+    }
+    calls = sum(u.calls for u in tracker.by_agent.values())
+    print(f"cost by {', '.join(f'{k} ${v:.5f}' for k, v in totals.items())}")
+    print(
+        f"{calls} model calls over {len(tracker.by_session)} sessions and"
+        f" {len(tracker.by_invocation)} invocations, {len(lines)} JSON lines"
+    )
+    print("\n" + "\n".join(tracker.prometheus().splitlines()[:6]))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
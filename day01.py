@@ -47,7 +47,6 @@ def _(load_dotenv, os):
 @app.cell
 def _():
     from google.adk.agents import Agent, SequentialAgent, ParallelAgent, LoopAgent
-    from google.adk.models.google_llm import Gemini
     from google.adk.runners import InMemoryRunner
     from google.adk.tools import AgentTool, FunctionTool, google_search
     from google.genai import types
@@ -57,7 +56,6 @@ def _():
         Agent,
         AgentTool,
         FunctionTool,
-        Gemini,
         InMemoryRunner,
         LoopAgent,
         ParallelAgent,
@@ -69,22 +67,57 @@ def _():
 
 @app.cell
 def _(types):
-    retry_config = types.HttpRetryOptions(
-        attempts=5,  # Maximum retry attempts
-        exp_base=7,  # Delay multiplier
-        initial_delay=1,  # Initial delay before first retry (in seconds)
-        http_status_codes=[429, 500, 503, 504],  # Retry on these HTTP errors
-    )
+    # A single attempt: retries, backoff and rate limits are handled by the
+    # limiter shared by every model, see helpers/ratelimit.py
+    retry_config = types.HttpRetryOptions(attempts=1)
     return (retry_config,)
 
 
 @app.cell
-def _(Agent, Gemini, google_search, retry_config):
+def _():
+    # Replays recorded responses for identical requests, see helpers/model_cache.py
+    from helpers.model_cache import CachedLlm, ResponseCache
+
+    # One limiter and one connection pool for every model in the notebook,
+    # see helpers/ratelimit.py and helpers/model_registry.py
+    from helpers.model_registry import model_registry
+    from helpers.ratelimit import LimitedLlm
+
+    # Duplicates straggling model calls of a fan-out, see helpers/hedging.py
+    from helpers.hedging import hedged_all
+
+    # Runs pipeline stages as soon as their inputs are ready, see helpers/dag.py
+    from helpers.dag import dag_from
+
+    # Hands a stage's output on section by section, see helpers/pipelining.py
+    from helpers.pipelining import pipelined
+
+    # Tokens, cost and time per agent for every runner, see helpers/usage.py
+    from helpers.usage import UsageTracker
+
+    response_cache = ResponseCache(".cache/day01_responses.sqlite")
+    usage_tracker = UsageTracker(jsonl_path=".cache/day01_usage.jsonl")
+    return (
+        CachedLlm,
+        LimitedLlm,
+        dag_from,
+        hedged_all,
+        model_registry,
+        pipelined,
+        response_cache,
+        usage_tracker,
+    )
+
+
+@app.cell
+def _(Agent, LimitedLlm, google_search, model_registry, retry_config):
     root_agent1 = Agent(
         name="helpful_assistant",
-        model=Gemini(
-            model="gemini-2.5-flash-lite",
-            retry_options=retry_config,
+        model=LimitedLlm(
+            llm=model_registry.gemini(
+                "gemini-2.5-flash-lite",
+                retry_options=retry_config,
+            )
         ),
         description="My first agent - for answering general questions",
         instruction="You are a helpful assistant. Use Google Search for current info or if unsure.",
@@ -96,8 +129,8 @@ def _(Agent, Gemini, google_search, retry_config):
 
 
 @app.cell
-def _(InMemoryRunner, root_agent1):
-    runner = InMemoryRunner(agent=root_agent1)
+def _(InMemoryRunner, root_agent1, usage_tracker):
+    runner = InMemoryRunner(agent=root_agent1, plugins=[usage_tracker])
 
     print("Runner created.")
     return (runner,)
@@ -134,12 +167,17 @@ def _(mo):
 
 
 @app.cell
-def _(Agent, Gemini, google_search, retry_config):
+def _(Agent, LimitedLlm, google_search, model_registry, retry_config):
     # Research agent role:  use google_search tool and present findings
 
     research_agent = Agent(
         name="ResearchAgent",
-        model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+        model=LimitedLlm(
+            llm=model_registry.gemini(
+                "gemini-2.5-flash-lite",
+                retry_options=retry_config,
+            )
+        ),
         instruction="""You are a specialized research agent. Your only
         job is to use the google_search tool to find 2-3 peices of
         relevant information on the given topic and present the
@@ -155,14 +193,16 @@ def _(Agent, Gemini, google_search, retry_config):
 
 
 @app.cell
-def _(Agent, Gemini, retry_config):
+def _(Agent, LimitedLlm, model_registry, retry_config):
     # summarizer Agent: its job is to summarize the text it recieves.
 
     summarizer_agent = Agent(
         name="SummarizerAgent",
-        model=Gemini(
-            model="gemini-2.5-flash-lite",
-            retry_options=retry_config,
+        model=LimitedLlm(
+            llm=model_registry.gemini(
+                "gemini-2.5-flash-lite",
+                retry_options=retry_config,
+            )
         ),
         instruction="""Read the provided research finds: 
         {research_findings}
@@ -179,7 +219,8 @@ def _(Agent, Gemini, retry_config):
 def _(
     Agent,
     AgentTool,
-    Gemini,
+    LimitedLlm,
+    model_registry,
     research_agent,
     retry_config,
     summarizer_agent,
@@ -188,7 +229,12 @@ def _(
 
     root_agent2 = Agent(
         name="ResearchCoordinator",
-        model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+        model=LimitedLlm(
+            llm=model_registry.gemini(
+                "gemini-2.5-flash-lite",
+                retry_options=retry_config,
+            )
+        ),
         instruction="""You are a research coordinator.
         Yout goal is to answer the user's query by orchestating
         a workflow.
@@ -209,8 +255,8 @@ def _(
 
 
 @app.cell
-async def _(InMemoryRunner, root_agent2, runner):
-    runner2 = InMemoryRunner(agent=root_agent2)
+async def _(InMemoryRunner, root_agent2, runner, usage_tracker):
+    runner2 = InMemoryRunner(agent=root_agent2, plugins=[usage_tracker])
     response2 = await runner.run_debug(
         "What are the latest advancements in quantum computing and    what do they mean for AI?"
     )
@@ -228,12 +274,17 @@ def _(mo):
 
 
 @app.cell
-def _(Agent, Gemini, retry_config):
+def _(Agent, LimitedLlm, model_registry, retry_config):
     # Outline Agent: Create initial blog post outline
 
     outline_agent = Agent(
         name="OutlineAgent",
-        model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+        model=LimitedLlm(
+            llm=model_registry.gemini(
+                "gemini-2.5-flash-lite",
+                retry_options=retry_config,
+            )
+        ),
         instruction="""
         Create a blog outline for the given topic with:
         1. A catchy headline
@@ -250,13 +301,18 @@ def _(Agent, Gemini, retry_config):
 
 
 @app.cell
-def _(Agent, Gemini, retry_config):
+def _(Agent, LimitedLlm, model_registry, retry_config):
     # Writer Agent: Write the full blog post based on the outline
     # from the previous agent.
 
     writer_agent = Agent(
         name="WriterAgent",
-        model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+        model=LimitedLlm(
+            llm=model_registry.gemini(
+                "gemini-2.5-flash-lite",
+                retry_options=retry_config,
+            )
+        ),
         instruction="""
         Following this outline strictly: {blog_outline}
         Write a brief, 200 to 300-word blod post with an engaging and
@@ -270,12 +326,17 @@ def _(Agent, Gemini, retry_config):
 
 
 @app.cell
-def _(Agent, Gemini, retry_config):
+def _(Agent, LimitedLlm, model_registry, retry_config):
     # Editor Agent: Edits and polishes the draft from the writer agent
 
     editor_agent = Agent(
         name="EditorAgent",
-        model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+        model=LimitedLlm(
+            llm=model_registry.gemini(
+                "gemini-2.5-flash-lite",
+                retry_options=retry_config,
+            )
+        ),
         instruction="""
         Edit this draft: {blog_draft}
         Your task is to polish this text by fixing any
@@ -303,14 +364,64 @@ def _(SequentialAgent, editor_agent, outline_agent, writer_agent):
 
 
 @app.cell
-async def _(InMemoryRunner, root_agent3, runner):
-    runner3 = InMemoryRunner(agent=root_agent3)
+async def _(InMemoryRunner, root_agent3, runner, usage_tracker):
+    runner3 = InMemoryRunner(agent=root_agent3, plugins=[usage_tracker])
     response3 = await runner.run_debug(
         "Wite a blog post about the benefits of multi-agent systems for software developers."
     )
     return
 
 
+@app.cell
+def _(mo):
+    mo.md("""
+    Pipelined Stages - Writing While the Outline Streams
+
+    The WriterAgent needs the outline, but not all of it at once. The
+    pipelined version streams the outline and hands every finished `##`
+    section straight to the writer, and every written section straight to
+    the editor, so the three stages overlap instead of queueing.
+    """)
+    return
+
+
+@app.cell
+def _(pipelined, root_agent3):
+    streaming_blog_agent = pipelined(
+        root_agent3,
+        name="PipelinedBlogPipeline",
+        instructions={
+            "OutlineAgent": """
+            Create a blog outline for the given topic with:
+            1. A catchy headline
+            2. An introduction hook
+            3. 3-5 Main sections with 2-3 bullet points for each
+            4. A concluding thought
+            Start the headline and every part with a '## ' heading.
+            """,
+            "WriterAgent": """
+            Following this part of an outline strictly: {blog_outline}
+            Write only this part of a blog post, 40 to 80 words, with an
+            engaging and informative tone. Keep its '## ' heading.
+            """,
+        },
+    )
+
+    print("✅ PipelinedAgent created.")
+    return (streaming_blog_agent,)
+
+
+@app.cell
+async def _(InMemoryRunner, streaming_blog_agent, usage_tracker):
+    streaming_blog_runner = InMemoryRunner(
+        agent=streaming_blog_agent, plugins=[usage_tracker]
+    )
+    response5 = await streaming_blog_runner.run_debug(
+        "Wite a blog post about the benefits of multi-agent systems for software developers."
+    )
+    return
+
+
 @app.cell
 def _(mo):
     mo.md("""
@@ -320,12 +431,28 @@ def _(mo):
 
 
 @app.cell
-def _(Agent, Gemini, google_search, retry_config):
+def _(
+    Agent,
+    CachedLlm,
+    LimitedLlm,
+    google_search,
+    model_registry,
+    response_cache,
+    retry_config,
+):
     # tech researcher: foceses on ai and ml trends
 
     tech_researcher = Agent(
         name="TechResearcher",
-        model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+        model=CachedLlm(
+            llm=LimitedLlm(
+                llm=model_registry.gemini(
+                    "gemini-2.5-flash-lite",
+                    retry_options=retry_config,
+                )
+            ),
+            cache=response_cache,
+        ),
         instruction="""
             Research the latest AI/ML trends. Include 3 key developments,
             the main companiesinvolved, and the potential impact. Keep
@@ -341,12 +468,28 @@ def _(Agent, Gemini, google_search, retry_config):
 
 
 @app.cell
-def _(Agent, Gemini, google_search, retry_config):
+def _(
+    Agent,
+    CachedLlm,
+    LimitedLlm,
+    google_search,
+    model_registry,
+    response_cache,
+    retry_config,
+):
     # health researcher: focus on medical breakthroughs
 
     health_researcher = Agent(
         name="HealthResearcher",
-        model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+        model=CachedLlm(
+            llm=LimitedLlm(
+                llm=model_registry.gemini(
+                    "gemini-2.5-flash-lite",
+                    retry_options=retry_config,
+                )
+            ),
+            cache=response_cache,
+        ),
         instruction="""
         Research recent medical breakthroughs. Include 3 significant
         advances, their practical applications, and estimated timelines.
@@ -362,12 +505,28 @@ def _(Agent, Gemini, google_search, retry_config):
 
 
 @app.cell
-def _(Agent, Gemini, google_search, retry_config):
+def _(
+    Agent,
+    CachedLlm,
+    LimitedLlm,
+    google_search,
+    model_registry,
+    response_cache,
+    retry_config,
+):
     # finance researcher: focuses on fintech trends
 
     finance_researcher = Agent(
         name="FinanceResearcher",
-        model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+        model=CachedLlm(
+            llm=LimitedLlm(
+                llm=model_registry.gemini(
+                    "gemini-2.5-flash-lite",
+                    retry_options=retry_config,
+                )
+            ),
+            cache=response_cache,
+        ),
         instruction="""
         Research current fintech trends. include 3 key trends,
         their market implications, and the future outlook.
@@ -382,10 +541,18 @@ def _(Agent, Gemini, google_search, retry_config):
 
 
 @app.cell
-def _(Agent, Gemini, retry_config):
+def _(Agent, CachedLlm, LimitedLlm, model_registry, response_cache, retry_config):
     aggregator_agent = Agent(
         name="AggregatorAgent",
-        model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+        model=CachedLlm(
+            llm=LimitedLlm(
+                llm=model_registry.gemini(
+                    "gemini-2.5-flash-lite",
+                    retry_options=retry_config,
+                )
+            ),
+            cache=response_cache,
+        ),
         instruction="""
         Combine these three research findings into a 
         single executive summary:
@@ -419,16 +586,24 @@ def _(
     aggregator_agent,
     finance_researcher,
     health_researcher,
+    hedged_all,
     tech_researcher,
 ):
     # nest all these under a parallel agent, and then inside of a
     # sequential one
 
-    # the ParallelAgent runs all its sub-agents simultaneously.
+    # the ParallelAgent runs all its sub-agents simultaneously, so it is
+    # as slow as the slowest one. A researcher's model call that runs
+    # past the p95 of the researchers' recent calls gets a duplicate
+    # request and the first answer wins (at most 10% extra calls). Until
+    # 20 calls were timed, "recent" is a guess: 8 s for a search call.
 
     parallel_research_team = ParallelAgent(
         name="ParallelResearchTeam",
-        sub_agents=[tech_researcher, health_researcher, finance_researcher],
+        sub_agents=hedged_all(
+            [tech_researcher, health_researcher, finance_researcher],
+            initial_deadline=8.0,
+        ),
     )
 
     # SequentialAgent defines high level workflow
@@ -444,11 +619,52 @@ def _(
 
 
 @app.cell
-async def _(InMemoryRunner, research_root_agent):
-    research_runner = InMemoryRunner(agent=research_root_agent)
+async def _(InMemoryRunner, research_root_agent, response_cache, usage_tracker):
+    research_runner = InMemoryRunner(agent=research_root_agent, plugins=[usage_tracker])
     response = await research_runner.run_debug(
         "Run the daily executive briefing on Tech, Health and Finance."
     )
+    print(f"🗄️ Response cache: {response_cache.stats()}")
+    return
+
+
+@app.cell
+def _(mo):
+    mo.md("""
+    Dependency Graph - Running Both Pipelines at Once
+
+    The BlogPipeline and the ResearchSystem share no state, yet a
+    SequentialAgent of the two would write the blog only after the
+    briefing. `dag_from` reads which `{placeholders}` each stage needs and
+    which `output_key` provides them, and starts every stage as soon as
+    its inputs are ready: the outline starts with the researchers, the
+    writer as soon as the outline is done.
+    """)
+    return
+
+
+@app.cell
+def _(dag_from, research_root_agent, root_agent3):
+    daily_content_agent = dag_from(
+        research_root_agent, root_agent3, name="DailyContent"
+    )
+
+    print(f"✅ DagAgent created: {daily_content_agent.dependencies()}")
+    return (daily_content_agent,)
+
+
+@app.cell
+async def _(InMemoryRunner, daily_content_agent, usage_tracker):
+    daily_content_runner = InMemoryRunner(
+        agent=daily_content_agent, plugins=[usage_tracker]
+    )
+    response4 = await daily_content_runner.run_debug(
+        "Run the daily executive briefing on Tech, Health and Finance, and write"
+        " a blog post about the benefits of multi-agent systems."
+    )
+    for timing in daily_content_agent.timings():
+        print(f"⏱️ {timing.name}: {timing.start_ms:.0f}-{timing.end_ms:.0f} ms")
+    print(f"Critical path: {' -> '.join(daily_content_agent.critical_path())}")
     return
 
 
@@ -461,11 +677,16 @@ def _(mo):
 
 
 @app.cell
-def _(Agent, Gemini, retry_config):
+def _(Agent, LimitedLlm, model_registry, retry_config):
     # This agent runs ONCE at the beginning to create the first draft.
     initial_writer_agent = Agent(
         name="InitialWriterAgent",
-        model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+        model=LimitedLlm(
+            llm=model_registry.gemini(
+                "gemini-2.5-flash-lite",
+                retry_options=retry_config,
+            )
+        ),
         instruction="""Based on the user's prompt, write the first draft of a short story (around 100-150 words).
         Output only the story text, with no introduction or explanation.""",
         output_key="current_story",  # Stores the first draft in the state.
@@ -476,11 +697,29 @@ def _(Agent, Gemini, retry_config):
 
 
 @app.cell
-def _(Agent, Gemini, retry_config):
+def _():
+    # Ends the refinement loop in process, without a model call: as soon as
+    # the critic says "APPROVED", when a revision barely changes the story,
+    # or once the run used its token budget. See helpers/loop_control.py
+    from helpers.loop_control import approved, converged, stop_loop_when, token_budget
+
+    stop_refining = stop_loop_when(
+        approved("critique"), converged("current_story"), token_budget(20_000)
+    )
+    return (stop_refining,)
+
+
+@app.cell
+def _(Agent, LimitedLlm, model_registry, retry_config, stop_refining):
     # This agent's only job is to provide feedback or the approval signal. It has no tools.
     critic_agent = Agent(
         name="CriticAgent",
-        model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+        model=LimitedLlm(
+            llm=model_registry.gemini(
+                "gemini-2.5-flash-lite",
+                retry_options=retry_config,
+            )
+        ),
         instruction="""You are a constructive story critic. Review the story provided below.
         Story: {current_story}
 
@@ -488,6 +727,7 @@ def _(Agent, Gemini, retry_config):
         - If the story is well-written and complete, you MUST respond with the exact phrase: "APPROVED"
         - Otherwise, provide 2-3 specific, actionable suggestions for improvement.""",
         output_key="critique",  # Stores the feedback in the state.
+        after_agent_callback=stop_refining,  # Stops the loop on "APPROVED".
     )
 
     print("✅ critic_agent created.")
@@ -511,6 +751,11 @@ def _(mo):
 
     1. An agent that can call that function when the right condition is
     met.
+
+    Calling it costs the refiner a model round trip, though, so the loop
+    is also checked in process after the critic and the refiner
+    (`stop_refining` above): it ends right after an "APPROVED" critique
+    or once the drafts stop changing, and `exit_loop` is the fallback.
     """)
     return
 
@@ -545,12 +790,25 @@ def _(mo):
 
 
 @app.cell
-def _(Agent, FunctionTool, Gemini, exit_loop, retry_config):
+def _(
+    Agent,
+    FunctionTool,
+    LimitedLlm,
+    exit_loop,
+    model_registry,
+    retry_config,
+    stop_refining,
+):
     # RefinerAgent refines story based on critique or exits loop
 
     refiner_agent = Agent(
         name="RefinerAgent",
-        model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+        model=LimitedLlm(
+            llm=model_registry.gemini(
+                "gemini-2.5-flash-lite",
+                retry_options=retry_config,
+            )
+        ),
         instruction="""You are a story refiner. You have a story draft and critique.
 
         Story Draft: {current_story}
@@ -563,6 +821,7 @@ def _(Agent, FunctionTool, Gemini, exit_loop, retry_config):
         tools=[
             FunctionTool(exit_loop)
         ],  # The tool is now correctly initialized with the function reference.
+        after_agent_callback=stop_refining,  # Stops the loop once drafts converge.
     )
 
     print("✅ refiner_agent created.")
@@ -608,14 +867,99 @@ def _(
 
 
 @app.cell
-async def _(InMemoryRunner, runner, story_root_agent):
-    story_runner = InMemoryRunner(agent=story_root_agent)
+async def _(InMemoryRunner, runner, story_root_agent, usage_tracker):
+    story_runner = InMemoryRunner(agent=story_root_agent, plugins=[usage_tracker])
     story_response = await runner.run_debug(
         "Write a short story about a lighthouse keeper who discovers a mysterious, glowing map"
     )
     return
 
 
+@app.cell
+def _(mo):
+    mo.md("""
+    Where the Tokens Went
+
+    Every runner above shares one `UsageTracker` plugin. It adds up the
+    usage metadata of each model call per agent, per invocation and per
+    session. That includes the sub-agents of the sequential, parallel
+    and loop agents and the agents behind an `AgentTool`. Each call is
+    also appended to `.cache/day01_usage.jsonl`.
+    """)
+    return
+
+
+@app.cell
+def _(usage_tracker):
+    print(usage_tracker.report())
+    usage_tracker.write_prometheus(".cache/day01_usage.prom")
+    return
+
+
+@app.cell
+def _(mo):
+    mo.md("""
+    ### Offline Benchmarks
+
+    Every agent above talks to Gemini, so timing a pipeline mostly
+    measures the network. `ScriptedLlm` is a drop-in model that replays
+    a fixed script instead, which leaves only the runner and
+    orchestration cost. `with_model` clones an agent tree with the
+    stub swapped in, so the agents above stay untouched.
+    """)
+    return
+
+
+@app.cell
+def _():
+    from helpers.bench import benchmark, print_report
+    from helpers.stub_model import function_call, script_factory, with_model
+
+    offline_models = script_factory(
+        {
+            "ResearchCoordinator": [
+                function_call("ResearchAgent", request="quantum computing"),
+                function_call("SummarizerAgent", request="summarize the findings"),
+                "Here is the final summary.",
+            ],
+            "CriticAgent": ["APPROVED"],
+        }
+    )
+    return benchmark, offline_models, print_report, with_model
+
+
+@app.cell
+async def _(
+    benchmark,
+    offline_models,
+    print_report,
+    research_root_agent,
+    root_agent1,
+    root_agent2,
+    root_agent3,
+    story_root_agent,
+    with_model,
+):
+    bench_results = []
+    for _agent in [
+        root_agent1,
+        root_agent2,
+        root_agent3,
+        research_root_agent,
+        story_root_agent,
+    ]:
+        bench_results.append(
+            await benchmark(
+                with_model(_agent, offline_models),
+                "Benchmark query",
+                runs=20,
+            )
+        )
+
+    print_report(bench_results)
+    return
+
+
 @app.cell
 def _():
     return
@@ -16,24 +16,32 @@ with app.setup:
     # Initialization code that runs before all other cells
     import marimo as mo
     import os
+    import uuid
     from dotenv import load_dotenv
 
     from google.genai import types
     from google.adk.agents import LlmAgent
-    from google.adk.models.google_llm import Gemini
     from google.adk.runners import InMemoryRunner, Runner
     from google.adk.sessions import InMemorySessionService
     from google.adk.tools import google_search, AgentTool, ToolContext
     from google.adk.code_executors import BuiltInCodeExecutor
-    from google.adk.tools.mcp_tool.mcp_toolset import McpToolset
     from google.adk.tools.mcp_tool.mcp_session_manager import (
         StdioConnectionParams,
         StdioServerParameters,
     )
 
     from google.adk.apps.app import App, ResumabilityConfig
+    from google.adk.artifacts import InMemoryArtifactService
     from google.adk.tools.function_tool import FunctionTool
 
+    from helpers.blobs import BlobStore
+    from helpers.events import EventIndex
+    from helpers.image_batch import generate_images
+    from helpers.mcp_pool import PooledMcpToolset
+    from helpers.model_registry import model_registry
+    from helpers.ratelimit import LimitedLlm
+    from helpers.usage import UsageTracker
+
     from google.adk.tools.mcp_tool.mcp_session_manager import (
         StreamableHTTPServerParams,
         StreamableHTTPConnectionParams,
@@ -47,12 +55,12 @@ with app.setup:
         print(f"Auth Error: No 'GOOGLE_API_KEY' found. Details: {e}")
 
 
-    retry_config = types.HttpRetryOptions(
-        attempts=5,
-        exp_base=7,
-        initial_delay=1,
-        http_status_codes=[429, 500, 503, 504],
-    )
+    # A single attempt: retries, backoff and rate limits are handled by the
+    # limiter shared by every model, see helpers/ratelimit.py
+    retry_config = types.HttpRetryOptions(attempts=1)
+
+    # Tokens, cost and time per agent for every runner, see helpers/usage.py
+    usage_tracker = UsageTracker(jsonl_path=".cache/day02_exercise_usage.jsonl")
 
 
 @app.cell
@@ -118,7 +126,8 @@ def _():
     #     tool_filter=pollinations_tool_filter,
     # )
 
-    mcp_image_server = McpToolset(
+    # pooled: reuses a warm server across runners instead of spawning npx
+    mcp_image_server = PooledMcpToolset(
         connection_params=StdioConnectionParams(
             server_params=StdioServerParameters(
                 command="npx",  # Run MCP server via npx
@@ -126,28 +135,38 @@ def _():
                     "-y",  # Argument for npx to auto-confirm install
                     "@modelcontextprotocol/server-everything",
                 ],
-                tool_filter=["getTinyImage"],
             ),
             timeout=30,
-        )
+        ),
+        # On the toolset: the server parameters ignore it
+        tool_filter=["getTinyImage"],
     )
     return (mcp_image_server,)
 
 
 @app.cell
 def _(mcp_image_server):
+    # keep image bytes out of the session: events only carry blob handles
+    blobs = BlobStore()
+
     image_agent = LlmAgent(
-        model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+        model=LimitedLlm(
+            llm=model_registry.gemini(
+                "gemini-2.5-flash-lite",
+                retry_options=retry_config,
+            )
+        ),
         name="image_agent",
         instruction="Use the MCP Tool to generate images for user queries",
         tools=[mcp_image_server],  # [mcp_image_server],
+        after_tool_callback=blobs.offload,
     )
-    return (image_agent,)
+    return blobs, image_agent
 
 
 @app.cell
 def _(image_agent):
-    mcp_runner = InMemoryRunner(agent=image_agent)
+    mcp_runner = InMemoryRunner(agent=image_agent, plugins=[usage_tracker])
     return (mcp_runner,)
 
 
@@ -161,28 +180,41 @@ async def _(mcp_runner):
 
 
 @app.cell
-def _(image_response):
+def _(blobs, image_response):
     from IPython.display import display, Image as IPImage
-    import base64
-
-    for event in image_response:
-        if event.content and event.content.parts:
-            for part in event.content.parts:
-                if hasattr(part, "function_response") and part.function_response:
-                    for item in part.function_response.response.get(
-                        "content", []
-                    ):
-                        if item.get("type") == "image":
-                            display(IPImage(data=base64.b64decode(item["data"])))
+
+    for item in EventIndex(image_response).images:
+        display(IPImage(data=blobs.read(item)))
+    return
+
+
+@app.cell
+def _():
+    mo.md("""
+    ### Bulk image generation tool
+
+    `generate_image` auto-approves a single image and pauses bulk
+    requests for approval with `request_confirmation`. Once approved,
+    the images are requested from the MCP image server concurrently
+    (at most `IMAGE_CONCURRENCY` at a time, on the pooled session),
+    each one retried on failure; whatever succeeded is returned even if
+    some images failed. Throughput vs the cap:
+    `python -m benchmarks.image_batch`.
+    """)
     return
 
 
-app._unparsable_cell(
-    r"""
-    def generate_image(
+@app.cell
+def _(blobs, mcp_image_server):
+    IMAGE_BULK_THRESHOLD = 1  # more images than this needs approval
+    IMAGE_CONCURRENCY = 8  # image calls in flight at once
+    IMAGE_RETRIES = 2  # extra attempts per image
+
+
+    async def generate_image(
         prompt: str, num_images: int, tool_context: ToolContext
     ) -> dict:
-        \"\"\"Creates a generate image request. Requires
+        """Creates a generate image request. Requires
         approval if more than 1 image is requested.
 
         Args:
@@ -190,15 +222,172 @@ app._unparsable_cell(
             num_images: Number of images to generate
 
         Returns:
-            Dictionary with image status
-        \"\"\"
-        # ^ placeholder stuff for now
-
-        if num_images > 1:
-        
-    """,
-    name="_"
-)
+            Dictionary with image status, or an error if num_images is
+            less than 1
+        """
+        if num_images < 1:
+            return {
+                "status": "error",
+                "error_message": f"num_images must be at least 1, not {num_images}",
+            }
+
+        # SCENARIO 1: bulk request, first call - PAUSE for approval
+        if num_images > IMAGE_BULK_THRESHOLD:
+            if not tool_context.tool_confirmation:
+                tool_context.request_confirmation(
+                    hint=f"⚠️ Bulk request: {num_images} images of '{prompt}'. Do you want to approve?",
+                    payload={"prompt": prompt, "num_images": num_images},
+                )
+                return {
+                    "status": "pending",
+                    "message": f"Request for {num_images} images requires approval",
+                }
+
+            # SCENARIO 2: bulk request resumed - rejected
+            if not tool_context.tool_confirmation.confirmed:
+                return {
+                    "status": "rejected",
+                    "message": f"Request for {num_images} images was rejected",
+                }
+
+        # SCENARIO 3: single image or approved bulk request - fan out to
+        # the MCP server (getTinyImage ignores the prompt; a real image
+        # server would get arguments={"prompt": prompt}). Each image is
+        # saved as an artifact as soon as it arrives, so it can be shown
+        # before the rest of the batch is done.
+        async def deliver(index, result):
+            if isinstance(result, Exception):
+                print(f"   ❌ image {index + 1}/{num_images}: {result}")
+                return
+            filename = f"image_{index + 1:03d}.png"
+            await tool_context.save_artifact(
+                filename,
+                types.Part.from_bytes(
+                    data=blobs.view(result["blob"]).tobytes(),
+                    mime_type=result["mimeType"],
+                ),
+            )
+            result["artifact"] = filename
+            print(f"   🖼️ image {index + 1}/{num_images} saved as {filename}")
+
+        result = await generate_images(
+            mcp_image_server.session,
+            num_images,
+            blobs,
+            tool="getTinyImage",
+            concurrency=IMAGE_CONCURRENCY,
+            retries=IMAGE_RETRIES,
+            on_image=deliver,
+        )
+        return {"prompt": prompt, **result}
+
+
+    print("✅ generate_image tool created")
+    return (generate_image,)
+
+
+@app.cell
+def _(generate_image):
+    bulk_image_agent = LlmAgent(
+        model=LimitedLlm(
+            llm=model_registry.gemini(
+                "gemini-2.5-flash-lite",
+                retry_options=retry_config,
+            )
+        ),
+        name="bulk_image_agent",
+        instruction="""You generate images for users.
+
+      Call generate_image with the prompt and the number of images the
+      user asked for (1 if they don't say).
+
+      - If the status is 'pending', tell the user the request needs approval
+      - If the status is 'rejected', tell the user it was not approved
+      - If the status is 'error', tell the user what was wrong
+      - Otherwise report how many images were generated and how many failed
+      """,
+        tools=[FunctionTool(func=generate_image)],
+    )
+
+    bulk_image_app = App(
+        name="bulk_images",
+        root_agent=bulk_image_agent,
+        resumability_config=ResumabilityConfig(is_resumable=True),
+        plugins=[usage_tracker],
+    )
+    bulk_image_session_service = InMemorySessionService()
+    bulk_image_runner = Runner(
+        app=bulk_image_app,
+        session_service=bulk_image_session_service,
+        artifact_service=InMemoryArtifactService(),
+    )
+    return bulk_image_runner, bulk_image_session_service
+
+
+@app.cell
+def _(bulk_image_runner, bulk_image_session_service):
+    async def run_image_request(query: str, approve: bool = True) -> EventIndex:
+        """Runs one image request, answering its approval if it pauses.
+
+        Returns:
+            EventIndex of everything the agent produced
+        """
+        session_id = f"images_{uuid.uuid4().hex[:8]}"
+        await bulk_image_session_service.create_session(
+            app_name="bulk_images", user_id="test_user", session_id=session_id
+        )
+        print(f"\nUser > {query}")
+
+        events = EventIndex()
+        async for event in bulk_image_runner.run_async(
+            user_id="test_user",
+            session_id=session_id,
+            new_message=types.Content(role="user", parts=[types.Part(text=query)]),
+        ):
+            events.add(event)
+
+        approval = events.approval()
+        if approval:
+            print(f"⏸️  Approval requested: {'approving' if approve else 'rejecting'}")
+            confirmation = types.Content(
+                role="user",
+                parts=[
+                    types.Part(
+                        function_response=types.FunctionResponse(
+                            id=approval["approval_id"],
+                            name="adk_request_confirmation",
+                            response={"confirmed": approve},
+                        )
+                    )
+                ],
+            )
+            async for event in bulk_image_runner.run_async(
+                user_id="test_user",
+                session_id=session_id,
+                new_message=confirmation,
+                invocation_id=approval["invocation_id"],
+            ):
+                events.add(event)
+
+        for text in events.texts:
+            print(f"Agent > {text}")
+        return events
+    return (run_image_request,)
+
+
+@app.cell
+async def _(blobs, run_image_request):
+    from IPython.display import display as show, Image as ShowImage
+
+    await run_image_request("Generate a tiny image of a cat")
+    bulk_events = await run_image_request("Generate 12 tiny images of a cat")
+    await run_image_request("Generate 50 tiny images of a dog", approve=False)
+
+    for image in bulk_events.images:
+        show(ShowImage(data=blobs.read(image)))
+    print(f"✅ Blob store: {blobs.stats()}")
+    print(usage_tracker.report())
+    return
 
 
 if __name__ == "__main__":
@@ -18,17 +18,33 @@ with app.setup:
     # Initialization code that runs before all other cells
 
     import marimo as mo
+    import asyncio
     import os
+    import time
     from dotenv import load_dotenv
 
     from google.genai import types
     from google.adk.agents import LlmAgent
-    from google.adk.models.google_llm import Gemini
     from google.adk.runners import InMemoryRunner
-    from google.adk.sessions import InMemorySessionService
     from google.adk.tools import google_search, AgentTool, ToolContext
     from google.adk.code_executors import BuiltInCodeExecutor
 
+    from helpers.approvals import ApprovalQueue, run_approval_workers
+    from helpers.arithmetic import calculate
+    from helpers.blobs import BlobStore
+    from helpers.bench import latency_summary
+    from helpers.currency import convert_batch, rate_store
+    from helpers.events import EventIndex
+    from helpers.mcp_catalog import tool_catalog
+    from helpers.mcp_pool import PooledMcpToolset, mcp_pool
+    from helpers.model_cache import CachedLlm, ResponseCache
+    from helpers.model_registry import model_registry
+    from helpers.ratelimit import LimitedLlm
+    from helpers.sandbox import SandboxedCodeExecutor
+    from helpers.sessions import SqliteSessionService
+    from helpers.tracing import enable_tracing
+    from helpers.usage import UsageTracker
+
     print("✅ ADK components imported successfully.")
 
 
@@ -69,28 +85,20 @@ def _():
 @app.cell
 def _():
     def show_python_code_and_result(response):
-        for i in range(len(response)):
-            # Check if the response contains a valid function call result from the code executor
-            if (
-                (response[i].content.parts)
-                and (response[i].content.parts[0])
-                and (response[i].content.parts[0].function_response)
-                and (response[i].content.parts[0].function_response.response)
-            ):
-                response_code = (
-                    response[i].content.parts[0].function_response.response
-                )
-                if "result" in response_code and response_code["result"] != "```":
-                    if "tool_code" in response_code["result"]:
-                        print(
-                            "Generated Python Code >> ",
-                            response_code["result"].replace("tool_code", ""),
-                        )
-                    else:
-                        print(
-                            "Generated Python Response >> ",
-                            response_code["result"],
-                        )
+        # Function call results from the code executor, already picked out
+        # by the EventIndex (pass one in to skip re-indexing the events)
+        for response_code in EventIndex.of(response).code_results:
+            if response_code["result"] != "```":
+                if "tool_code" in response_code["result"]:
+                    print(
+                        "Generated Python Code >> ",
+                        response_code["result"].replace("tool_code", ""),
+                    )
+                else:
+                    print(
+                        "Generated Python Response >> ",
+                        response_code["result"],
+                    )
 
 
     print("✅ Helper functions defined.")
@@ -110,15 +118,47 @@ def _():
 
 @app.cell
 def _():
-    retry_config = types.HttpRetryOptions(
-        attempts=5,  # Maximum retry attempts
-        exp_base=7,  # Delay multiplier
-        initial_delay=1,
-        http_status_codes=[429, 500, 503, 504],  # Retry on these HTTP errors
-    )
+    # A single attempt: retries, backoff and rate limits are handled by the
+    # limiter shared by every model, see helpers/ratelimit.py
+    retry_config = types.HttpRetryOptions(attempts=1)
     return (retry_config,)
 
 
+@app.cell
+def _():
+    mo.md("""
+    ### Response Cache
+    The same conversion queries get re-run over and over while
+    working through the notebook. Wrapping a model in `CachedLlm`
+    replays the recorded response for an identical request
+    (same prompt, instruction and tools) instead of calling Gemini
+    again. Entries expire after a week and the least recently used
+    ones are evicted once the cache grows past its size limit.
+    """)
+    return
+
+
+@app.cell
+def _():
+    response_cache = ResponseCache(".cache/day02_responses.sqlite")
+    return (response_cache,)
+
+
+@app.cell
+def _():
+    # Tokens, cost and time per agent for every runner, see helpers/usage.py
+    usage_tracker = UsageTracker(jsonl_path=".cache/day02_usage.jsonl")
+    return (usage_tracker,)
+
+
+@app.cell
+def _():
+    # Spans of every model call, tool call and MCP request, see
+    # helpers/tracing.py; pass otlp_endpoint= to send them to a collector
+    tracing = enable_tracing(path=".cache/day02_spans.jsonl")
+    return (tracing,)
+
+
 @app.cell
 def _():
     mo.md("""
@@ -159,14 +199,9 @@ def _():
                     "error_message": "Payment method not found"
                     }
         """
-        # This simulates looking up a company's internal fee structure.
-        fee_database = {
-            "platinum credit card": 0.02,  # 2%
-            "gold debit card": 0.035,  # 3.5%
-            "bank transfer": 0.01,  # 1%
-        }
-
-        fee = fee_database.get(method.lower())
+        # This simulates looking up a company's internal fee structure,
+        # loaded once from helpers/data/payment_fees.csv
+        fee = rate_store.fee(method)
         if fee is not None:
             return {"status": "success", "fee_percentage": fee}
         else:
@@ -210,22 +245,13 @@ def _():
                     }
         """
 
-        # Static data simulating a live exchange rate API
+        # Static data simulating a live exchange rate API, loaded once
+        # from helpers/data/exchange_rates.csv (reloaded when it changes).
+        # Cross pairs like EUR/JPY are triangulated through USD.
         # In production, this would call something like: requests.get("api.exchangerates.com")
-        rate_database = {
-            "usd": {
-                "eur": 0.93,  # Euro
-                "jpy": 157.50,  # Japanese Yen
-                "inr": 83.58,  # Indian Rupee
-            }
-        }
-
-        # Input validation and processing
-        base = base_currency.lower()
-        target = target_currency.lower()
+        rate = rate_store.rate(base_currency, target_currency)
 
         # Return structured result with status
-        rate = rate_database.get(base, {}).get(target)
         if rate is not None:
             return {"status": "success", "rate": rate}
         else:
@@ -237,6 +263,7 @@ def _():
 
     print("✅ Exchange rate function created")
     print(f"💱 Test: {get_exchange_rate('USD', 'EUR')}")
+    print(f"💱 Cross pair: {get_exchange_rate('EUR', 'JPY')}")
     return (get_exchange_rate,)
 
 
@@ -249,10 +276,23 @@ def _():
 
 
 @app.cell
-def _(get_exchange_rate, get_fee_for_payment_method, retry_config):
+def _(
+    get_exchange_rate,
+    get_fee_for_payment_method,
+    response_cache,
+    retry_config,
+):
     currency_agent = LlmAgent(
         name="currency_agent",
-        model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+        model=CachedLlm(
+            llm=LimitedLlm(
+                llm=model_registry.gemini(
+                    "gemini-2.5-flash-lite",
+                    retry_options=retry_config,
+                )
+            ),
+            cache=response_cache,
+        ),
         instruction="""
         You are a smart currency conversion assistant.
 
@@ -292,11 +332,12 @@ def _():
 
 
 @app.cell
-async def _(currency_agent):
-    currency_runner = InMemoryRunner(agent=currency_agent)
+async def _(currency_agent, response_cache, usage_tracker):
+    currency_runner = InMemoryRunner(agent=currency_agent, plugins=[usage_tracker])
     _ = await currency_runner.run_debug(
         "I want to convert 500 US dollars to Euros using my Platinum Credit Card. how much will I receive?"
     )
+    print(f"🗄️ Response cache: {response_cache.stats()}")
     return
 
 
@@ -317,7 +358,12 @@ def _():
 def _(retry_config):
     calculation_agent = LlmAgent(
         name="CalculationAgent",
-        model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+        model=LimitedLlm(
+            llm=model_registry.gemini(
+                "gemini-2.5-flash-lite",
+                retry_options=retry_config,
+            )
+        ),
         instruction="""
         You are a specialized calculator that only responds with Python
         code.  You are forbidden from providing any text, explanations, 
@@ -347,6 +393,14 @@ def _(retry_config):
 def _():
     mo.md("""
     now we change the original instructions for the currency agent.
+
+    Closed-form math like `amount * (1 - fee) * rate` goes to
+    `calculate` (`helpers/arithmetic.py`), which evaluates it locally
+    with `Decimal` precision after checking the expression against an
+    AST whitelist. That saves the extra model call (and code execution
+    round trip) that `calculation_agent` costs; it stays as a fallback
+    for anything `calculate` rejects. Offline comparison:
+    `python -m benchmarks.local_arithmetic`.
     """)
     return
 
@@ -356,11 +410,20 @@ def _(
     calculation_agent,
     get_exchange_rate,
     get_fee_for_payment_method,
+    response_cache,
     retry_config,
 ):
     enhanced_currency_agent = LlmAgent(
         name="enhanced_currency_agent",
-        model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+        model=CachedLlm(
+            llm=LimitedLlm(
+                llm=model_registry.gemini(
+                    "gemini-2.5-flash-lite",
+                    retry_options=retry_config,
+                )
+            ),
+            cache=response_cache,
+        ),
         # Updated instruction
         instruction="""
             You are a smart currency conversion assistant. 
@@ -378,10 +441,12 @@ def _(
        and clearly explain the issue to the user.
        4. Calculate Final Amount (CRITICAL): You are strictly prohibited 
        from performing any arithmetic calculations yourself.
-       You must use the calculation_agent tool to generate Python code 
-       that calculates the final converted amount. 
-       This code will use the fee information from step 1 and 
-       the exchange rate from step 2.
+       Use the calculate() tool with a single expression that computes
+       the final converted amount from the fee in step 1 and the
+       exchange rate in step 2, e.g. "1250 * (1 - 0.01) * 83.58".
+       Only if calculate() returns status "error" for a reason other
+       than your input, use the calculation_agent tool to generate
+       Python code that calculates it instead.
        5. Provide Detailed Breakdown: In your summary, you must:
            * State the final converted amount.
            * Explain how the result was calculated, including:
@@ -393,29 +458,47 @@ def _(
         tools=[
             get_fee_for_payment_method,
             get_exchange_rate,
+            calculate,  # Local, exact arithmetic
             AgentTool(agent=calculation_agent),  # Using another agent as a tool!
         ],
     )
 
     print("✅ Enhanced currency agent created")
-    print("🎯 New capability: Delegates calculations to specialist agent")
+    print("🎯 New capability: Exact local arithmetic, specialist agent as fallback")
     print("🔧 Tool types used:")
-    print("  • Function Tools (fees, rates)")
-    print("  • Agent Tool (calculation specialist)")
+    print("  • Function Tools (fees, rates, arithmetic)")
+    print("  • Agent Tool (calculation specialist, fallback)")
     return (enhanced_currency_agent,)
 
 
 @app.cell
-def _(enhanced_currency_agent):
-    enhanced_runner = InMemoryRunner(agent=enhanced_currency_agent)
+def _(enhanced_currency_agent, usage_tracker):
+    enhanced_runner = InMemoryRunner(
+        agent=enhanced_currency_agent, plugins=[usage_tracker]
+    )
     return (enhanced_runner,)
 
 
 @app.cell
-async def _(enhanced_runner):
+def _():
+    mo.md("""
+    Every model call, tool call and MCP request of the turn is a span,
+    and the calculation agent's run nests under the tool call that
+    started it. The flame graph merges them by call path: total and
+    self time per path, widest first, so a slow turn shows where it
+    waited. The spans also go to `.cache/day02_spans.jsonl`; offline
+    run: `python -m benchmarks.tracing`.
+    """)
+    return
+
+
+@app.cell
+async def _(enhanced_runner, tracing):
+    tracing.clear()  # profile this turn only
     enhanced_response = await enhanced_runner.run_debug(
         "Convert 1,250 USD to INRusing a Bank Transfer. Show me the precise calculation."
     )
+    print(tracing.flame_graph())
     return (enhanced_response,)
 
 
@@ -425,6 +508,141 @@ def _(enhanced_response, show_python_code_and_result):
     return
 
 
+@app.cell
+def _():
+    mo.md("""
+    ### Running the generated code locally
+
+    `BuiltInCodeExecutor` runs the calculation agent's code on the
+    model side. `SandboxedCodeExecutor` (`helpers/sandbox.py`) runs it
+    here, next to our data, in a pool of Python worker processes that
+    are started up front and kept warm: resource limits, no network,
+    writes only to a scratch directory, and a timeout after which the
+    worker is killed and replaced. A snippet costs a pipe round trip
+    instead of an interpreter start:
+    `python -m benchmarks.code_executor`.
+    """)
+    return
+
+
+@app.cell
+def _(calculation_agent):
+    local_calculation_agent = calculation_agent.clone(
+        update={
+            "name": "LocalCalculationAgent",
+            "instruction": calculation_agent.instruction
+            + """
+        Once your code has run, reply with only the value it printed.
+        """,
+            "code_executor": SandboxedCodeExecutor(pool_size=2, timeout=10),
+        }
+    )
+    return (local_calculation_agent,)
+
+
+@app.cell
+async def _(local_calculation_agent, usage_tracker):
+    local_calculation_runner = InMemoryRunner(
+        agent=local_calculation_agent, plugins=[usage_tracker]
+    )
+    local_calculation_response = await local_calculation_runner.run_debug(
+        "Calculate 1250 USD minus a 1% fee, converted at 83.58 INR per USD."
+    )
+    # The code and its output come back as executable_code and
+    # code_execution_result parts rather than a tool response
+    for _part in EventIndex(local_calculation_response).code_parts:
+        if _part.executable_code:
+            print("Generated Python Code >> ", _part.executable_code.code)
+        else:
+            print("Sandbox Output >> ", _part.code_execution_result.output)
+    print(f"🧪 Sandbox pool: {local_calculation_agent.code_executor.stats()}")
+    return
+
+
+@app.cell
+def _():
+    mo.md("""
+    ### Batch conversions
+
+    Converting one transaction costs the enhanced agent about three
+    round trips (fee, rate, calculation). For many transactions that
+    doesn't scale, so `convert_batch` (in `helpers/currency.py`) takes
+    the transactions as parallel lists and computes every fee and
+    converted amount in one vectorized NumPy pass, returning per
+    currency pair totals and a short preview table. 100k transactions
+    is one tool call: `python -m benchmarks.convert_batch`.
+    """)
+    return
+
+
+@app.cell
+def _(response_cache, retry_config):
+    batch_currency_agent = LlmAgent(
+        name="batch_currency_agent",
+        model=CachedLlm(
+            llm=LimitedLlm(
+                llm=model_registry.gemini(
+                    "gemini-2.5-flash-lite",
+                    retry_options=retry_config,
+                )
+            ),
+            cache=response_cache,
+        ),
+        instruction="""
+        You are a currency conversion assistant for batches of
+        transactions.
+
+        1. Put every transaction into ONE call to `convert_batch()`:
+            the amounts, base currencies, target currencies and payment
+            methods as parallel lists, in the order the user gave them.
+        2. Do not do any arithmetic yourself; the tool computes the fees
+            and converted amounts.
+        3. Report the converted amount of each transaction and the
+            totals per currency pair from the tool's response.
+        4. If the status is "partial" or "error", list the transactions
+            in "errors" and explain why they could not be converted.
+        """,
+        tools=[convert_batch],
+    )
+
+    print("✅ Batch currency agent created")
+    return (batch_currency_agent,)
+
+
+@app.cell
+async def _(batch_currency_agent, response_cache, usage_tracker):
+    batch_runner = InMemoryRunner(agent=batch_currency_agent, plugins=[usage_tracker])
+    _ = await batch_runner.run_debug(
+        "Convert these: 500 USD to EUR with my Platinum Credit Card, "
+        "1,250 USD to INR by Bank Transfer, and 80 USD to JPY with my "
+        "Gold Debit Card."
+    )
+    print(f"🗄️ Response cache: {response_cache.stats()}")
+    return
+
+
+@app.cell
+def _():
+    # The same tool on 100k transactions, called directly
+    _n = 100_000
+    _start = time.perf_counter()
+    _result = convert_batch(
+        amounts=[100.0 + _i % 4900 for _i in range(_n)],
+        base_currencies=["USD"] * _n,
+        target_currencies=[("EUR", "JPY", "INR")[_i % 3] for _i in range(_n)],
+        methods=[
+            ("platinum credit card", "gold debit card", "bank transfer")[_i % 3]
+            for _i in range(_n)
+        ],
+    )
+    print(
+        f"✅ {_result['converted_count']:,} transactions converted in "
+        f"{(time.perf_counter() - _start) * 1e3:.0f} ms"
+    )
+    print(f"💱 Totals: {_result['totals']}")
+    return
+
+
 @app.cell
 def _():
     mo.md("""
@@ -542,14 +760,23 @@ def _():
 
     For prod you would use servers for Google Maps, Slack, Discord
     etc...
+
+    `PooledMcpToolset` is a drop-in for `McpToolset` that borrows a warm
+    server from a process-wide pool (`helpers/mcp_pool.py`) instead of
+    spawning a new `npx` process per toolset. Only the first runner pays
+    for npx/Node startup. Its tool list comes from a cached catalog
+    (`helpers/mcp_catalog.py`, snapshot in `.cache/mcp_tools.json`) that
+    is dropped when the server sends `tools/list_changed`, so sessions
+    skip the `tools/list` round trip. Compare with
+    `python -m benchmarks.mcp_pool`.
     """)
     return
 
 
 @app.cell
-def _(McpToolset, StdioConnectionParams, StdioServerParameters):
+def _(StdioConnectionParams, StdioServerParameters):
     # MCP integration with Everything Server
-    mcp_image_server = McpToolset(
+    mcp_image_server = PooledMcpToolset(
         connection_params=StdioConnectionParams(
             server_params=StdioServerParameters(
                 command="npx",  # Run MCP server via npx
@@ -557,31 +784,44 @@ def _(McpToolset, StdioConnectionParams, StdioServerParameters):
                     "-y",  # Argument for npx to auto-confirm install
                     "@modelcontextprotocol/server-everything",
                 ],
-                tool_filter=["getTinyImage"],
             ),
             timeout=30,
-        )
+        ),
+        # On the toolset: the server parameters ignore it
+        tool_filter=["getTinyImage"],
     )
 
     print("✅ MCP Tool created")
+    print(f"   - MCP pool: {mcp_pool.stats()}")
+    print(f"   - Tool catalog: {tool_catalog.stats()}")
     return (mcp_image_server,)
 
 
 @app.cell
 def _(mcp_image_server, retry_config):
+    # Images returned by the MCP tool are decoded once into the blob store;
+    # the events (and the model context) only keep a small handle
+    blobs = BlobStore()
+
     # Create image agent with MCP integration
     image_agent = LlmAgent(
-        model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+        model=LimitedLlm(
+            llm=model_registry.gemini(
+                "gemini-2.5-flash-lite",
+                retry_options=retry_config,
+            )
+        ),
         name="image_agent",
         instruction="Use the MCP Tool to generate images for user queries",
         tools=[mcp_image_server],
+        after_tool_callback=blobs.offload,
     )
-    return (image_agent,)
+    return blobs, image_agent
 
 
 @app.cell
-def _(image_agent):
-    mcp_runner = InMemoryRunner(agent=image_agent)
+def _(image_agent, usage_tracker):
+    mcp_runner = InMemoryRunner(agent=image_agent, plugins=[usage_tracker])
     return (mcp_runner,)
 
 
@@ -594,19 +834,12 @@ async def _(mcp_runner):
 
 
 @app.cell
-def _(image_response):
+def _(blobs, image_response):
     from IPython.display import display, Image as IPImage
-    import base64
 
-    for event in image_response:
-        if event.content and event.content.parts:
-            for part in event.content.parts:
-                if hasattr(part, "function_response") and part.function_response:
-                    for item in part.function_response.response.get(
-                        "content", []
-                    ):
-                        if item.get("type") == "image":
-                            display(IPImage(data=base64.b64decode(item["data"])))
+    for item in EventIndex(image_response).images:
+        display(IPImage(data=blobs.read(item)))
+    print(f"✅ Blob store: {blobs.stats()}")
     return
 
 
@@ -619,8 +852,8 @@ def _():
 
 
 @app.cell
-def _(McpToolset, StdioConnectionParams, StdioServerParameters):
-    kaggle_server = McpToolset(
+def _(StdioConnectionParams, StdioServerParameters):
+    kaggle_server = PooledMcpToolset(
         connection_params=StdioConnectionParams(
             server_params=StdioServerParameters(
                 command="npx",
@@ -641,14 +874,14 @@ def _():
 
 
 @app.cell
-def _(McpToolset):
+def _():
     from google.adk.tools.mcp_tool.mcp_session_manager import (
         StreamableHTTPServerParams,
     )
 
     GITHUB_TOKEN = "THIS_ISNT_REAL_NOTHING_IS_REAL"
 
-    github_server = McpToolset(
+    github_server = PooledMcpToolset(
         connection_params=StreamableHTTPServerParams(
             url="https://api.githubcopilot.com/mcp/",
             headers={
@@ -750,7 +983,12 @@ def _(FunctionTool, place_shipping_order, retry_config):
     # Create shipping agent with pausable tool
     shipping_agent = LlmAgent(
         name="shipping_agent",
-        model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+        model=LimitedLlm(
+            llm=model_registry.gemini(
+                "gemini-2.5-flash-lite",
+                retry_options=retry_config,
+            )
+        ),
         instruction="""You are a shipping coordinator assistant.
 
       When users request to ship containers:
@@ -778,12 +1016,13 @@ def _():
 
 
 @app.cell
-def _(App, ResumabilityConfig, shipping_agent):
+def _(App, ResumabilityConfig, shipping_agent, usage_tracker):
     # Wrap the agent in a resumable app - THIS IS THE KEY FOR LONG-RUNNING OPERATIONS!
     shipping_app = App(
         name="shipping_coordinator",
         root_agent=shipping_agent,
         resumability_config=ResumabilityConfig(is_resumable=True),
+        plugins=[usage_tracker],
     )
 
     print("✅ Resumable app created!")
@@ -792,7 +1031,9 @@ def _(App, ResumabilityConfig, shipping_agent):
 
 @app.cell
 def _(Runner, shipping_app):
-    session_service = InMemorySessionService()
+    # Paused orders outlive the notebook in the approval queue below, so
+    # their sessions have to as well, see helpers/sessions.py
+    session_service = SqliteSessionService(".cache/day02_shipping_sessions.sqlite")
 
     # Create runner with the resumable app
     shipping_runner = Runner(
@@ -816,31 +1057,20 @@ def _():
 def check_for_approval(events):
     """Check if events contain an approval request.
 
+    Args:
+        events: list of events, or an EventIndex built while streaming
+
     Returns:
         dict with approval details or None
     """
-    for event in events:
-        if event.content and event.content.parts:
-            for part in event.content.parts:
-                if (
-                    part.function_call
-                    and part.function_call.name == "adk_request_confirmation"
-                ):
-                    return {
-                        "approval_id": part.function_call.id,
-                        "invocation_id": event.invocation_id,
-                    }
-    return None
+    return EventIndex.of(events).approval()
 
 
 @app.function
 def print_agent_response(events):
-    """Print agent's text responses from events."""
-    for event in events:
-        if event.content and event.content.parts:
-            for part in event.content.parts:
-                if part.text:
-                    print(f"Agent > {part.text}")
+    """Print agent's text responses from events (list or EventIndex)."""
+    for text in EventIndex.of(events).texts:
+        print(f"Agent > {text}")
 
 
 @app.cell
@@ -884,7 +1114,8 @@ def _(create_approval_response, session_service, shipping_runner, uuid):
         )
 
         query_content = types.Content(role="user", parts=[types.Part(text=query)])
-        events = []
+        # Index the events as they arrive so the checks below don't rescan them
+        events = EventIndex()
 
         # -----------------------------------------------------------------------------------------------
         # -----------------------------------------------------------------------------------------------
@@ -892,7 +1123,7 @@ def _(create_approval_response, session_service, shipping_runner, uuid):
         async for event in shipping_runner.run_async(
             user_id="test_user", session_id=session_id, new_message=query_content
         ):
-            events.append(event)
+            events.add(event)
 
         # -----------------------------------------------------------------------------------------------
         # -----------------------------------------------------------------------------------------------
@@ -948,5 +1179,241 @@ async def _(run_shipping_workflow):
     return
 
 
+@app.cell
+def _():
+    mo.md("""
+    ### Batch shipping
+
+    `run_shipping_workflow` handles one order at a time. For a large
+    backlog of orders we run them concurrently against the same
+    `shipping_runner`, capped by a semaphore. Orders that need a human
+    decision don't block the batch: they land in an approval queue,
+    and `resume_approvals` resumes every order whose decision has
+    arrived in one go.
+    """)
+    return
+
+
+@app.cell
+def _(create_approval_response, session_service, shipping_runner, uuid):
+    async def run_shipping_batch(queries: list[str], concurrency: int = 32):
+        """Runs many shipping requests concurrently.
+
+        Args:
+            queries: User shipping requests, one per order
+            concurrency: Maximum number of orders in flight at once
+
+        Returns:
+            Tuple of (approval_queue, report). The queue holds one approval
+            dict per paused order; the report has the throughput (orders/sec)
+            and tail latency of the orders completed without approval, and
+            under "failed" the query and error of every order that raised.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        approval_queue = asyncio.Queue()
+        latencies = []
+        failed = []
+
+        async def run_order(query: str):
+            # One failing order must not take the batch report with it
+            try:
+                await place_order(query)
+            except Exception as e:
+                failed.append({"query": query, "error": repr(e)})
+
+        async def place_order(query: str):
+            async with semaphore:
+                start = time.perf_counter()
+                session_id = f"order_{uuid.uuid4().hex[:8]}"
+                await session_service.create_session(
+                    app_name="shipping_coordinator",
+                    user_id="test_user",
+                    session_id=session_id,
+                )
+                query_content = types.Content(
+                    role="user", parts=[types.Part(text=query)]
+                )
+                events = EventIndex()
+                async for event in shipping_runner.run_async(
+                    user_id="test_user",
+                    session_id=session_id,
+                    new_message=query_content,
+                ):
+                    events.add(event)
+
+                approval_info = check_for_approval(events)
+                if approval_info:
+                    approval_queue.put_nowait(
+                        {**approval_info, "session_id": session_id, "query": query}
+                    )
+                else:
+                    latencies.append(time.perf_counter() - start)
+
+        batch_start = time.perf_counter()
+        await asyncio.gather(*(run_order(query) for query in queries))
+        report = latency_summary(latencies, time.perf_counter() - batch_start)
+        return approval_queue, {**report, "failed": failed}
+
+
+    async def resume_approvals(
+        approval_queue: asyncio.Queue, decide, concurrency: int = 32
+    ):
+        """Resumes every queued order that has a decision.
+
+        Args:
+            approval_queue: Queue filled by run_shipping_batch
+            decide: Called with each queued approval dict, returns True to
+                approve, False to reject or None if no decision has arrived
+            concurrency: Maximum number of orders resumed at once
+
+        Returns:
+            Throughput and tail latency of the resumed orders, and under
+            "failed" the query and error of every resume that raised.
+            Orders without a decision yet are put back on the queue.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+        failed = []
+
+        async def resume_order(approval_info: dict, approved: bool):
+            try:
+                await resume_one(approval_info, approved)
+            except Exception as e:
+                failed.append({"query": approval_info["query"], "error": repr(e)})
+
+        async def resume_one(approval_info: dict, approved: bool):
+            async with semaphore:
+                start = time.perf_counter()
+                async for _event in shipping_runner.run_async(
+                    user_id="test_user",
+                    session_id=approval_info["session_id"],
+                    new_message=create_approval_response(approval_info, approved),
+                    invocation_id=approval_info["invocation_id"],
+                ):
+                    pass
+                latencies.append(time.perf_counter() - start)
+
+        ready, waiting = [], []
+        while not approval_queue.empty():
+            approval_info = approval_queue.get_nowait()
+            approved = decide(approval_info)
+            if approved is None:
+                waiting.append(approval_info)
+            else:
+                ready.append((approval_info, approved))
+        for approval_info in waiting:
+            approval_queue.put_nowait(approval_info)
+
+        batch_start = time.perf_counter()
+        await asyncio.gather(*(resume_order(*decision) for decision in ready))
+        report = latency_summary(latencies, time.perf_counter() - batch_start)
+        return {**report, "failed": failed}
+
+
+    print("✅ Batch workflow functions ready")
+    return resume_approvals, run_shipping_batch
+
+
+@app.cell
+async def _(resume_approvals, run_shipping_batch):
+    # Demo: a mixed batch of small (auto-approved) and large orders
+    batch_queries = [
+        f"Ship {n} containers to Port {i}"
+        for i, n in enumerate([2, 4, 7, 3, 9, 12, 1, 6], start=1)
+    ]
+    approval_queue, batch_report = await run_shipping_batch(batch_queries)
+    print(f"📦 Completed without approval: {batch_report}")
+    print(f"⏸️  Waiting for approval: {approval_queue.qsize()} orders")
+
+    # Simulate the human decisions arriving: approve everything
+    resume_report = await resume_approvals(approval_queue, lambda info: True)
+    print(f"✅ Resumed after approval: {resume_report}")
+    return
+
+
+@app.cell
+def _():
+    mo.md("""
+    ### Approval queue
+
+    The batch above still keeps the paused orders in memory until the
+    decisions come back. With `ApprovalQueue` the request handler only
+    records the pending `adk_request_confirmation` call (with its
+    `invocation_id`) in SQLite and returns straight away. Reviewers
+    write their decisions to the same file, and a separate pool of
+    workers resumes the decided invocations in batches. The shipping
+    sessions are in SQLite too, so orders left pending by an earlier
+    run can still be decided and resumed after a restart.
+    """)
+    return
+
+
+@app.cell
+def _(session_service, shipping_runner, uuid):
+    approvals_db = ApprovalQueue(".cache/shipping_approvals.sqlite")
+
+
+    async def submit_shipping_order(query: str) -> dict:
+        """Runs an order until it completes or pauses for approval.
+
+        Returns:
+            Dictionary with the session_id and, if the order paused, the
+            approval_ids queued for review
+        """
+        session_id = f"order_{uuid.uuid4().hex[:8]}"
+        await session_service.create_session(
+            app_name="shipping_coordinator", user_id="test_user", session_id=session_id
+        )
+        query_content = types.Content(role="user", parts=[types.Part(text=query)])
+        events = EventIndex()
+        async for event in shipping_runner.run_async(
+            user_id="test_user", session_id=session_id, new_message=query_content
+        ):
+            events.add(event)
+        # Write the paused session out before anyone can resume it
+        await session_service.flush()
+        approval_ids = approvals_db.enqueue_from_events(
+            events, "shipping_coordinator", "test_user", session_id
+        )
+        return {"session_id": session_id, "approval_ids": approval_ids}
+
+
+    print("✅ Approval queue ready")
+    return approvals_db, submit_shipping_order
+
+
+@app.cell
+async def _(approvals_db, shipping_runner, submit_shipping_order):
+    # Request path: submit orders, nothing waits on a human
+    for _query in ["Ship 7 containers to Oslo", "Ship 20 containers to Lima"]:
+        await submit_shipping_order(_query)
+
+    # Review: decide everything that is pending in one batch
+    _pending = approvals_db.entries("pending")
+    for _approval in _pending:
+        print(f"🤔 {_approval.hint}")
+    approvals_db.decide(
+        {
+            _approval.approval_id: _approval.payload["num_containers"] <= 10
+            for _approval in _pending
+        }
+    )
+
+    # Worker pool: resume the decided invocations
+    resumed = await run_approval_workers(
+        approvals_db, shipping_runner, workers=4, stop_when_idle=True
+    )
+    print(f"✅ Resumed {resumed} orders, queue: {approvals_db.stats()}")
+    return
+
+
+@app.cell
+def _(usage_tracker):
+    # Per-agent tokens and estimated cost of every runner above
+    print(usage_tracker.report())
+    usage_tracker.write_prometheus(".cache/day02_usage.prom")
+    return
+
+
 if __name__ == "__main__":
     app.run()
@@ -5,13 +5,19 @@ from typing import Any, Dict
 
 from google.adk.agents import Agent, LlmAgent
 from google.adk.apps.app import App, EventsCompactionConfig
-from google.adk.models.google_llm import Gemini
 from google.adk.sessions import DatabaseSessionService
 from google.adk.sessions import InMemorySessionService
 from google.adk.runners import Runner
 from google.adk.tools.tool_context import ToolContext
 from google.genai import types
 
+from helpers.compaction import RollingSummarizer, keep_latest_summary
+from helpers.model_registry import model_registry
+from helpers.ratelimit import LimitedLlm
+from helpers.sessions import get_or_create_session, session_service_from_url
+from helpers.streaming import stream_turn
+from helpers.usage import UsageTracker
+
 ### environment setup
 load_dotenv()
 
@@ -20,12 +26,12 @@ try:
 except Exception as e:
     print(f"Auth Error: Please make sure 'GOOGLE_API_KEY' is in environment. Details: {e}")
 
-retry_config = types.HttpRetryOptions(
-    attempts=5,  # Maximum retry attempts
-    exp_base=7,  # Delay multiplier
-    initial_delay=1,
-    http_status_codes=[429, 500, 503, 504],  # Retry on these HTTP errors
-)
+# A single attempt: retries, backoff and rate limits are handled by the
+# limiter shared by every model, see helpers/ratelimit.py
+retry_config = types.HttpRetryOptions(attempts=1)
+
+# Tokens, cost and time per agent for every runner, see helpers/usage.py
+usage_tracker = UsageTracker(jsonl_path=".cache/day03_usage.jsonl")
 
 
 # Day 3
@@ -41,18 +47,15 @@ async def run_session(
 ):
     print(f"\n ### Session: {session_name}")
 
-    # Get app name from the Runner
+    # Get app name and session service from the Runner
     app_name = runner_instance.app_name
+    session_service = runner_instance.session_service
 
-    # Attempt to create a new session or retrieve an existing one
-    try:
-        session = await session_service.create_session(
-            app_name=app_name, user_id=USER_ID, session_id=session_name
-        )
-    except:
-        session = await session_service.get_session(
-            app_name=app_name, user_id=USER_ID, session_id=session_name
-        )
+    # Retrieve the session, creating it on first use. Returning users hit
+    # the in-process handle cache or cost a single lookup.
+    session = await get_or_create_session(
+        session_service, app_name=app_name, user_id=USER_ID, session_id=session_name
+    )
 
     # Process queries if provided
     if user_queries:
@@ -67,18 +70,21 @@ async def run_session(
             # Convert the query string to the ADK Content format
             query = types.Content(role="user", parts=[types.Part(text=query)])
 
-            # Stream the agent's response asynchronously
-            async for event in runner_instance.run_async(
-                user_id=USER_ID, session_id=session.id, new_message=query
-            ):
-                # Check if the event contains valid content
-                if event.content and event.content.parts:
-                    # Filter out empty or "None" responses before printing
-                    if (
-                        event.content.parts[0].text != "None"
-                        and event.content.parts[0].text
-                    ):
-                        print(f"{MODEL_NAME} > ", event.content.parts[0].text)
+            # Stream the agent's response as it is generated: text chunks are
+            # printed as soon as they arrive, tool calls/results as they happen
+            stream = stream_turn(runner_instance, USER_ID, session.id, query)
+            print(f"{MODEL_NAME} > ", end="")
+            async for delta in stream:
+                if delta.kind == "text":
+                    print(delta.text, end="", flush=True)
+                else:
+                    print(f"\n   [{delta.kind}] {delta.name}: {delta.data}")
+            print()
+            if stream.time_to_first_token is not None:
+                print(
+                    f"   ⏱️ first token {stream.time_to_first_token:.2f}s,"
+                    f" full turn {stream.elapsed:.2f}s"
+                )
     else:
         print("No queries!")
 
@@ -89,14 +95,32 @@ SESSION = "deault"
 
 MODEL_NAME = "gemini-2.5-flash-lite"
 
+# compaction: every COMPACTION_INTERVAL turns the older history is folded
+# into a running summary, so the prompt doesn't grow with the conversation
+COMPACTION_INTERVAL = 10
+COMPACTION_OVERLAP = 1
+
 # step 1: create the LLM Agent
 root_agent = Agent(
-    model=Gemini(
-        model= MODEL_NAME,
-        retry_options=retry_config
+    model=LimitedLlm(
+        llm=model_registry.gemini(MODEL_NAME, retry_options=retry_config)
     ),
     name="text_chat_bot",
-    description="A text chatbot"
+    description="A text chatbot",
+    before_model_callback=keep_latest_summary,
+)
+
+# wrap the agent in an App so the runner compacts long sessions
+# (see python -m benchmarks.compaction for prompt size/latency over 500 turns)
+chatbot_app = App(
+    name=APP_NAME,
+    root_agent=root_agent,
+    events_compaction_config=EventsCompactionConfig(
+        compaction_interval=COMPACTION_INTERVAL,
+        overlap_size=COMPACTION_OVERLAP,
+        summarizer=RollingSummarizer(llm=root_agent.canonical_model),
+    ),
+    plugins=[usage_tracker],
 )
 
 
@@ -107,12 +131,13 @@ session_service = InMemorySessionService()
 
 
 # step 3: Create the Runner
-runner = Runner(agent=root_agent, app_name=APP_NAME, session_service=session_service)
+runner = Runner(app=chatbot_app, session_service=session_service)
 
 print("✅ Stateful agent initialized!")
 print(f"   - Application: {APP_NAME}")
 print(f"   - User: {USER_ID}")
 print(f"   - Using: {session_service.__class__.__name__}")
+print(f"   - Compaction: every {COMPACTION_INTERVAL} turns")
 
 # testing our stateful agent
 # run a conversation with two queries in the same session
@@ -145,6 +170,38 @@ await run_session(
 #|DatabaseSessionService 	|Self-managed apps 	|✅ Survives restarts 	|Small to medium apps|
 #|Agent Engine Sessions 	|Production on GCP 	|✅ Fully managed 	|Enterprise scale|
 
+# helpers.sessions.SqliteSessionService is our self-managed option: pooled
+# SQLite connections in WAL mode, and each turn's events are written in one
+# transaction. session_service_from_url() swaps in DatabaseSessionService
+# for a postgresql:// URL. Compare the two with:
+#   python -m benchmarks.session_store --events 10000
+
+persistent_session_service = session_service_from_url(
+    "sqlite:///.cache/day03_sessions.sqlite"
+)
+persistent_runner = Runner(
+    app=chatbot_app, session_service=persistent_session_service
+)
+
+await run_session(
+    persistent_runner,
+    [
+        "Hi, I am asenetcky! What is the capital of United States?",
+        "Hello! What is my name?",
+    ],
+    "stateful-agentic-session",
+)
+
+# Restart and run only this: the conversation is still there
+await run_session(
+    persistent_runner,
+    ["What did I ask you about earlier?", "And remind me, what's my name?"],
+    "stateful-agentic-session",
+)
+
+# Tokens and estimated cost per agent of every turn above
+print(usage_tracker.report())
+
 
 
 
@@ -0,0 +1,6 @@
+"""Reusable helpers for the course notebooks.
+
+The notebooks (``day01.py``, ``day02.py``, ...) import from here so that
+the same building blocks can be shared between days and run outside of
+marimo.
+"""
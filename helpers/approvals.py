@@ -0,0 +1,337 @@
+"""Persistent approval queue for tools that call ``request_confirmation``.
+
+When a tool such as ``place_shipping_order`` asks for confirmation, the
+runner emits an ``adk_request_confirmation`` function call and the
+invocation pauses. Instead of keeping a coroutine alive until a human
+answers, the request handler records the pending call in an
+``ApprovalQueue`` and returns. Decisions are written to the queue as they
+come in, and a pool of workers (``run_approval_workers``) picks decided
+entries up in batches and resumes the paused invocations with
+``Runner.run_async(..., invocation_id=...)``.
+
+Entries move through ``pending`` -> ``decided`` -> ``resuming`` ->
+``done`` (or ``failed`` if the resume raised). A claim is a lease: an
+entry still ``resuming`` ``lease`` seconds after it was claimed (its
+worker died) is handed to the next worker that claims. Only the worker
+holding the claim can complete or fail an entry, so a worker whose
+lease ran out can't overwrite the outcome of the one that took over.
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+import uuid
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+
+from google.adk.events import Event
+from google.adk.runners import Runner
+from google.genai import types
+
+from helpers.events import REQUEST_CONFIRMATION, EventIndex
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Approval:
+    """One paused invocation waiting for (or holding) a decision."""
+
+    approval_id: str
+    invocation_id: str
+    app_name: str
+    user_id: str
+    session_id: str
+    status: str
+    approved: bool | None = None
+    hint: str | None = None
+    payload: dict | None = None
+    result: str | None = None
+
+
+class ApprovalQueue:
+    """SQLite-backed queue of pending ``adk_request_confirmation`` calls.
+
+    The file is opened in WAL mode so that request handlers, reviewers
+    and workers can share it from different processes.
+
+    Args:
+        path: SQLite file to use, created if missing.
+        lease: Seconds a worker has to resume a claimed entry before
+            it can be claimed again; keep it above the slowest resume.
+    """
+
+    def __init__(
+        self, path: str | Path = ".cache/approvals.sqlite", lease: float = 300.0
+    ):
+        self.path = Path(path)
+        self.lease = lease
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS approvals (
+                approval_id TEXT PRIMARY KEY,
+                invocation_id TEXT NOT NULL,
+                app_name TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                session_id TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                approved INTEGER,
+                hint TEXT,
+                payload TEXT,
+                result TEXT,
+                worker TEXT,
+                created REAL NOT NULL,
+                decided REAL,
+                claimed_at REAL
+            )"""
+        )
+        columns = {
+            row["name"] for row in self._db.execute("PRAGMA table_info(approvals)")
+        }
+        if "claimed_at" not in columns:
+            # Queues created before claims were leased
+            self._db.execute("ALTER TABLE approvals ADD COLUMN claimed_at REAL")
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS approvals_status ON approvals (status, decided)"
+        )
+
+    def enqueue_from_events(
+        self,
+        events: Iterable[Event] | EventIndex,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+    ) -> list[str]:
+        """Records every confirmation request found in ``events``.
+
+        Returns:
+            The approval ids that were added (empty if nothing paused).
+        """
+        approval_ids = []
+        for event, call in EventIndex.of(events).calls(REQUEST_CONFIRMATION):
+            confirmation = call.args.get("toolConfirmation", {})
+            self._db.execute(
+                """INSERT OR IGNORE INTO approvals
+                (approval_id, invocation_id, app_name, user_id, session_id,
+                 hint, payload, created)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (
+                    call.id,
+                    event.invocation_id,
+                    app_name,
+                    user_id,
+                    session_id,
+                    confirmation.get("hint"),
+                    json.dumps(confirmation.get("payload")),
+                    time.time(),
+                ),
+            )
+            approval_ids.append(call.id)
+        return approval_ids
+
+    def decide(self, decisions: dict[str, bool]) -> int:
+        """Records human decisions, keyed by approval id (True = approve).
+
+        Only ``pending`` entries are updated, so replaying a decision is a
+        no-op.
+
+        Returns:
+            Number of entries that were decided.
+        """
+        now = time.time()
+        cursor = self._db.executemany(
+            """UPDATE approvals SET status = 'decided', approved = ?, decided = ?
+            WHERE approval_id = ? AND status = 'pending'""",
+            [
+                (approved, now, approval_id)
+                for approval_id, approved in decisions.items()
+            ],
+        )
+        return cursor.rowcount
+
+    def claim(self, limit: int, worker: str) -> list[Approval]:
+        """Atomically takes up to ``limit`` decided entries for ``worker``.
+
+        Entries whose lease ran out are taken along with decided ones.
+        """
+        now = time.time()
+        rows = self._db.execute(
+            """UPDATE approvals SET status = 'resuming', worker = ?, claimed_at = ?
+            WHERE approval_id IN (
+                SELECT approval_id FROM approvals
+                WHERE status = 'decided'
+                   OR (status = 'resuming' AND claimed_at < ?)
+                ORDER BY decided LIMIT ?
+            )
+            RETURNING *""",
+            (worker, now, now - self.lease, limit),
+        ).fetchall()
+        return [self._to_approval(row) for row in rows]
+
+    def complete(
+        self, approval_id: str, worker: str, result: str | None = None
+    ) -> bool:
+        """Marks an entry ``worker`` resumed as done, with the agent's final text.
+
+        Returns:
+            False if ``worker`` no longer holds the claim (its lease ran
+            out and another worker took the entry); nothing is changed.
+        """
+        return self._finish(approval_id, worker, "done", result)
+
+    def fail(self, approval_id: str, worker: str, error: str) -> bool:
+        """Marks an entry ``worker`` claimed as failed, keeping the error.
+
+        Returns:
+            False if ``worker`` no longer holds the claim; nothing is
+            changed.
+        """
+        return self._finish(approval_id, worker, "failed", error)
+
+    def _finish(
+        self, approval_id: str, worker: str, status: str, result: str | None
+    ) -> bool:
+        cursor = self._db.execute(
+            """UPDATE approvals SET status = ?, result = ?
+            WHERE approval_id = ? AND worker = ? AND status = 'resuming'""",
+            (status, result, approval_id, worker),
+        )
+        return cursor.rowcount > 0
+
+    def entries(self, status: str = "pending") -> list[Approval]:
+        """Entries in the given status, oldest first."""
+        rows = self._db.execute(
+            "SELECT * FROM approvals WHERE status = ? ORDER BY created", (status,)
+        ).fetchall()
+        return [self._to_approval(row) for row in rows]
+
+    def stats(self) -> dict[str, int]:
+        """Number of entries per status."""
+        rows = self._db.execute(
+            "SELECT status, COUNT(*) FROM approvals GROUP BY status"
+        ).fetchall()
+        return {status: count for status, count in rows}
+
+    @staticmethod
+    def _to_approval(row: sqlite3.Row) -> Approval:
+        return Approval(
+            approval_id=row["approval_id"],
+            invocation_id=row["invocation_id"],
+            app_name=row["app_name"],
+            user_id=row["user_id"],
+            session_id=row["session_id"],
+            status=row["status"],
+            approved=None if row["approved"] is None else bool(row["approved"]),
+            hint=row["hint"],
+            payload=json.loads(row["payload"]) if row["payload"] else None,
+            result=row["result"],
+        )
+
+
+def confirmation_response(approval: Approval) -> types.Content:
+    """Builds the user message that answers a confirmation request."""
+    return types.Content(
+        role="user",
+        parts=[
+            types.Part(
+                function_response=types.FunctionResponse(
+                    id=approval.approval_id,
+                    name=REQUEST_CONFIRMATION,
+                    response={"confirmed": approval.approved},
+                )
+            )
+        ],
+    )
+
+
+async def resume(runner: Runner, approval: Approval) -> str:
+    """Resumes one paused invocation and returns the agent's final text."""
+    texts = []
+    async for event in runner.run_async(
+        user_id=approval.user_id,
+        session_id=approval.session_id,
+        new_message=confirmation_response(approval),
+        invocation_id=approval.invocation_id,
+    ):
+        if event.content and event.content.parts:
+            texts.extend(part.text for part in event.content.parts if part.text)
+    return "\n".join(texts)
+
+
+async def approval_worker(
+    queue: ApprovalQueue,
+    runner: Runner,
+    batch_size: int = 32,
+    poll_interval: float = 0.5,
+    stop_when_idle: bool = False,
+) -> int:
+    """Resumes decided entries in batches until cancelled.
+
+    Each round claims up to ``batch_size`` decided entries and resumes
+    them concurrently. Entries whose resume raises are marked ``failed``.
+    A resume that finishes after the lease ran out and another worker
+    took the entry is logged and not counted.
+
+    Args:
+        queue: The shared approval queue.
+        runner: Runner for the app that owns the paused invocations.
+        batch_size: Maximum number of invocations resumed per round.
+        poll_interval: Seconds to wait when there is nothing to resume.
+        stop_when_idle: Return instead of polling once the queue is drained.
+
+    Returns:
+        Number of invocations this worker resumed.
+    """
+    worker = f"worker_{uuid.uuid4().hex[:8]}"
+    resumed = 0
+
+    async def resume_one(approval: Approval) -> bool:
+        try:
+            result = await resume(runner, approval)
+        except Exception as e:
+            queue.fail(approval.approval_id, worker, repr(e))
+            raise
+        if not queue.complete(approval.approval_id, worker, result):
+            logger.warning(
+                "Approval %s was claimed by another worker after %s's lease "
+                "ran out; its result was dropped",
+                approval.approval_id,
+                worker,
+            )
+            return False
+        return True
+
+    while True:
+        batch = queue.claim(batch_size, worker)
+        if not batch:
+            if stop_when_idle:
+                return resumed
+            await asyncio.sleep(poll_interval)
+            continue
+        results = await asyncio.gather(
+            *(resume_one(approval) for approval in batch), return_exceptions=True
+        )
+        resumed += sum(result is True for result in results)
+
+
+async def run_approval_workers(
+    queue: ApprovalQueue, runner: Runner, workers: int = 4, **kwargs
+) -> int:
+    """Runs a pool of ``approval_worker`` tasks and waits for all of them.
+
+    Keyword arguments are passed to each worker; use
+    ``stop_when_idle=True`` to drain the queue once and return.
+
+    Returns:
+        Total number of invocations resumed.
+    """
+    counts = await asyncio.gather(
+        *(approval_worker(queue, runner, **kwargs) for _ in range(workers))
+    )
+    return sum(counts)
@@ -0,0 +1,166 @@
+"""Safe, exact evaluation of closed-form arithmetic for agent tools.
+
+``enhanced_currency_agent`` hands every calculation to
+``calculation_agent``, which costs a full extra model call (plus a code
+execution round trip) just to compute ``amount * (1 - fee) * rate``.
+``calculate`` evaluates such expressions locally instead: the expression
+is parsed with ``ast`` and only numbers, ``+ - * / // % **``, parentheses,
+unary signs and ``round``/``abs``/``min``/``max`` calls are accepted.
+Everything else (names, attributes, subscripts, comprehensions, ...) is
+rejected before anything is evaluated, so model-written input can't run
+code.
+
+Numbers are parsed from their source text into ``Decimal``, so
+``0.1 + 0.2`` is exactly ``0.3`` and money amounts don't pick up binary
+floating point error. ``//`` and ``%`` floor like Python's rather than
+truncating like ``Decimal``'s, so ``-7 % 3`` is ``2``.
+"""
+
+import ast
+import decimal
+from collections.abc import Callable
+from decimal import Decimal
+
+PRECISION = 28  # significant digits, decimal's default
+MAX_LENGTH = 500  # characters; anything longer isn't a formula
+MAX_EXPONENT = 1000
+
+
+def _floor_div(a: Decimal, b: Decimal) -> Decimal:
+    # Decimal's // truncates towards zero; Python floors (-7 // 2 == -4)
+    quotient = a // b
+    if a % b and (a < 0) != (b < 0):
+        quotient -= 1
+    return quotient
+
+
+def _mod(a: Decimal, b: Decimal) -> Decimal:
+    # Decimal's % takes the sign of a; Python's that of b (-7 % 3 == 2)
+    if not b:
+        raise ZeroDivisionError("Division by zero")
+    remainder = a % b
+    if remainder and (remainder < 0) != (b < 0):
+        remainder += b
+    return remainder
+
+
+_BINARY_OPS: dict[type[ast.operator], Callable[[Decimal, Decimal], Decimal]] = {
+    ast.Add: lambda a, b: a + b,
+    ast.Sub: lambda a, b: a - b,
+    ast.Mult: lambda a, b: a * b,
+    ast.Div: lambda a, b: a / b,
+    ast.FloorDiv: _floor_div,
+    ast.Mod: _mod,
+    ast.Pow: lambda a, b: a**b,
+}
+_UNARY_OPS: dict[type[ast.unaryop], Callable[[Decimal], Decimal]] = {
+    ast.UAdd: lambda a: +a,
+    ast.USub: lambda a: -a,
+}
+
+
+def _round(value: Decimal, places: Decimal = Decimal(0)) -> Decimal:
+    if places != places.to_integral_value():
+        raise ValueError("round() takes a whole number of decimal places")
+    return value.quantize(Decimal(1).scaleb(-int(places)), decimal.ROUND_HALF_EVEN)
+
+
+_FUNCTIONS: dict[str, Callable[..., Decimal]] = {
+    "round": _round,
+    "abs": abs,
+    "min": min,
+    "max": max,
+}
+
+
+class UnsafeExpressionError(ValueError):
+    """The expression uses syntax outside the arithmetic whitelist."""
+
+
+def _evaluate(node: ast.AST, source: str) -> Decimal:
+    if isinstance(node, ast.Expression):
+        return _evaluate(node.body, source)
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        # From the source text, so 0.1 stays 0.1 rather than the float
+        return Decimal(ast.get_source_segment(source, node).replace("_", ""))
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPS:
+        left = _evaluate(node.left, source)
+        right = _evaluate(node.right, source)
+        if isinstance(node.op, ast.Pow) and abs(right) > MAX_EXPONENT:
+            raise UnsafeExpressionError(f"Exponent {right} is too large")
+        return _BINARY_OPS[type(node.op)](left, right)
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+        return _UNARY_OPS[type(node.op)](_evaluate(node.operand, source))
+    if (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Name)
+        and node.func.id in _FUNCTIONS
+        and not node.keywords
+    ):
+        args = [_evaluate(arg, source) for arg in node.args]
+        return _FUNCTIONS[node.func.id](*args)
+    if isinstance(node, ast.Tuple):
+        raise UnsafeExpressionError(
+            "Commas are not allowed; write 1250 rather than 1,250"
+        )
+    segment = ast.get_source_segment(source, node) or type(node).__name__
+    raise UnsafeExpressionError(f"Unsupported syntax: {segment}")
+
+
+def evaluate(expression: str) -> Decimal:
+    """Evaluates an arithmetic expression exactly.
+
+    Raises:
+        UnsafeExpressionError: If the expression uses anything beyond
+            numbers, arithmetic operators and the whitelisted functions.
+        SyntaxError: If it isn't a valid expression.
+        ArithmeticError: On division by zero and other decimal errors.
+    """
+    if len(expression) > MAX_LENGTH:
+        raise UnsafeExpressionError(
+            f"Expression is longer than {MAX_LENGTH} characters"
+        )
+    source = expression.strip()
+    tree = ast.parse(source, mode="eval")
+    with decimal.localcontext() as context:
+        context.prec = PRECISION
+        return +_evaluate(tree, source)
+
+
+def calculate(expression: str) -> dict:
+    """
+    Evaluates an arithmetic expression exactly and returns the result.
+
+    Use this for any arithmetic, e.g. applying a fee and an exchange
+    rate: "1250 * (1 - 0.01) * 83.58". Supported: numbers, + - * / // %
+    **, parentheses, and round(x, places), abs, min and max.
+
+    Args:
+        expression: The arithmetic expression, with plain numbers (no
+            thousands separators, currency symbols or variables).
+
+    Returns:
+        Dictionary with status and result.
+        Success: {"status": "success", "expression": "...",
+                  "result": "103430.25"}
+        Error: {
+                "status": "error",
+                "error_message": "Unsupported syntax: ..."
+                }
+    """
+    try:
+        result = evaluate(expression)
+    except ZeroDivisionError:
+        return {"status": "error", "error_message": "Division by zero"}
+    except decimal.DecimalException as e:
+        # decimal's own messages are just the signal list
+        return {"status": "error", "error_message": f"Invalid: {type(e).__name__}"}
+    except (SyntaxError, ValueError, ArithmeticError, TypeError) as e:
+        return {"status": "error", "error_message": str(e) or type(e).__name__}
+    # Fixed-point notation, so 1e3 reads 1000 rather than 1E+3, unless
+    # that would spell out hundreds of zeros
+    if result.is_finite() and abs(result.adjusted()) < PRECISION:
+        text = format(result, "f")
+    else:
+        text = str(result)
+    return {"status": "success", "expression": expression, "result": text}
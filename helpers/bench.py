@@ -0,0 +1,196 @@
+"""Latency benchmarks for agent pipelines.
+
+Runs an agent tree through an ``InMemoryRunner`` several times and
+reports wall-time percentiles, event throughput and the time spent in
+each stage (agent, from its start to its end, as seen by a
+``StageTimer`` plugin). Combined with ``helpers.stub_model.ScriptedLlm``
+the numbers are pure runner/orchestration overhead.
+"""
+
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.plugins.base_plugin import BasePlugin
+from google.adk.runners import InMemoryRunner, Runner
+from google.genai import types
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Linearly interpolated percentile, ``pct`` in ``[0, 100]``."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def latency_summary(latencies: list[float], elapsed: float) -> dict:
+    """Throughput and tail latency for a batch of concurrent requests.
+
+    Args:
+        latencies: Per-request latency in seconds.
+        elapsed: Wall time of the whole batch in seconds.
+    """
+    return {
+        "count": len(latencies),
+        "per_sec": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+@dataclass
+class BenchResult:
+    """Raw timings collected by ``benchmark``."""
+
+    name: str
+    wall_times: list[float] = field(default_factory=list)
+    event_counts: list[int] = field(default_factory=list)
+    stage_times: dict[str, list[float]] = field(
+        default_factory=lambda: defaultdict(list)
+    )
+
+    def add_run(self, wall: float, events: int, stages: dict[str, float]) -> None:
+        self.wall_times.append(wall)
+        self.event_counts.append(events)
+        for stage, elapsed in stages.items():
+            self.stage_times[stage].append(elapsed)
+
+    def summary(self) -> dict:
+        """Percentiles (in milliseconds) and events per second."""
+        total_wall = sum(self.wall_times)
+        events_per_sec = sum(self.event_counts) / total_wall if total_wall else 0.0
+        return {
+            "name": self.name,
+            "runs": len(self.wall_times),
+            "p50_ms": percentile(self.wall_times, 50) * 1000,
+            "p95_ms": percentile(self.wall_times, 95) * 1000,
+            "p99_ms": percentile(self.wall_times, 99) * 1000,
+            "events_per_sec": events_per_sec,
+            "stages_p50_ms": {
+                stage: percentile(times, 50) * 1000
+                for stage, times in self.stage_times.items()
+            },
+        }
+
+
+class StageTimer(BasePlugin):
+    """Runner plugin timing every agent run from its start to its end.
+
+    Agents running in parallel are timed separately, and an agent that
+    runs more than once in a turn (in a loop) is charged every run.
+    """
+
+    def __init__(self, name: str = "stage_timer"):
+        super().__init__(name=name)
+        self.stages: dict[str, float] = defaultdict(float)
+        self._started: dict[tuple[str, str, str], float] = {}
+
+    @staticmethod
+    def _key(agent: BaseAgent, callback_context: CallbackContext) -> tuple:
+        return (
+            callback_context.invocation_id,
+            callback_context._invocation_context.branch or "",
+            agent.name,
+        )
+
+    async def before_agent_callback(
+        self, *, agent: BaseAgent, callback_context: CallbackContext
+    ) -> None:
+        self._started[self._key(agent, callback_context)] = time.perf_counter()
+
+    async def after_agent_callback(
+        self, *, agent: BaseAgent, callback_context: CallbackContext
+    ) -> None:
+        start = self._started.pop(self._key(agent, callback_context), None)
+        if start is not None:
+            self.stages[agent.name] += time.perf_counter() - start
+
+
+async def run_once(
+    runner: Runner, query: str, user_id: str = "bench_user"
+) -> tuple[float, int, dict[str, float]]:
+    """Runs one query in a fresh session.
+
+    Stages are timed by the runner's ``StageTimer`` if it has one;
+    otherwise each event author is timed from the start of the run to
+    its last event, which overstates agents that wait on others.
+
+    Returns:
+        ``(wall_seconds, event_count, seconds_per_stage)``
+    """
+    session = await runner.session_service.create_session(
+        app_name=runner.app_name,
+        user_id=user_id,
+        session_id=f"bench_{uuid.uuid4().hex[:8]}",
+    )
+    message = types.Content(role="user", parts=[types.Part(text=query)])
+    timer = runner.plugin_manager.get_plugin("stage_timer")
+    if timer is not None:
+        timer.stages.clear()
+    stages: dict[str, float] = {}
+    events = 0
+
+    start = time.perf_counter()
+    async for event in runner.run_async(
+        user_id=user_id, session_id=session.id, new_message=message
+    ):
+        stages[event.author] = time.perf_counter() - start
+        events += 1
+    wall = time.perf_counter() - start
+    return wall, events, dict(timer.stages) if timer is not None else stages
+
+
+async def benchmark(
+    agent: BaseAgent,
+    query: str,
+    runs: int = 20,
+    warmup: int = 1,
+    name: str | None = None,
+    plugins: list[BasePlugin] | None = None,
+) -> BenchResult:
+    """Runs ``agent`` ``runs`` times and collects timings.
+
+    Args:
+        agent: Root agent of the pipeline to measure.
+        query: User message sent on every run.
+        runs: Number of measured runs.
+        warmup: Runs executed first and left out of the results.
+        name: Label for the report, defaults to the agent's name.
+        plugins: Runner plugins, e.g. to measure their overhead.
+
+    Returns:
+        A ``BenchResult``; call ``.summary()`` for the aggregated numbers.
+    """
+    runner = InMemoryRunner(
+        agent=agent, app_name="bench", plugins=[*(plugins or []), StageTimer()]
+    )
+    result = BenchResult(name=name or agent.name)
+    for _ in range(warmup):
+        await run_once(runner, query)
+    for _ in range(runs):
+        result.add_run(*await run_once(runner, query))
+    return result
+
+
+def print_report(results: list[BenchResult]) -> None:
+    """Prints one line per pipeline followed by its per-stage breakdown."""
+    print(
+        f"{'pipeline':<24}{'runs':>6}{'p50 ms':>10}"
+        f"{'p95 ms':>10}{'p99 ms':>10}{'events/s':>12}"
+    )
+    for result in results:
+        s = result.summary()
+        print(
+            f"{s['name']:<24}{s['runs']:>6}{s['p50_ms']:>10.2f}"
+            f"{s['p95_ms']:>10.2f}{s['p99_ms']:>10.2f}{s['events_per_sec']:>12.0f}"
+        )
+        for stage, ms in s["stages_p50_ms"].items():
+            print(f"    {stage:<28}{ms:>10.2f} ms (p50)")
@@ -0,0 +1,144 @@
+"""Out-of-band storage for binary tool outputs (MCP images, audio).
+
+MCP tools return images as base64 strings inside the function response,
+so every image is kept (as text, a third bigger than the bytes) in the
+event, in the session history, and in every later model request. With
+``BlobStore.offload`` as the agent's ``after_tool_callback`` each binary
+item is decoded once into the store and replaced by a small handle:
+
+    {"type": "image", "mimeType": "image/png", "blob": "blob:sha256:...", "size": 1234}
+
+Blobs are content-addressed, so the same image generated twice is stored
+once. Small blobs stay in memory; larger ones are written to a temp file
+and memory-mapped, so reading them back (``view``) doesn't copy them into
+the Python heap.
+"""
+
+import binascii
+import hashlib
+import mmap
+import tempfile
+from pathlib import Path
+from typing import Any
+
+BINARY_TYPES = ("image", "audio")
+HANDLE_PREFIX = "blob:sha256:"
+
+
+class BlobStore:
+    """Content-addressed store of decoded binary payloads.
+
+    Args:
+        spill_bytes: Blobs at least this big go to a memory-mapped file
+            instead of staying in memory.
+        directory: Where spilled blobs are written (a temp dir by default).
+    """
+
+    def __init__(
+        self, spill_bytes: int = 256 * 1024, directory: str | Path | None = None
+    ):
+        self.spill_bytes = spill_bytes
+        self._tmp = None
+        if directory is None:
+            self._tmp = tempfile.TemporaryDirectory(prefix="blobs-")
+            directory = self._tmp.name
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._blobs: dict[str, memoryview] = {}
+        self._maps: dict[str, mmap.mmap] = {}
+
+    def put(self, data: bytes | str) -> str:
+        """Stores raw bytes (or a base64 string) and returns its handle."""
+        if isinstance(data, str):
+            data = binascii.a2b_base64(data)
+        handle = HANDLE_PREFIX + hashlib.sha256(data).hexdigest()
+        if handle in self._blobs:
+            return handle
+
+        if len(data) < self.spill_bytes:
+            self._blobs[handle] = memoryview(data)
+            return handle
+        path = self.directory / handle.removeprefix(HANDLE_PREFIX)
+        path.write_bytes(data)
+        with path.open("rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps[handle] = mapped
+        self._blobs[handle] = memoryview(mapped)
+        return handle
+
+    def view(self, handle: str) -> memoryview:
+        """Zero-copy, read-only view of a blob.
+
+        The view is the caller's own: it stays valid after ``release``.
+        """
+        return self._blobs[handle][:]
+
+    def read(self, item: dict[str, Any]) -> bytes:
+        """Bytes of an MCP binary item, whether offloaded or still base64.
+
+        Lets display code handle both kinds of item, e.g.
+        ``IPImage(data=blobs.read(item))``.
+        """
+        if "blob" in item:
+            return self.view(item["blob"]).tobytes()
+        return binascii.a2b_base64(item["data"])
+
+    def release(self, handle: str) -> None:
+        """Drops a blob (and its file, if it was spilled)."""
+        view = self._blobs.pop(handle, None)
+        if view is not None:
+            view.release()
+        mapped = self._maps.pop(handle, None)
+        if mapped is not None:
+            try:
+                mapped.close()
+            except BufferError:
+                pass  # views handed out still use it, unmapped once they're gone
+            (self.directory / handle.removeprefix(HANDLE_PREFIX)).unlink(
+                missing_ok=True
+            )
+
+    def offload(self, tool, args, tool_context, tool_response) -> dict | None:
+        """``after_tool_callback`` that swaps binary MCP content for handles.
+
+        Returns the rewritten response, or ``None`` (keep the original) when
+        the tool returned no binary content.
+        """
+        if not isinstance(tool_response, dict):
+            return None
+        content = tool_response.get("content")
+        if not isinstance(content, list) or not any(
+            isinstance(item, dict)
+            and item.get("type") in BINARY_TYPES
+            and "data" in item
+            for item in content
+        ):
+            return None
+
+        items = []
+        for item in content:
+            if (
+                isinstance(item, dict)
+                and item.get("type") in BINARY_TYPES
+                and "data" in item
+            ):
+                handle = self.put(item["data"])
+                item = {key: value for key, value in item.items() if key != "data"}
+                item.update(blob=handle, size=len(self._blobs[handle]))
+            items.append(item)
+        return {**tool_response, "content": items}
+
+    def stats(self) -> dict[str, int]:
+        """Number of blobs, bytes held, and how many of them are mapped."""
+        return {
+            "blobs": len(self._blobs),
+            "bytes": sum(len(view) for view in self._blobs.values()),
+            "mapped": len(self._maps),
+        }
+
+    def close(self) -> None:
+        """Releases every blob and removes the temp directory."""
+        for handle in list(self._blobs):
+            self.release(handle)
+        if self._tmp is not None:
+            self._tmp.cleanup()
@@ -0,0 +1,149 @@
+"""Rolling-summary compaction for long-lived chat sessions.
+
+ADK's sliding-window compaction (``EventsCompactionConfig`` on an
+``App``) replaces every ``compaction_interval`` invocations with a model
+written summary. The stock summarizer only sees the events of the
+current window, so each summary stands alone and the prompt still grows
+by one summary per window.
+
+``RollingSummarizer`` folds the previous summary into the next one, so
+the latest summary always covers the whole conversation, and the
+``keep_latest_summary`` callback drops the older, now redundant ones from
+the request. The prompt is then bounded by one summary plus at most one
+window of raw turns, however long the session gets:
+
+    app = App(
+        name="chat",
+        root_agent=Agent(..., before_model_callback=keep_latest_summary),
+        events_compaction_config=EventsCompactionConfig(
+            compaction_interval=10,
+            overlap_size=1,
+            summarizer=RollingSummarizer(llm=model),
+        ),
+    )
+"""
+
+from collections import OrderedDict
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.apps.base_events_summarizer import BaseEventsSummarizer
+from google.adk.events import Event, EventActions
+from google.adk.events.event_actions import EventCompaction
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+
+SUMMARY_PREFIX = "Summary of the conversation so far:\n"
+
+PROMPT_TEMPLATE = (
+    "Update the running summary of a conversation between a user and an AI"
+    " agent with the new messages below. Keep names, facts the user shared,"
+    " decisions and open questions; drop small talk. Reply with the updated"
+    " summary only.\n\n"
+    "Current summary:\n{summary}\n\n"
+    "New messages:\n{conversation_history}"
+)
+
+
+def _is_summary(content: types.Content) -> bool:
+    # The runner re-attributes summaries as user context ("For context:
+    # [model] said: ..."), so look for the prefix in any part.
+    return any(SUMMARY_PREFIX in (part.text or "") for part in content.parts or [])
+
+
+class RollingSummarizer(BaseEventsSummarizer):
+    """Summarizes a window of events together with the previous summary.
+
+    The runner only passes the events of the window, so summaries are
+    remembered in process, keyed by the last invocation they cover. With
+    ``overlap_size >= 1`` the next window starts on that invocation, which
+    is how the previous summary is found. After a restart the first
+    window is summarized on its own and the chain starts again from there.
+
+    Args:
+        llm: Model used to write the summaries.
+        prompt_template: Template with ``{summary}`` and
+            ``{conversation_history}`` placeholders.
+        max_sessions: Number of summaries kept in memory.
+    """
+
+    def __init__(
+        self,
+        llm: BaseLlm,
+        prompt_template: str = PROMPT_TEMPLATE,
+        max_sessions: int = 1024,
+    ):
+        self.llm = llm
+        self.prompt_template = prompt_template
+        self.max_sessions = max_sessions
+        self._summaries: OrderedDict[str, str] = OrderedDict()
+
+    def _previous_summary(self, events: list[Event]) -> str:
+        for event in events:
+            summary = self._summaries.pop(event.invocation_id, None)
+            if summary is not None:
+                return summary
+        return "(none yet)"
+
+    async def maybe_summarize_events(self, *, events: list[Event]) -> Event | None:
+        if not events:
+            return None
+
+        history = "\n".join(
+            f"{event.author}: {part.text}"
+            for event in events
+            if event.content and event.content.parts
+            for part in event.content.parts
+            if part.text
+        )
+        prompt = self.prompt_template.format(
+            summary=self._previous_summary(events), conversation_history=history
+        )
+        llm_request = LlmRequest(
+            model=self.llm.model,
+            contents=[types.Content(role="user", parts=[types.Part(text=prompt)])],
+        )
+        summary = ""
+        async for response in self.llm.generate_content_async(llm_request):
+            if response.content and response.content.parts:
+                summary = "".join(part.text or "" for part in response.content.parts)
+                break
+        if not summary:
+            return None
+
+        self._summaries[events[-1].invocation_id] = summary
+        if len(self._summaries) > self.max_sessions:
+            self._summaries.popitem(last=False)
+
+        return Event(
+            author="user",
+            invocation_id=Event.new_id(),
+            actions=EventActions(
+                compaction=EventCompaction(
+                    start_timestamp=events[0].timestamp,
+                    end_timestamp=events[-1].timestamp,
+                    compacted_content=types.Content(
+                        role="model",
+                        parts=[types.Part(text=SUMMARY_PREFIX + summary)],
+                    ),
+                )
+            ),
+        )
+
+
+def keep_latest_summary(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> None:
+    """``before_model_callback`` that keeps only the newest summary.
+
+    Use it together with ``RollingSummarizer``: the newest summary already
+    includes everything the older ones said.
+    """
+    summaries = [
+        i for i, content in enumerate(llm_request.contents) if _is_summary(content)
+    ]
+    if len(summaries) > 1:
+        stale = set(summaries[:-1])
+        llm_request.contents = [
+            content for i, content in enumerate(llm_request.contents) if i not in stale
+        ]
@@ -0,0 +1,420 @@
+"""Exchange rates, payment fees and batch conversion for day02.
+
+``RateStore`` loads the rate and fee tables once from CSV files
+(``helpers/data`` by default) and indexes them, so a lookup is a couple
+of dict hits instead of rebuilding the tables on every tool call. Only
+rates against a pivot currency (USD) need to be listed: any cross pair,
+e.g. EUR/JPY, is triangulated through the pivot. Pairs listed directly
+win over triangulation. The files are re-read when they change, checked
+at most every ``check_interval`` seconds, so rates can be updated without
+restarting the notebook:
+
+    rate_store.rate("EUR", "JPY")  # 169.35...
+    rate_store.fee("Bank Transfer")  # 0.01
+
+``get_fee_for_payment_method`` and ``get_exchange_rate`` answer one lookup
+per tool call, and the agent then does the arithmetic itself (or through
+``calculation_agent``), so converting N transactions costs about 3N
+model/tool round trips. ``convert_batch`` takes the transactions as
+parallel arrays and computes every fee and converted amount in one
+vectorized NumPy pass:
+
+    convert_batch(
+        amounts=[500, 1250],
+        base_currencies=["USD", "USD"],
+        target_currencies=["EUR", "INR"],
+        methods=["platinum credit card", "bank transfer"],
+    )
+
+The lookups are done once per distinct method and currency pair (there
+are only a handful) and broadcast back onto the rows, so the cost per
+transaction is a few array operations rather than Python calls.
+"""
+
+import csv
+import os
+import threading
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+DATA_DIR = Path(__file__).parent / "data"
+RATES_PATH = DATA_DIR / "exchange_rates.csv"
+FEES_PATH = DATA_DIR / "payment_fees.csv"
+
+MEMO_SIZE = 65536  # memoized lookups kept per table before starting over
+
+_MISSING = object()
+
+
+class RateStore:
+    """Indexed exchange rate and payment fee tables, loaded once.
+
+    Lookups are memoized on the raw arguments, so a repeated lookup is a
+    single dict hit. A daemon thread watches the files and swaps in new
+    tables when they change; lookups never touch the file system.
+
+    Args:
+        rates_path: CSV with ``base,target,rate`` rows (units of target
+            per unit of base).
+        fees_path: CSV with ``method,fee_percentage`` rows.
+        pivot: Currency cross pairs are triangulated through.
+        check_interval: Seconds between checks for changed files; ``None``
+            never reloads.
+    """
+
+    def __init__(
+        self,
+        rates_path: str | Path = RATES_PATH,
+        fees_path: str | Path = FEES_PATH,
+        pivot: str = "USD",
+        check_interval: float | None = 1.0,
+    ):
+        self.rates_path = Path(rates_path)
+        self.fees_path = Path(fees_path)
+        self.pivot = pivot.upper()
+        self.check_interval = check_interval
+        self.reloads = 0
+        self._load(self._mtimes())
+        self._stopped = threading.Event()
+        if check_interval is not None:
+            threading.Thread(
+                target=self._watch, name="rate-store-watch", daemon=True
+            ).start()
+
+    def _mtimes(self) -> tuple[int, int]:
+        return (
+            os.stat(self.rates_path).st_mtime_ns,
+            os.stat(self.fees_path).st_mtime_ns,
+        )
+
+    def _load(self, mtimes: tuple[int, int]) -> None:
+        # Units of each currency per unit of the pivot, and listed pairs
+        per_pivot = {self.pivot: 1.0}
+        direct: dict[tuple[str, str], float] = {}
+        with self.rates_path.open(newline="") as f:
+            for row in csv.DictReader(f):
+                base = row["base"].strip().upper()
+                target = row["target"].strip().upper()
+                rate = float(row["rate"])
+                direct[base, target] = rate
+                direct.setdefault((target, base), 1 / rate)
+                if base == self.pivot:
+                    per_pivot[target] = rate
+                elif target == self.pivot:
+                    per_pivot.setdefault(base, 1 / rate)
+
+        with self.fees_path.open(newline="") as f:
+            fees = {
+                row["method"].strip().lower(): float(row["fee_percentage"])
+                for row in csv.DictReader(f)
+            }
+
+        # One assignment, so a lookup never sees half of a reload; the
+        # memo dicts start empty with each new set of tables
+        self._tables = (per_pivot, direct, fees, {}, {})
+        self._loaded_mtimes = mtimes
+
+    def check(self) -> bool:
+        """Reloads the tables if either file changed.
+
+        Returns:
+            Whether the tables were reloaded. A missing or half-written
+            file keeps the last good tables until the next check.
+        """
+        try:
+            mtimes = self._mtimes()
+            if mtimes == self._loaded_mtimes:
+                return False
+            self._load(mtimes)
+        except (OSError, KeyError, ValueError, ZeroDivisionError):
+            return False
+        self.reloads += 1
+        return True
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self.check_interval):
+            self.check()
+
+    def close(self) -> None:
+        """Stops watching the files."""
+        self._stopped.set()
+
+    def rate(self, base_currency: str, target_currency: str) -> float | None:
+        """Units of ``target_currency`` per unit of ``base_currency``.
+
+        Returns:
+            The rate, or ``None`` if either currency is unknown.
+        """
+        resolved = self._tables[3]
+        key = (base_currency, target_currency)
+        rate = resolved.get(key, _MISSING)
+        if rate is _MISSING:
+            if len(resolved) >= MEMO_SIZE:
+                resolved.clear()
+            rate = resolved[key] = self._resolve(
+                base_currency.strip().upper(), target_currency.strip().upper()
+            )
+        return rate
+
+    def _resolve(self, base: str, target: str) -> float | None:
+        per_pivot, direct = self._tables[:2]
+        rate = direct.get((base, target))
+        if rate is not None:
+            return rate
+        if base == target:
+            return 1.0
+        base_rate = per_pivot.get(base)
+        target_rate = per_pivot.get(target)
+        if base_rate is None or target_rate is None:
+            return None
+        return target_rate / base_rate
+
+    def fee(self, method: str) -> float | None:
+        """Fee percentage of a payment method, or ``None`` if unknown."""
+        fees, resolved = self._tables[2], self._tables[4]
+        fee = resolved.get(method, _MISSING)
+        if fee is _MISSING:
+            if len(resolved) >= MEMO_SIZE:
+                resolved.clear()
+            fee = resolved[method] = fees.get(method.strip().lower())
+        return fee
+
+    def stats(self) -> dict[str, int]:
+        """Table sizes and how many times the files were reloaded."""
+        per_pivot, direct, fees, _, _ = self._tables
+        return {
+            "currencies": len(per_pivot),
+            "listed_pairs": len(direct),
+            "methods": len(fees),
+            "reloads": self.reloads,
+        }
+
+
+rate_store = RateStore()
+
+COLUMNS = [
+    "index",
+    "amount",
+    "fee_percentage",
+    "fee",
+    "net_amount",
+    "rate",
+    "converted_amount",
+]
+PREVIEW_ROWS = 20  # rows (and errors) echoed back to the model
+
+
+def _factorize(values: list[str]) -> tuple[list[str], np.ndarray]:
+    """Distinct lower-cased values and each row's index into them.
+
+    A dict pass rather than ``np.unique``: it skips building a fixed-width
+    string array and sorting it, which is most of the cost at 100k rows.
+    """
+    codes: dict[str, int] = {}
+    index = np.array(
+        [codes.setdefault(value, len(codes)) for value in values], dtype=np.intp
+    )
+    # "USD" and "usd" are separate codes above; fold them together
+    names: dict[str, int] = {}
+    folded = np.array(
+        [names.setdefault(value.lower(), len(names)) for value in codes],
+        dtype=np.intp,
+    )
+    return list(names), folded[index]
+
+
+def _or_nan(value: float | None) -> float:
+    return np.nan if value is None else value
+
+
+def convert_arrays(
+    amounts: list[float] | np.ndarray,
+    base_currencies: list[str],
+    target_currencies: list[str],
+    methods: list[str],
+    store: RateStore | None = None,
+) -> dict[str, np.ndarray]:
+    """Vectorized fee and conversion for parallel transaction arrays.
+
+    Args:
+        store: Rate and fee tables, ``rate_store`` by default.
+
+    Returns:
+        One array per column in ``COLUMNS`` (``index`` aside), all the
+        length of the input, NaN where the row is invalid, plus a boolean
+        ``valid`` mask and ``pair`` codes indexing into ``pair_names``
+        ("USD/EUR").
+    """
+    store = store or rate_store
+    amount = np.asarray(amounts, dtype=np.float64)
+
+    method_names, method_index = _factorize(methods)
+    fee_percentage = np.array(
+        [_or_nan(store.fee(name)) for name in method_names], dtype=np.float64
+    )[method_index]
+
+    bases, base_index = _factorize(base_currencies)
+    targets, target_index = _factorize(target_currencies)
+    rate_matrix = np.array(
+        [[_or_nan(store.rate(base, target)) for target in targets] for base in bases],
+        dtype=np.float64,
+    ).reshape(len(bases), len(targets))
+    rate = rate_matrix[base_index, target_index]
+
+    fee = amount * fee_percentage
+    net_amount = amount - fee
+    converted_amount = net_amount * rate
+    pair_names = [f"{base}/{target}".upper() for base in bases for target in targets]
+    return {
+        "amount": amount,
+        "fee_percentage": fee_percentage,
+        "fee": fee,
+        "net_amount": net_amount,
+        "rate": rate,
+        "converted_amount": converted_amount,
+        "pair": base_index * len(targets) + target_index,
+        "pair_names": np.array(pair_names),
+        "valid": np.isfinite(converted_amount) & (amount >= 0),
+    }
+
+
+def _number(value: Any) -> float | None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _error_message(
+    columns: dict[str, np.ndarray],
+    index: int,
+    base_currencies: list[str],
+    target_currencies: list[str],
+    methods: list[str],
+) -> str:
+    if not np.isfinite(columns["amount"][index]) or columns["amount"][index] < 0:
+        return f"Invalid amount: {columns['amount'][index]}"
+    if np.isnan(columns["fee_percentage"][index]):
+        return f"Payment method '{methods[index]}' not found"
+    return (
+        "Unsupported currency pair: "
+        f"{base_currencies[index]}/{target_currencies[index]}"
+    )
+
+
+def convert_batch(
+    amounts: list[float],
+    base_currencies: list[str],
+    target_currencies: list[str],
+    methods: list[str],
+) -> dict:
+    """
+    Converts many transactions at once, applying each payment method's fee.
+
+    Use this instead of get_fee_for_payment_method and get_exchange_rate
+    whenever there is more than one transaction. The four lists are
+    parallel: entry i of each list describes transaction i.
+
+    Args:
+        amounts: Amount of each transaction, in its base currency.
+        base_currencies: ISO 4217 code each amount is in (e.g., "USD").
+        target_currencies: ISO 4217 code to convert each amount to.
+        methods: Payment method of each transaction, e.g.,
+            "platinum credit card" or "bank transfer".
+
+    Returns:
+        Dictionary with status, per currency pair totals, and a table.
+        Success: {
+                "status": "success",
+                "count": 2,
+                "totals": {"USD/EUR": {"count": 1, "amount": 500.0,
+                           "fee": 10.0, "converted_amount": 455.7}},
+                "columns": ["index", "amount", ...],
+                "rows": [[0, 500.0, 0.02, 10.0, 490.0, 0.93, 455.7]],
+                }
+        Rows that can't be converted are left out of the totals and
+        listed in "errors"; the status is then "partial" (or "error" if
+        no row could be converted). Only the first rows of the table are
+        returned, "count" and "totals" cover all of them.
+    """
+    count = len(amounts)
+    if not (len(base_currencies) == len(target_currencies) == len(methods) == count):
+        return {
+            "status": "error",
+            "error_message": (
+                "amounts, base_currencies, target_currencies and methods "
+                "must have the same length"
+            ),
+        }
+
+    try:
+        numbers = np.asarray(amounts, dtype=np.float64)
+    except (TypeError, ValueError):
+        bad = [
+            f"{amount!r} (index {index})"
+            for index, amount in enumerate(amounts)
+            if _number(amount) is None
+        ]
+        return {
+            "status": "error",
+            "error_message": (
+                f"amounts must be plain numbers such as 1250.5, got {', '.join(bad)}"
+            ),
+        }
+
+    columns = convert_arrays(numbers, base_currencies, target_currencies, methods)
+    valid = columns["valid"]
+    (valid_index,) = np.nonzero(valid)
+    (invalid_index,) = np.nonzero(~valid)
+
+    # Sums per currency pair, keyed on the pair codes
+    pairs = len(columns["pair_names"])
+    counts = np.bincount(columns["pair"][valid], minlength=pairs)
+    sums = {
+        name: np.bincount(
+            columns["pair"][valid], weights=columns[name][valid], minlength=pairs
+        )
+        for name in ("amount", "fee", "converted_amount")
+    }
+    totals = {
+        str(columns["pair_names"][code]): {
+            "count": int(counts[code]),
+            **{name: round(float(sums[name][code]), 2) for name in sums},
+        }
+        for code in np.nonzero(counts)[0]
+    }
+
+    preview = valid_index[:PREVIEW_ROWS]
+    table = np.column_stack(
+        [preview] + [columns[name][preview] for name in COLUMNS[1:]]
+    ).round(4)
+    rows = [[int(row[0]), *row[1:]] for row in table.tolist()]
+
+    if not len(invalid_index):
+        status = "success"
+    elif len(valid_index):
+        status = "partial"
+    else:
+        status = "error"
+    result: dict[str, Any] = {
+        "status": status,
+        "count": count,
+        "converted_count": len(valid_index),
+        "totals": totals,
+        "columns": COLUMNS,
+        "rows": rows,
+    }
+    if len(invalid_index):
+        result["error_count"] = len(invalid_index)
+        result["errors"] = [
+            {
+                "index": int(index),
+                "error_message": _error_message(
+                    columns, index, base_currencies, target_currencies, methods
+                ),
+            }
+            for index in invalid_index[:PREVIEW_ROWS]
+        ]
+    return result
@@ -0,0 +1,295 @@
+"""Running agent pipelines as a dependency graph instead of a fixed order.
+
+A ``SequentialAgent`` runs its stages one after the other even when a
+stage only needs some of the earlier ones: in day01 the blog writer needs
+``{blog_outline}`` but nothing from the research team, and a
+``ParallelAgent`` holds back everything after it until its slowest member
+is done. Stages of these pipelines talk to each other through state: one
+writes its ``output_key``, a later one reads it with a ``{placeholder}``
+in its instruction. ``DagAgent`` reads those dependencies off the agents
+and starts every stage as soon as the stages it depends on are done:
+
+    dag = dag_from(research_root_agent, root_agent3, name="DailyContent")
+    print(dag.dependencies())   # {'AggregatorAgent': ['TechResearcher', ...], ...}
+
+``dag_from`` flattens nested ``SequentialAgent``/``ParallelAgent`` trees
+into their stages; ``LoopAgent`` and custom agents stay single nodes. The
+order of ``sub_agents`` is the program order: a stage runs after the
+last earlier stage that writes a key it reads, and a stage that writes a
+key runs after the earlier stages that read or write it. That is all the
+ordering a ``SequentialAgent`` of the same stages guarantees for state,
+so the results are the same, only sooner.
+
+Each stage runs in its own branch, as in a ``ParallelAgent``: it sees the
+user's message and the state, not the other stages' conversation. Edges
+the templates don't show (a tool reading state, an ``InstructionProvider``)
+can be added with ``depends_on``. ``timings()`` gives the start and end
+of every stage of the last run, ``critical_path()`` the chain of stages
+that set its wall time.
+"""
+
+import asyncio
+import re
+import time
+from collections import defaultdict
+from collections.abc import AsyncGenerator, Iterator
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import Any
+
+from google.adk.agents import BaseAgent, LlmAgent, ParallelAgent, SequentialAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event
+from pydantic import Field, PrivateAttr
+
+_PLACEHOLDER = re.compile(r"{+[^{}]*}+")
+_STATE_PREFIXES = ("app:", "user:", "temp:")
+
+
+def template_keys(template: str) -> set[str]:
+    """State keys an instruction template reads, as ADK fills it in.
+
+    ``{key}`` and ``{key?}`` count, with or without an ``app:``, ``user:``
+    or ``temp:`` prefix; ``{artifact.name}`` and anything that isn't a
+    valid state name are left alone.
+    """
+    keys = set()
+    for match in _PLACEHOLDER.findall(template):
+        key = match.lstrip("{").rstrip("}").strip().removesuffix("?")
+        prefix, _, name = key.rpartition(":")
+        if (not prefix or f"{prefix}:" in _STATE_PREFIXES) and name.isidentifier():
+            keys.add(key)
+    return keys
+
+
+def _agents(agent: BaseAgent) -> Iterator[BaseAgent]:
+    yield agent
+    for sub_agent in agent.sub_agents:
+        yield from _agents(sub_agent)
+
+
+def reads(agent: BaseAgent) -> set[str]:
+    """State keys read by the instructions of ``agent`` and its sub-agents."""
+    keys = set()
+    for node in _agents(agent):
+        if isinstance(node, LlmAgent):
+            for template in (node.instruction, node.global_instruction):
+                if isinstance(template, str):
+                    keys |= template_keys(template)
+    return keys
+
+
+def writes(agent: BaseAgent) -> set[str]:
+    """``output_key``s of ``agent`` and its sub-agents."""
+    return {
+        node.output_key
+        for node in _agents(agent)
+        if isinstance(node, LlmAgent) and node.output_key
+    }
+
+
+@dataclass
+class NodeTiming:
+    """When a stage ran, in milliseconds since the ``DagAgent`` started."""
+
+    name: str
+    after: list[str]
+    start_ms: float
+    end_ms: float | None = None
+
+    @property
+    def elapsed_ms(self) -> float | None:
+        return None if self.end_ms is None else self.end_ms - self.start_ms
+
+
+class DagAgent(BaseAgent):
+    """Runs each sub-agent as soon as the sub-agents it depends on are done.
+
+    Dependencies are inferred from ``{placeholders}`` and ``output_key``s
+    in ``sub_agents`` order (see the module docstring), plus the explicit
+    ``depends_on`` edges.
+    """
+
+    depends_on: dict[str, list[str]] = Field(default_factory=dict)
+    """Extra edges, sub-agent name -> names it must wait for."""
+
+    _timings: dict[str, NodeTiming] = PrivateAttr(default_factory=dict)
+
+    def model_post_init(self, context: Any) -> None:
+        super().model_post_init(context)
+        names = {sub_agent.name for sub_agent in self.sub_agents}
+        if len(names) < len(self.sub_agents):
+            raise ValueError(f"Sub-agent names of `{self.name}` must be unique")
+        for name, after in self.depends_on.items():
+            unknown = ({name} | set(after)) - names
+            if unknown:
+                raise ValueError(f"depends_on names unknown sub-agents: {unknown}")
+        # Raises on a cycle
+        self.topological_order()
+
+    def dependencies(self) -> dict[str, list[str]]:
+        """Sub-agent name -> names of the sub-agents it waits for."""
+        position = {agent.name: i for i, agent in enumerate(self.sub_agents)}
+        last_writer: dict[str, str] = {}
+        readers: dict[str, set[str]] = defaultdict(set)
+        graph = {}
+        for agent in self.sub_agents:
+            agent_reads, agent_writes = reads(agent), writes(agent)
+            after = set(self.depends_on.get(agent.name, []))
+            for key in agent_reads | agent_writes:
+                if key in last_writer:
+                    after.add(last_writer[key])
+            for key in agent_writes:
+                # The earlier readers must see the previous value
+                after |= readers[key]
+            after.discard(agent.name)
+            graph[agent.name] = sorted(after, key=position.get)
+
+            for key in agent_reads:
+                readers[key].add(agent.name)
+            for key in agent_writes:
+                last_writer[key] = agent.name
+                readers[key] = set()
+        return graph
+
+    def topological_order(self) -> list[str]:
+        """Sub-agent names in an order that respects every dependency.
+
+        Raises:
+            ValueError: If ``depends_on`` makes the graph cyclic.
+        """
+        graph = self.dependencies()
+        waiting = {name: set(after) for name, after in graph.items()}
+        order = []
+        ready = [name for name, after in waiting.items() if not after]
+        while ready:
+            name = ready.pop(0)
+            order.append(name)
+            for other, after in waiting.items():
+                if name in after:
+                    after.discard(name)
+                    if not after:
+                        ready.append(other)
+        if len(order) < len(graph):
+            cyclic = sorted(set(graph) - set(order))
+            raise ValueError(f"Dependency cycle between {cyclic} in `{self.name}`")
+        return order
+
+    def timings(self) -> list[NodeTiming]:
+        """Per-stage timings of the last run, by start time."""
+        return sorted(self._timings.values(), key=lambda timing: timing.start_ms)
+
+    def critical_path(self) -> list[str]:
+        """Stages of the last run that set its wall time, first to last.
+
+        Walks back from the stage that finished last through whichever
+        of its dependencies finished last.
+        """
+        finished = [t for t in self._timings.values() if t.end_ms is not None]
+        if not finished:
+            return []
+        node = max(finished, key=lambda timing: timing.end_ms)
+        path = [node.name]
+        while node.after:
+            node = max(
+                (self._timings[name] for name in node.after),
+                key=lambda timing: timing.end_ms or 0.0,
+            )
+            path.append(node.name)
+        return path[::-1]
+
+    def _branch_ctx(
+        self, agent: BaseAgent, ctx: InvocationContext
+    ) -> InvocationContext:
+        ctx = ctx.model_copy()
+        suffix = f"{self.name}.{agent.name}"
+        ctx.branch = f"{ctx.branch}.{suffix}" if ctx.branch else suffix
+        return ctx
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        graph = self.dependencies()
+        agents = {agent.name: agent for agent in self.sub_agents}
+        waiting = {name: set(after) for name, after in graph.items()}
+        timings: dict[str, NodeTiming] = {}
+        self._timings = timings
+        # Every stage puts its events here; ``None`` marks a finished stage
+        queue: asyncio.Queue = asyncio.Queue()
+        start = time.perf_counter()
+
+        def now_ms() -> float:
+            return (time.perf_counter() - start) * 1000
+
+        async def run(agent: BaseAgent) -> None:
+            try:
+                async with aclosing(
+                    agent.run_async(self._branch_ctx(agent, ctx))
+                ) as events:
+                    async for event in events:
+                        resume = asyncio.Event()
+                        await queue.put((agent.name, event, resume))
+                        # Wait for the runner to apply the event to the
+                        # session, so dependents read the state it wrote
+                        await resume.wait()
+            finally:
+                await queue.put((agent.name, None, None))
+
+        async with asyncio.TaskGroup() as group:
+
+            def start_ready() -> int:
+                ready = [name for name, after in waiting.items() if not after]
+                for name in ready:
+                    del waiting[name]
+                    timings[name] = NodeTiming(name, graph[name], now_ms())
+                    group.create_task(run(agents[name]))
+                return len(ready)
+
+            running = start_ready()
+            while running:
+                name, event, resume = await queue.get()
+                if event is not None:
+                    yield event
+                    resume.set()
+                    continue
+                running -= 1
+                timings[name].end_ms = now_ms()
+                for after in waiting.values():
+                    after.discard(name)
+                running += start_ready()
+
+    async def _run_live_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        raise NotImplementedError("DagAgent does not support live runs.")
+        yield
+
+
+def _stages(agent: BaseAgent) -> Iterator[BaseAgent]:
+    # Callbacks of a sequential or parallel agent run around all of its
+    # stages, so such an agent stays one node
+    composite = type(agent) in (SequentialAgent, ParallelAgent)
+    if composite and not agent.before_agent_callback and not agent.after_agent_callback:
+        for sub_agent in agent.sub_agents:
+            yield from _stages(sub_agent)
+    else:
+        yield agent
+
+
+def dag_from(
+    *agents: BaseAgent,
+    name: str = "DagPipeline",
+    depends_on: dict[str, list[str]] | None = None,
+) -> DagAgent:
+    """``DagAgent`` running the stages of ``agents`` with maximal parallelism.
+
+    Sequential and parallel agents are flattened into their stages, in
+    order; the stages are cloned, so the original pipelines stay usable.
+
+    Args:
+        *agents: Pipelines (or single agents) in the order they would run.
+        name: Name of the ``DagAgent``.
+        depends_on: Extra edges, see ``DagAgent.depends_on``.
+    """
+    stages = [stage.clone() for agent in agents for stage in _stages(agent)]
+    return DagAgent(name=name, sub_agents=stages, depends_on=depends_on or {})
@@ -0,0 +1,108 @@
+"""Single-pass index over the events of an agent run.
+
+Post-processing helpers used to each walk every event and every part:
+one scan to find the approval request, one to print text, one for code
+results and one for images. ``EventIndex`` visits each part once, as the
+events stream out of ``run_async``, and files it under what it is, so
+each of those lookups becomes a dictionary or list access.
+
+    index = EventIndex()
+    async for event in runner.run_async(...):
+        index.add(event)
+    approval = index.approval()
+"""
+
+from collections import defaultdict
+from collections.abc import Iterable
+from typing import Any
+
+from google.adk.events import Event
+from google.genai import types
+
+REQUEST_CONFIRMATION = "adk_request_confirmation"
+
+
+class EventIndex:
+    """Events plus lookup tables built incrementally by ``add``.
+
+    Attributes:
+        events: Every event added, in order.
+        function_calls: ``(event, call)`` pairs keyed by function name.
+        function_responses: Function responses keyed by call id.
+        texts: Text parts, in order.
+        code_results: ``response`` dicts of function responses that carry
+            a ``"result"`` (e.g. ``calculation_agent`` used as a tool).
+        code_parts: ``executable_code`` and ``code_execution_result`` parts.
+        images: MCP image items (``{"type": "image", "data": ...}``, or
+            ``{"type": "image", "blob": ...}`` once offloaded to a
+            ``BlobStore``) found in function responses.
+    """
+
+    def __init__(self, events: Iterable[Event] = ()):
+        self.events: list[Event] = []
+        self.function_calls: dict[str, list[tuple[Event, types.FunctionCall]]] = (
+            defaultdict(list)
+        )
+        self.function_responses: dict[str, types.FunctionResponse] = {}
+        self.texts: list[str] = []
+        self.code_results: list[dict[str, Any]] = []
+        self.code_parts: list[types.Part] = []
+        self.images: list[dict[str, Any]] = []
+        for event in events:
+            self.add(event)
+
+    @classmethod
+    def of(cls, events: "Iterable[Event] | EventIndex") -> "EventIndex":
+        """Returns ``events`` if it is already an index, else indexes it."""
+        return events if isinstance(events, EventIndex) else cls(events)
+
+    def add(self, event: Event) -> Event:
+        """Indexes one event and returns it, so it can be used inline."""
+        self.events.append(event)
+        if not (event.content and event.content.parts):
+            return event
+
+        for part in event.content.parts:
+            if part.text:
+                self.texts.append(part.text)
+            if part.function_call:
+                self.function_calls[part.function_call.name].append(
+                    (event, part.function_call)
+                )
+            if part.function_response:
+                self._add_function_response(part.function_response)
+            if part.executable_code or part.code_execution_result:
+                self.code_parts.append(part)
+        return event
+
+    def _add_function_response(self, function_response: types.FunctionResponse):
+        if function_response.id:
+            self.function_responses[function_response.id] = function_response
+        response = function_response.response
+        if not response:
+            return
+        if "result" in response:
+            self.code_results.append(response)
+        content = response.get("content")
+        if isinstance(content, list):
+            self.images.extend(
+                item
+                for item in content
+                if isinstance(item, dict) and item.get("type") == "image"
+            )
+
+    def calls(self, name: str) -> list[tuple[Event, types.FunctionCall]]:
+        """``(event, call)`` pairs for every call to ``name``."""
+        return self.function_calls.get(name, [])
+
+    def approval(self) -> dict[str, str] | None:
+        """The first pending confirmation request, if any.
+
+        Returns:
+            ``{"approval_id": ..., "invocation_id": ...}`` or ``None``.
+        """
+        calls = self.calls(REQUEST_CONFIRMATION)
+        if not calls:
+            return None
+        event, call = calls[0]
+        return {"approval_id": call.id, "invocation_id": event.invocation_id}
@@ -0,0 +1,114 @@
+"""Local stand-in for an OpenTelemetry collector's OTLP/HTTP trace endpoint.
+
+Accepts ``POST /v1/traces`` the way a collector does, protobuf (what
+``OTLPSpanExporter`` sends) or JSON, and keeps the spans it receives
+instead of forwarding them. Point ``enable_tracing`` at it to check what
+a real collector would get:
+
+    with FakeCollector() as collector:
+        tracing = enable_tracing(otlp_endpoint=collector.url)
+        ...
+        tracing.flush()
+        print(collector.stats(), collector.spans()[0]["name"])
+
+Spans come back as dicts in the OTLP/JSON field names (``traceId``,
+``parentSpanId``, ``startTimeUnixNano``, ...).
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+from google.protobuf.json_format import MessageToDict
+from opentelemetry.proto.collector.trace.v1.trace_service_pb2 import (
+    ExportTraceServiceRequest,
+    ExportTraceServiceResponse,
+)
+
+
+class FakeCollector:
+    """Threaded HTTP server collecting OTLP trace exports in memory."""
+
+    def __init__(self):
+        self._spans: list[dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "spans": 0}
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _collect(self, request: dict[str, Any]) -> None:
+        spans = [
+            span
+            for resource_spans in request.get("resourceSpans", [])
+            for scope_spans in resource_spans.get("scopeSpans", [])
+            for span in scope_spans.get("spans", [])
+        ]
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["spans"] += len(spans)
+            self._spans.extend(spans)
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self) -> None:
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.path != "/v1/traces":
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                if self.headers.get("Content-Type") == "application/json":
+                    fake._collect(json.loads(body))
+                    data = b"{}"
+                else:
+                    request = ExportTraceServiceRequest.FromString(body)
+                    fake._collect(MessageToDict(request))
+                    data = ExportTraceServiceResponse().SerializeToString()
+                self.send_response(200)
+                self.send_header("Content-Type", self.headers.get("Content-Type"))
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return Handler
+
+    def start(self) -> "FakeCollector":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="fake-collector", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeCollector":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def spans(self) -> list[dict[str, Any]]:
+        """Every span received so far."""
+        with self._lock:
+            return list(self._spans)
+
+    def stats(self) -> dict[str, int]:
+        """Export requests and spans received."""
+        with self._lock:
+            return dict(self._stats)
@@ -0,0 +1,280 @@
+"""Local stand-in for the Gemini REST endpoint that sheds load.
+
+Serves ``models/{model}:generateContent`` (and the SSE streaming variant)
+over plain HTTP with a fixed capacity: requests beyond ``capacity_per_sec``
+get a 429 ``RESOURCE_EXHAUSTED`` with a ``RetryInfo`` delay, and a share
+of the accepted ones fail with 503. Connections are kept alive (HTTP/1.1)
+and, given a certificate, served over TLS. Point the real ``Gemini``
+model at it through the environment before the first call:
+
+    with FakeGemini(capacity_per_sec=5, error_rate=0.05) as server:
+        os.environ["GOOGLE_GEMINI_BASE_URL"] = server.url
+        model = Gemini(model="gemini-2.5-flash-lite")
+
+``stats`` counts what the server saw, which is how retry amplification
+(requests) and connection reuse (connections, i.e. TLS handshakes) show
+up. ``self_signed_cert`` makes a certificate for ``127.0.0.1``; clients
+trust it through ``SSL_CERT_FILE``.
+"""
+
+import datetime
+import ipaddress
+import json
+import random
+import ssl
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+
+def self_signed_cert(directory: str | Path) -> tuple[Path, Path]:
+    """Writes a certificate and key for ``127.0.0.1`` into ``directory``.
+
+    Returns:
+        ``(certfile, keyfile)``.
+    """
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "127.0.0.1")])
+    now = datetime.datetime.now(datetime.UTC)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(
+            x509.SubjectAlternativeName(
+                [x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]
+            ),
+            critical=False,
+        )
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+    certfile, keyfile = Path(directory) / "cert.pem", Path(directory) / "key.pem"
+    certfile.write_bytes(cert.public_bytes(serialization.Encoding.PEM))
+    keyfile.write_bytes(
+        key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+    )
+    return certfile, keyfile
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, handler, ssl_context: ssl.SSLContext | None, fake: "FakeGemini"):
+        super().__init__(("127.0.0.1", 0), handler)
+        self.ssl_context = ssl_context
+        self.fake = fake
+
+    def finish_request(self, request, client_address) -> None:
+        # In the connection's own thread, so slow handshakes overlap
+        self.fake._connected()
+        time.sleep(self.fake.connect_delay)
+        if self.ssl_context is None:
+            super().finish_request(request, client_address)
+            return
+        try:
+            request = self.ssl_context.wrap_socket(request, server_side=True)
+        except (ssl.SSLError, OSError):
+            return
+        with request:
+            super().finish_request(request, client_address)
+
+
+class FakeGemini:
+    """Threaded HTTP server answering like Gemini, with limited capacity.
+
+    Args:
+        capacity_per_sec: Requests accepted per (sliding) second.
+        error_rate: Share of accepted requests answered with a 503.
+        latency: Seconds an accepted request takes.
+        retry_delay: Seconds advertised in the 429's ``RetryInfo``;
+            ``None`` leaves it out.
+        text: Text of every successful response.
+        certfile: Certificate to serve TLS with, e.g. from
+            ``self_signed_cert``; plain HTTP without one.
+        keyfile: Private key of ``certfile``.
+        connect_delay: Seconds added to every new connection, standing in
+            for the network round trips of the TCP and TLS handshakes.
+    """
+
+    def __init__(
+        self,
+        capacity_per_sec: float = 5,
+        error_rate: float = 0.0,
+        latency: float = 0.05,
+        retry_delay: float | None = 1.0,
+        text: str = "OK",
+        certfile: str | Path | None = None,
+        keyfile: str | Path | None = None,
+        connect_delay: float = 0.0,
+    ):
+        self.capacity_per_sec = capacity_per_sec
+        self.error_rate = error_rate
+        self.latency = latency
+        self.retry_delay = retry_delay
+        self.text = text
+        self.connect_delay = connect_delay
+        self._accepted: deque[float] = deque()
+        self._lock = threading.Lock()
+        self._stats = {
+            "connections": 0,
+            "requests": 0,
+            "ok": 0,
+            "throttled": 0,
+            "unavailable": 0,
+        }
+        ssl_context = None
+        if certfile is not None:
+            ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            ssl_context.load_cert_chain(certfile, keyfile)
+        self._server = _Server(self._handler(), ssl_context, self)
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        scheme = "https" if self._server.ssl_context else "http"
+        return f"{scheme}://{host}:{port}"
+
+    def _connected(self) -> None:
+        with self._lock:
+            self._stats["connections"] += 1
+
+    def _admit(self) -> int:
+        """Status code for the next request: 200, 429 or 503."""
+        now = time.monotonic()
+        with self._lock:
+            self._stats["requests"] += 1
+            while self._accepted and now - self._accepted[0] >= 1.0:
+                self._accepted.popleft()
+            if len(self._accepted) >= self.capacity_per_sec:
+                self._stats["throttled"] += 1
+                return 429
+            self._accepted.append(now)
+            if random.random() < self.error_rate:
+                self._stats["unavailable"] += 1
+                return 503
+            self._stats["ok"] += 1
+            return 200
+
+    def _error(self, code: int) -> dict[str, Any]:
+        if code == 429:
+            error = {
+                "code": 429,
+                "message": "Resource has been exhausted (e.g. check quota).",
+                "status": "RESOURCE_EXHAUSTED",
+            }
+            if self.retry_delay is not None:
+                error["details"] = [
+                    {
+                        "@type": "type.googleapis.com/google.rpc.RetryInfo",
+                        "retryDelay": f"{self.retry_delay:g}s",
+                    }
+                ]
+            return {"error": error}
+        return {
+            "error": {
+                "code": 503,
+                "message": "The model is overloaded. Please try again later.",
+                "status": "UNAVAILABLE",
+            }
+        }
+
+    def _response(self, model: str, prompt_bytes: int) -> dict[str, Any]:
+        prompt_tokens = max(1, prompt_bytes // 4)
+        output_tokens = max(1, len(self.text) // 4)
+        return {
+            "candidates": [
+                {
+                    "content": {"role": "model", "parts": [{"text": self.text}]},
+                    "finishReason": "STOP",
+                    "index": 0,
+                }
+            ],
+            "usageMetadata": {
+                "promptTokenCount": prompt_tokens,
+                "candidatesTokenCount": output_tokens,
+                "totalTokenCount": prompt_tokens + output_tokens,
+            },
+            "modelVersion": model,
+        }
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self) -> None:
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                path, _, _ = self.path.partition("?")
+                model = path.rsplit("/", 1)[-1].split(":")[0]
+                code = fake._admit()
+                if code == 200:
+                    time.sleep(fake.latency)
+                    payload = fake._response(model, len(body))
+                else:
+                    payload = fake._error(code)
+
+                streaming = path.endswith(":streamGenerateContent") and code == 200
+                data = json.dumps(payload).encode()
+                if streaming:
+                    data = b"data: " + data + b"\r\n\r\n"
+                self.send_response(code)
+                self.send_header(
+                    "Content-Type",
+                    "text/event-stream" if streaming else "application/json",
+                )
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return Handler
+
+    def start(self) -> "FakeGemini":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="fake-gemini", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeGemini":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def stats(self) -> dict[str, int]:
+        """Connections and requests seen; requests served, throttled or failed."""
+        with self._lock:
+            return dict(self._stats)
+
+    def reset(self) -> None:
+        """Zeroes the counters and forgets the recent requests."""
+        with self._lock:
+            self._accepted.clear()
+            for key in self._stats:
+                self._stats[key] = 0
@@ -0,0 +1,239 @@
+"""Hedged model calls, to cut the tail latency of parallel fan-outs.
+
+A ``ParallelAgent`` is as slow as its slowest sub-agent, so one straggling
+model call sets the latency of the whole fan-out (and of everything
+sequenced after it). ``HedgedLlm`` wraps a model the way ``CachedLlm``
+does: when a call hasn't produced its first response by the
+``percentile`` latency of recent calls, it sends the same request again
+and keeps whichever answers first, cancelling the other. A budget caps
+the duplicates at ``max_extra`` per call, so a slow endpoint isn't hit
+with twice the load.
+
+``hedged_all`` turns it on for the agents of a fan-out, which share one
+``HedgePolicy`` (latency window and budget): each agent makes only a
+call or two per run, too few to learn a deadline of its own.
+
+    ParallelAgent(name="ParallelResearchTeam", sub_agents=hedged_all([tech_researcher, ...]))
+
+Until ``min_samples`` calls were timed, calls are hedged after
+``initial_deadline`` seconds if one is given, and not at all otherwise.
+
+Only the model call is duplicated, never the agent: tools run once, and
+the session sees one set of events. The hedging goes inside a
+``CachedLlm`` (``CachedLlm(llm=HedgedLlm(llm=LimitedLlm(...)))``), so
+cache hits never reach it and don't drag the latency window down, while
+hedges still go through ``LimitedLlm`` and are rate limited like any
+other call. A cancelled attempt was still sent, and is likely billed for
+its prompt: the responses say how many were cancelled
+(``custom_metadata["hedges_cancelled"]``), which ``UsageTracker``
+counts.
+"""
+
+import asyncio
+import time
+from collections import deque
+from collections.abc import AsyncGenerator, Sequence
+from typing import Any
+
+from google.adk.agents import LlmAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from pydantic import Field, PrivateAttr, model_validator
+
+from helpers.bench import percentile
+from helpers.model_cache import CachedLlm
+from helpers.ratelimit import RetryBudget
+
+Attempt = AsyncGenerator[LlmResponse, None]
+
+
+class HedgePolicy:
+    """When to hedge: a latency window and a hedge budget.
+
+    One policy can be shared by several ``HedgedLlm``s, e.g. the agents of
+    a fan-out, so they learn a deadline together.
+
+    Args:
+        percentile: Latency percentile of recent calls after which a
+            duplicate is sent.
+        window: Recent call latencies the deadline is computed from.
+        min_samples: Calls timed before the measured deadline is used.
+        initial_deadline: Seconds after which calls are hedged until
+            then; ``None`` not to hedge them.
+        max_extra: Duplicate requests allowed per call, i.e. the cap on
+            extra load.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        window: int = 100,
+        min_samples: int = 20,
+        initial_deadline: float | None = None,
+        max_extra: float = 0.1,
+    ):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.initial_deadline = initial_deadline
+        self.latencies: deque[float] = deque(maxlen=window)
+        # Up to ``max_extra`` of a window's calls may be hedged back to back
+        self.budget = RetryBudget(
+            ratio=max_extra, min_per_sec=0.0, max_balance=max(1.0, max_extra * window)
+        )
+
+    def deadline(self) -> float | None:
+        """Seconds after which a call is hedged; ``None`` for never."""
+        if len(self.latencies) < self.min_samples:
+            return self.initial_deadline
+        return percentile(list(self.latencies), self.percentile)
+
+    def record(self, latency: float) -> None:
+        self.latencies.append(latency)
+
+
+class HedgedLlm(BaseLlm):
+    """Sends a duplicate request when a call runs past its usual latency.
+
+    Latency is measured to the first response, so streamed calls are
+    hedged on their first chunk. Responses replayed from a cache aren't
+    measured, as they say nothing about the endpoint.
+    """
+
+    llm: BaseLlm
+    policy: HedgePolicy = Field(default_factory=HedgePolicy)
+
+    _stats: dict[str, int] = PrivateAttr(
+        default_factory=lambda: {"calls": 0, "hedges": 0, "hedge_wins": 0}
+    )
+
+    @model_validator(mode="before")
+    @classmethod
+    def _copy_model_name(cls, data: Any) -> Any:
+        if isinstance(data, dict) and "model" not in data and "llm" in data:
+            data["model"] = data["llm"].model
+        return data
+
+    def stats(self) -> dict[str, Any]:
+        """Calls, hedges sent and hedges that answered first."""
+        deadline = self.policy.deadline()
+        return {
+            **self._stats,
+            "deadline_ms": None if deadline is None else round(deadline * 1000, 1),
+        }
+
+    async def _race(
+        self, llm_request: LlmRequest, stream: bool
+    ) -> tuple[Attempt, LlmResponse | None, int]:
+        """Runs the call, hedged if needed, until one attempt responds.
+
+        Returns:
+            The winning attempt, its first response (``None`` if it
+            finished without one) and the number of attempts still
+            running, which are cancelled.
+        """
+        start = time.monotonic()
+        deadline = self.policy.deadline()
+        primary = self.llm.generate_content_async(llm_request, stream)
+        attempts: dict[asyncio.Future, Attempt] = {
+            asyncio.ensure_future(anext(primary)): primary
+        }
+        try:
+            while True:
+                timeout = None
+                if deadline is not None:
+                    timeout = max(0.0, start + deadline - time.monotonic())
+                done, _ = await asyncio.wait(
+                    attempts, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    deadline = None
+                    if self.policy.budget.withdraw():
+                        self._stats["hedges"] += 1
+                        # The model may modify the request, so each attempt
+                        # gets its own
+                        hedge = self.llm.generate_content_async(
+                            llm_request.model_copy(deep=True), stream
+                        )
+                        attempts[asyncio.ensure_future(anext(hedge))] = hedge
+                    continue
+
+                task = done.pop()
+                attempt = attempts.pop(task)
+                error = task.exception()
+                if error is not None and not isinstance(error, StopAsyncIteration):
+                    if attempts:
+                        # The other attempt may still succeed
+                        deadline = None
+                        continue
+                    raise error
+                if attempt is not primary:
+                    self._stats["hedge_wins"] += 1
+                first = None if error is not None else task.result()
+                if not (first and (first.custom_metadata or {}).get("cache_hit")):
+                    self.policy.record(time.monotonic() - start)
+                return attempt, first, len(attempts)
+        finally:
+            for task in attempts:
+                task.cancel()
+            await asyncio.gather(*attempts, return_exceptions=True)
+            for attempt in attempts.values():
+                await attempt.aclose()
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ):
+        self._stats["calls"] += 1
+        self.policy.budget.deposit()
+        attempt, first, cancelled = await self._race(llm_request, stream)
+        if first is None:
+            return
+        yield _count_cancelled(first, cancelled)
+        async for response in attempt:
+            yield _count_cancelled(response, cancelled)
+
+
+def _count_cancelled(response: LlmResponse, cancelled: int) -> LlmResponse:
+    # The cancelled requests were sent too; helpers/usage.py reads this
+    if cancelled:
+        response.custom_metadata = {
+            **(response.custom_metadata or {}),
+            "hedges_cancelled": cancelled,
+        }
+    return response
+
+
+def hedged(
+    agent: LlmAgent, policy: HedgePolicy | None = None, **options: Any
+) -> LlmAgent:
+    """Clone of ``agent`` whose model calls are hedged.
+
+    If the model is a ``CachedLlm``, the model it wraps is hedged instead,
+    so only cache misses are timed and duplicated.
+
+    Args:
+        agent: Typically one sub-agent of a ``ParallelAgent``.
+        policy: Policy to share with other agents; by default a new one.
+        **options: ``HedgePolicy`` arguments for a new policy, e.g.
+            ``percentile=90``.
+    """
+    policy = policy or HedgePolicy(**options)
+    model = agent.canonical_model
+    if isinstance(model, CachedLlm):
+        model = model.model_copy(
+            update={"llm": HedgedLlm(llm=model.llm, policy=policy)}
+        )
+    else:
+        model = HedgedLlm(llm=model, policy=policy)
+    return agent.clone(update={"model": model})
+
+
+def hedged_all(agents: Sequence[LlmAgent], **options: Any) -> list[LlmAgent]:
+    """Clones of ``agents`` whose model calls are hedged under one policy.
+
+    Args:
+        agents: Typically the sub-agents of a ``ParallelAgent``.
+        **options: ``HedgePolicy`` arguments, e.g. ``initial_deadline=8``.
+    """
+    policy = HedgePolicy(**options)
+    return [hedged(agent, policy) for agent in agents]
@@ -0,0 +1,161 @@
+"""Concurrent fan-out for batch tools such as bulk image generation.
+
+``fan_out`` runs ``count`` independent jobs with a concurrency cap and
+yields each result as soon as it is ready, retrying failed jobs with
+exponential backoff. A job that still fails after its retries is yielded
+as its exception, so one bad item doesn't sink the whole batch.
+
+``generate_images`` uses it to call an MCP image tool ``count`` times and
+collect the images (as ``BlobStore`` handles) plus the failures. Its
+``on_image`` callback gets every image as soon as it is ready, so a tool
+can deliver them (e.g. save each one as an artifact) while the rest of
+the batch is still being generated; a delivery that raises is recorded
+on that image rather than aborting the batch.
+"""
+
+import asyncio
+import inspect
+from collections.abc import AsyncIterator, Awaitable, Callable
+from typing import Any, TypeVar
+
+from mcp import ClientSession
+
+from helpers.blobs import BlobStore
+
+T = TypeVar("T")
+
+
+async def fan_out(
+    job: Callable[[int], Awaitable[T]],
+    count: int,
+    concurrency: int = 8,
+    retries: int = 2,
+    backoff: float = 0.2,
+) -> AsyncIterator[tuple[int, T | Exception]]:
+    """Runs ``job(0)`` ... ``job(count - 1)`` concurrently.
+
+    Args:
+        job: Coroutine function called with the item index.
+        count: Number of items.
+        concurrency: Maximum number of jobs in flight at once.
+        retries: Extra attempts for a job that raises.
+        backoff: Delay before the first retry, doubled for each later one.
+            The job's slot is released while it waits.
+
+    Yields:
+        ``(index, result)`` in completion order; ``result`` is the
+        exception of the last attempt if every attempt failed.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def attempt(index: int) -> tuple[int, T | Exception]:
+        for retry in range(retries + 1):
+            async with semaphore:
+                try:
+                    return index, await job(index)
+                except Exception as e:
+                    error = e
+            if retry < retries:
+                await asyncio.sleep(backoff * 2**retry)
+        return index, error
+
+    tasks = [asyncio.create_task(attempt(index)) for index in range(count)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def generate_images(
+    session: Callable[[], Awaitable[ClientSession]],
+    count: int,
+    blobs: BlobStore,
+    tool: str = "getTinyImage",
+    arguments: dict[str, Any] | None = None,
+    concurrency: int = 8,
+    retries: int = 2,
+    on_image: Callable[[int, dict[str, Any] | Exception], Any] | None = None,
+) -> dict[str, Any]:
+    """Calls an MCP image tool ``count`` times, ``concurrency`` at a time.
+
+    Args:
+        session: Returns the MCP session to call (e.g. a pooled toolset's
+            ``session``).
+        count: Number of images to generate.
+        blobs: Store the decoded images go to.
+        tool: Name of the MCP tool that returns one image per call.
+        arguments: Arguments for each call.
+        concurrency: Maximum number of calls in flight.
+        retries: Extra attempts per image.
+        on_image: Called with ``(index, image item or exception)`` as each
+            image finishes, and awaited if it returns an awaitable. It may
+            add keys to the image item, they end up in the response. If
+            it raises, the error is kept as the item's
+            ``delivery_error`` and the batch goes on.
+
+    Returns:
+        Tool response with ``status`` ("completed", "partial" or
+        "failed"), the images as blob-handle ``content`` items in request
+        order, and the indexes and errors of the images that failed. An
+        image whose delivery failed makes the batch "partial".
+
+    Raises:
+        ValueError: If ``count`` is less than 1.
+    """
+    if count < 1:
+        raise ValueError(f"count must be at least 1, not {count}")
+
+    async def one_image(index: int) -> dict[str, Any]:
+        result = await (await session()).call_tool(tool, arguments or {})
+        if result.isError:
+            message = " ".join(
+                item.text for item in result.content if item.type == "text"
+            )
+            raise RuntimeError(message or f"{tool} failed")
+        for item in result.content:
+            if item.type == "image":
+                handle = blobs.put(item.data)
+                return {
+                    "type": "image",
+                    "mimeType": item.mimeType,
+                    "blob": handle,
+                    "size": len(blobs.view(handle)),
+                }
+        raise RuntimeError(f"{tool} returned no image")
+
+    images: dict[int, dict[str, Any]] = {}
+    failed = []
+    undelivered = 0
+    async for index, result in fan_out(one_image, count, concurrency, retries):
+        delivery_error = None
+        if on_image:
+            try:
+                if inspect.isawaitable(delivered := on_image(index, result)):
+                    await delivered
+            except Exception as e:
+                delivery_error = str(e) or type(e).__name__
+        if isinstance(result, Exception):
+            failed.append({"index": index, "error": str(result)})
+            if delivery_error:
+                failed[-1]["delivery_error"] = delivery_error
+        else:
+            if delivery_error:
+                result["delivery_error"] = delivery_error
+                undelivered += 1
+            images[index] = result
+
+    if not failed and not undelivered:
+        status = "completed"
+    elif images:
+        status = "partial"
+    else:
+        status = "failed"
+    return {
+        "status": status,
+        "requested": count,
+        "generated": len(images),
+        "content": [images[index] for index in sorted(images)],
+        "failed": sorted(failed, key=lambda failure: failure["index"]),
+    }
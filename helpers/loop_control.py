@@ -0,0 +1,133 @@
+"""Stopping a ``LoopAgent`` from session state, without a model call.
+
+A ``LoopAgent`` stops when a sub-agent escalates or after
+``max_iterations``. The usual way to escalate is a tool like
+``exit_loop``, which costs a model round trip just to call it, and a
+loop whose critic never says the magic word runs to the limit even when
+the drafts stopped changing. ``stop_loop_when`` builds an
+``after_agent_callback`` that checks predicates on the session in
+process and escalates as soon as one holds:
+
+    stop = stop_loop_when(approved("critique"), converged("current_story"), token_budget(20_000))
+    critic_agent = Agent(..., output_key="critique", after_agent_callback=stop)
+    refiner_agent = Agent(..., output_key="current_story", after_agent_callback=stop)
+
+Attach it to every sub-agent whose output a predicate looks at, so the
+loop stops right after that output, before the next model call. The
+reason is recorded in state (``loop_exit_reason`` by default).
+
+A predicate is any ``callable(callback_context) -> str | None`` that
+returns the reason to stop, or ``None`` to go on.
+"""
+
+from collections.abc import Callable
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.events import Event
+from google.genai import types
+
+Predicate = Callable[[CallbackContext], str | None]
+
+
+def _invocation_events(callback_context: CallbackContext) -> list[Event]:
+    invocation_id = callback_context.invocation_id
+    return [
+        event
+        for event in callback_context.session.events
+        if event.invocation_id == invocation_id
+    ]
+
+
+def approved(key: str = "critique", phrase: str = "APPROVED") -> Predicate:
+    """Stops when ``state[key]`` is exactly ``phrase`` (ignoring whitespace)."""
+
+    def predicate(callback_context: CallbackContext) -> str | None:
+        value = callback_context.state.get(key)
+        if isinstance(value, str) and value.strip() == phrase:
+            return f"{key} is {phrase}"
+        return None
+
+    return predicate
+
+
+def edit_distance(a: list[str], b: list[str]) -> int:
+    """Levenshtein distance between two token lists."""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, token in enumerate(a, 1):
+        current = [i]
+        for j, other in enumerate(b, 1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (token != other),
+                )
+            )
+        previous = current
+    return previous[-1]
+
+
+def converged(key: str = "current_story", max_change: float = 0.05) -> Predicate:
+    """Stops when the last two versions of ``state[key]`` written in this
+    invocation differ by at most ``max_change`` of their words (word-level
+    edit distance over the longer version).
+    """
+
+    def predicate(callback_context: CallbackContext) -> str | None:
+        versions = [
+            event.actions.state_delta[key]
+            for event in _invocation_events(callback_context)
+            if key in event.actions.state_delta
+        ]
+        if len(versions) < 2:
+            return None
+        before, after = str(versions[-2]).split(), str(versions[-1]).split()
+        change = edit_distance(before, after) / max(len(before), len(after), 1)
+        if change <= max_change:
+            return f"{key} changed {change:.0%} in the last revision"
+        return None
+
+    return predicate
+
+
+def token_budget(max_tokens: int) -> Predicate:
+    """Stops once the model calls of this invocation used ``max_tokens``."""
+
+    def predicate(callback_context: CallbackContext) -> str | None:
+        used = sum(
+            event.usage_metadata.total_token_count or 0
+            for event in _invocation_events(callback_context)
+            if event.usage_metadata
+        )
+        if used >= max_tokens:
+            return f"used {used} of {max_tokens} tokens"
+        return None
+
+    return predicate
+
+
+def stop_loop_when(
+    *predicates: Predicate, reason_key: str = "loop_exit_reason"
+) -> Callable[[CallbackContext], types.Content | None]:
+    """``after_agent_callback`` that ends the enclosing loop.
+
+    Args:
+        *predicates: Checked in order; the first reason returned stops
+            the loop.
+        reason_key: State key the reason is written to.
+    """
+
+    def callback(callback_context: CallbackContext) -> types.Content | None:
+        for predicate in predicates:
+            reason = predicate(callback_context)
+            if reason:
+                # ADK yields the callback's event only if it changes state,
+                # and the LoopAgent exits on its escalate flag
+                callback_context.state[reason_key] = reason
+                callback_context._event_actions.escalate = True
+                return None
+        return None
+
+    return callback
@@ -0,0 +1,118 @@
+"""Cached MCP tool catalogs, so toolsets skip ``tools/list``.
+
+``McpToolset.get_tools`` runs ``list_tools`` on the server every time an
+agent builds a model request, and applies ``tool_filter`` only after the
+full list came back. ``ToolCatalog`` keeps the tool list of each server
+in memory and in a JSON snapshot on disk, keyed by the server's command
+or URL, so a new session (or a new process) goes straight to the first
+model call.
+
+An entry is dropped when its server sends ``notifications/tools/list_changed``
+or reports a different version at startup; ``McpPool`` forwards both to
+``ToolCatalog.observe``.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from mcp import types
+
+
+def catalog_id(key: tuple) -> str:
+    """Stable string id for a pool server key (used in the snapshot)."""
+    return hashlib.sha256(json.dumps(key).encode()).hexdigest()[:32]
+
+
+class ToolCatalog:
+    """Tool lists per MCP server, in memory and in a JSON snapshot.
+
+    Args:
+        path: Snapshot file, ``None`` to keep the catalog in memory only.
+    """
+
+    def __init__(self, path: str | Path | None = ".cache/mcp_tools.json"):
+        self.path = Path(path) if path else None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # catalog id -> {"server": ..., "version": ..., "tools": [...]}
+        self._entries: dict[str, dict] = {}
+        self._tools: dict[str, list[types.Tool]] = {}
+        self._versions: dict[str, str] = {}
+        if self.path and self.path.exists():
+            self._entries = json.loads(self.path.read_text())
+
+    def get(self, key: tuple) -> list[types.Tool] | None:
+        """The cached tool list for a server, or ``None`` on a miss."""
+        entry_id = catalog_id(key)
+        tools = self._tools.get(entry_id)
+        if tools is None and entry_id in self._entries:
+            tools = [
+                types.Tool.model_validate(tool)
+                for tool in self._entries[entry_id]["tools"]
+            ]
+            self._tools[entry_id] = tools
+        if tools is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return tools
+
+    def put(self, key: tuple, tools: list[types.Tool]) -> None:
+        """Records the tool list a server just returned."""
+        entry_id = catalog_id(key)
+        self._tools[entry_id] = list(tools)
+        self._entries[entry_id] = {
+            "server": key[1],
+            "version": self._versions.get(entry_id),
+            "tools": [
+                tool.model_dump(mode="json", exclude_none=True) for tool in tools
+            ],
+        }
+        self._save()
+
+    def invalidate(self, key: tuple) -> None:
+        """Forgets a server's tool list; the next ``get`` is a miss."""
+        entry_id = catalog_id(key)
+        self._tools.pop(entry_id, None)
+        if self._entries.pop(entry_id, None) is not None:
+            self.invalidations += 1
+            self._save()
+
+    def observe(self, event: str, key: tuple, data=None) -> None:
+        """``McpPool`` listener: keeps entries in sync with the servers.
+
+        ``"started"`` carries the server's ``Implementation`` info; a
+        version other than the one the entry was recorded with drops the
+        entry. ``"tools_changed"`` always drops it.
+        """
+        entry_id = catalog_id(key)
+        if event == "tools_changed":
+            self.invalidate(key)
+        elif event == "started" and data is not None:
+            self._versions[entry_id] = data.version
+            entry = self._entries.get(entry_id)
+            if entry and entry["version"] not in (None, data.version):
+                self.invalidate(key)
+
+    def _save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self._entries))
+        os.replace(tmp, self.path)
+
+    def stats(self) -> dict[str, int]:
+        """Hit/miss/invalidation counters and the number of servers cached."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "servers": len(self._entries),
+        }
+
+
+tool_catalog = ToolCatalog()
@@ -0,0 +1,445 @@
+"""Warm pool of MCP server connections shared across toolsets and runners.
+
+Every ``McpToolset`` owns an ``MCPSessionManager`` that spawns its own
+server process on first use, so each new agent/runner pays for
+``npx`` resolving the package and Node starting up (seconds) before the
+first tool call. ``McpPool`` keeps up to ``size`` initialized sessions per
+server signature (command, args, env and cwd for stdio; URL and headers
+for HTTP) for the whole process and hands them to any toolset that asks:
+
+    image_tools = PooledMcpToolset(
+        connection_params=StdioConnectionParams(server_params=...),
+        tool_filter=["getTinyImage"],
+    )
+
+Servers are pinged before reuse once they've been idle for
+``health_check_interval`` seconds and replaced if they don't answer, and
+a background reaper stops the ones nobody has used for ``idle_timeout``
+seconds: counted from when the server was last handed out or last
+finished a request, and never while a request is in flight. Closing a
+pooled toolset (e.g. ``runner.close()``) leaves the servers running for
+the next runner.
+
+``PooledMcpToolset`` also reads its tool list from a ``ToolCatalog``
+(``helpers/mcp_catalog.py``) instead of calling ``tools/list`` each time.
+
+Borrowing a session and every request on it (``mcp tools/call``, ...)
+are recorded as OpenTelemetry spans, under ADK's ``execute_tool`` span
+when made by a tool; see ``helpers/tracing.py``.
+"""
+
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+import sys
+import time
+from collections.abc import Callable
+from datetime import timedelta
+from typing import TextIO
+
+import anyio
+from google.adk.tools.mcp_tool.mcp_session_manager import (
+    MCPSessionManager,
+    StdioConnectionParams,
+    retry_on_closed_resource,
+)
+from google.adk.tools.mcp_tool.mcp_tool import MCPTool
+from google.adk.tools.mcp_tool.mcp_toolset import McpToolset
+from mcp import ClientSession, StdioServerParameters, types
+from mcp.shared.exceptions import McpError
+from opentelemetry import trace
+
+from helpers.mcp_catalog import ToolCatalog, tool_catalog
+
+logger = logging.getLogger(__name__)
+tracer = trace.get_tracer(__name__)
+
+ServerKey = tuple
+# listener(event, key, data): "started" (data is the server's
+# Implementation info) or "tools_changed"
+Listener = Callable[[str, ServerKey, object], None]
+
+
+def _digest(value) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def server_key(params, headers: dict[str, str] | None = None) -> ServerKey:
+    """Signature that identifies interchangeable servers.
+
+    Env and headers are hashed so that tokens don't end up in keys (or in
+    the catalog snapshot on disk).
+    """
+    if isinstance(params, StdioServerParameters):
+        params = StdioConnectionParams(server_params=params)
+    if isinstance(params, StdioConnectionParams):
+        server = params.server_params
+        return (
+            "stdio",
+            " ".join([server.command, *server.args]),
+            _digest(server.env or {}),
+            str(server.cwd or ""),
+        )
+    return (type(params).__name__, params.url, _digest(headers or {}))
+
+
+class TracedClientSession(ClientSession):
+    """``ClientSession`` recording each request's round trip as a span.
+
+    Also counts the requests in flight and when the last one finished,
+    for the pool's idle reaper.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.in_flight = 0
+        self.last_finished = 0.0
+
+    async def send_request(self, request, *args, **kwargs):
+        method = request.root.method
+        name = getattr(request.root.params, "name", None)
+        self.in_flight += 1
+        try:
+            with tracer.start_as_current_span(f"mcp {method}") as span:
+                span.set_attribute("mcp.method", method)
+                if name:
+                    span.set_attribute("mcp.tool.name", name)
+                return await super().send_request(request, *args, **kwargs)
+        finally:
+            self.in_flight -= 1
+            self.last_finished = time.monotonic()
+
+
+class WarmServer:
+    """One MCP server connection with an initialized session.
+
+    The connection and session are opened and closed inside a dedicated
+    task, since the MCP client's cancel scopes must be exited by the task
+    that entered them; other tasks only use ``session``.
+    """
+
+    def __init__(
+        self,
+        params,
+        headers: dict[str, str] | None = None,
+        errlog: TextIO = sys.stderr,
+        on_notification: Callable[[types.ServerNotification], None] | None = None,
+    ):
+        self.params = params
+        self.headers = headers
+        self.errlog = errlog
+        self.on_notification = on_notification
+        self.session: TracedClientSession | None = None
+        self.server_info: types.Implementation | None = None
+        self.started = 0.0
+        self.last_used = 0.0
+        self.last_checked = 0.0
+        self._stop = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> "WarmServer":
+        ready = asyncio.get_running_loop().create_future()
+        self._task = asyncio.create_task(self._serve(ready))
+        try:
+            self.session = await asyncio.wait_for(ready, self.params.timeout)
+        except BaseException:
+            await self.stop()
+            raise
+        self.started = self.last_used = self.last_checked = time.monotonic()
+        return self
+
+    async def _handle_message(self, message) -> None:
+        if isinstance(message, types.ServerNotification) and self.on_notification:
+            self.on_notification(message)
+        await anyio.lowlevel.checkpoint()
+
+    async def _serve(self, ready: asyncio.Future) -> None:
+        # Same transports as MCPSessionManager; the read timeout only
+        # applies to stdio there as well.
+        client = MCPSessionManager(self.params, self.errlog)._create_client(
+            self.headers
+        )
+        read_timeout = None
+        if isinstance(self.params, StdioConnectionParams):
+            read_timeout = timedelta(seconds=self.params.timeout)
+        try:
+            async with (
+                client as streams,
+                TracedClientSession(
+                    *streams[:2],
+                    read_timeout_seconds=read_timeout,
+                    message_handler=self._handle_message,
+                ) as session,
+            ):
+                result = await session.initialize()
+                self.server_info = result.serverInfo
+                ready.set_result(session)
+                await self._stop.wait()
+        except BaseException as e:
+            if not ready.done():
+                ready.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+
+    def idle_for(self, now: float) -> float:
+        """Seconds since the server was handed out or finished a request.
+
+        0 while a request is in flight, however long it has been running.
+        """
+        if self.session is None:
+            return now - self.last_used
+        if self.session.in_flight:
+            return 0.0
+        return now - max(self.last_used, self.session.last_finished)
+
+    @property
+    def alive(self) -> bool:
+        return (
+            self.session is not None
+            and self._task is not None
+            and not self._task.done()
+            and not self.session._read_stream._closed
+            and not self.session._write_stream._closed
+        )
+
+    async def healthy(self, timeout: float) -> bool:
+        """Pings the server; ``False`` if it is gone or doesn't answer."""
+        if not self.alive:
+            return False
+        try:
+            await asyncio.wait_for(self.session.send_ping(), timeout)
+        except (TimeoutError, McpError, anyio.ClosedResourceError):
+            return False
+        self.last_checked = time.monotonic()
+        return True
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._task, 5.0)
+            except TimeoutError:
+                self._task.cancel()
+
+
+class McpPool:
+    """Process-wide pool of warm MCP server connections.
+
+    Args:
+        size: Connections kept per server signature. Calls are spread over
+            them round-robin; MCP multiplexes concurrent requests on one
+            session, so one is enough unless the server itself is the
+            bottleneck.
+        idle_timeout: Seconds without use after which a server is stopped.
+        health_check_interval: Idle seconds after which a server is pinged
+            before being handed out again.
+        errlog: Where stdio servers' stderr goes.
+    """
+
+    def __init__(
+        self,
+        size: int = 1,
+        idle_timeout: float = 300.0,
+        health_check_interval: float = 30.0,
+        errlog: TextIO = sys.stderr,
+    ):
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.errlog = errlog
+        self.spawned = 0
+        self._servers: dict[ServerKey, list[WarmServer]] = {}
+        self._turns: dict[ServerKey, itertools.count] = {}
+        self._locks: dict[ServerKey, asyncio.Lock] = {}
+        self._listeners: list[Listener] = []
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._reaper: asyncio.Task | None = None
+
+    def subscribe(self, listener: Listener) -> None:
+        """Calls ``listener(event, key, data)`` on server start and on
+        ``tools/list_changed`` notifications (e.g. ``ToolCatalog.observe``).
+        """
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def _emit(self, event: str, key: ServerKey, data=None) -> None:
+        for listener in self._listeners:
+            listener(event, key, data)
+
+    def _bind_loop(self) -> None:
+        # Servers live in tasks of the loop that started them; after the
+        # loop changes (a new asyncio.run) they are gone, so start over.
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._servers.clear()
+            self._locks.clear()
+            self._reaper = None
+        if self._reaper is None or self._reaper.done():
+            self._reaper = loop.create_task(self._reap())
+
+    async def session(
+        self, params, headers: dict[str, str] | None = None
+    ) -> ClientSession:
+        """Returns an initialized session on a warm server for ``params``."""
+        self._bind_loop()
+        key = server_key(params, headers)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        with tracer.start_as_current_span("mcp session") as span:
+            start = time.monotonic()
+            async with lock:
+                servers = self._servers.setdefault(key, [])
+                if len(servers) < self.size:
+                    servers.append(await self._spawn(key, params, headers))
+                    server = servers[-1]
+                else:
+                    turn = next(self._turns.setdefault(key, itertools.count()))
+                    server = servers[turn % len(servers)]
+                    if not await self._check(server):
+                        await server.stop()
+                        server = await self._spawn(key, params, headers)
+                        servers[turn % len(servers)] = server
+            span.set_attribute("mcp.server", key[1])
+            span.set_attribute("mcp.spawned", server.started >= start)
+        server.last_used = time.monotonic()
+        return server.session
+
+    async def warm(self, params, headers: dict[str, str] | None = None) -> None:
+        """Starts the servers for ``params`` ahead of the first call."""
+        for _ in range(self.size):
+            await self.session(params, headers)
+
+    async def _spawn(self, key: ServerKey, params, headers) -> WarmServer:
+        self.spawned += 1
+        logger.debug("Starting MCP server %s", key[1])
+
+        def on_notification(notification: types.ServerNotification) -> None:
+            if isinstance(notification.root, types.ToolListChangedNotification):
+                self._emit("tools_changed", key)
+
+        server = await WarmServer(params, headers, self.errlog, on_notification).start()
+        self._emit("started", key, server.server_info)
+        return server
+
+    async def _check(self, server: WarmServer) -> bool:
+        if not server.alive:
+            return False
+        if time.monotonic() - server.last_checked < self.health_check_interval:
+            return True
+        return await server.healthy(timeout=server.params.timeout)
+
+    async def _reap(self) -> None:
+        while True:
+            await asyncio.sleep(min(self.idle_timeout, 30.0))
+            await self.close(idle_only=True)
+
+    async def close(self, idle_only: bool = False) -> None:
+        """Stops every server (or only the idle ones)."""
+        now = time.monotonic()
+        for key, servers in list(self._servers.items()):
+            async with self._locks[key]:
+                keep = []
+                for server in servers:
+                    if idle_only and server.idle_for(now) < self.idle_timeout:
+                        keep.append(server)
+                    else:
+                        await server.stop()
+                self._servers[key] = keep
+        if not idle_only and self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+
+    def stats(self) -> dict[str, int]:
+        """Number of running servers and how many were started in total."""
+        return {
+            "servers": sum(len(servers) for servers in self._servers.values()),
+            "spawned": self.spawned,
+        }
+
+
+mcp_pool = McpPool()
+mcp_pool.subscribe(tool_catalog.observe)
+
+
+class PooledSessionManager(MCPSessionManager):
+    """``MCPSessionManager`` that borrows sessions from an ``McpPool``."""
+
+    def __init__(self, pool: McpPool, connection_params, errlog=sys.stderr):
+        super().__init__(connection_params=connection_params, errlog=errlog)
+        self.pool = pool
+
+    def key(self, headers: dict[str, str] | None = None) -> ServerKey:
+        return server_key(self._connection_params, self._merge_headers(headers))
+
+    async def create_session(self, headers=None) -> ClientSession:
+        return await self.pool.session(
+            self._connection_params, self._merge_headers(headers)
+        )
+
+    async def close(self) -> None:
+        # The pool owns the servers; they outlive any one toolset.
+        pass
+
+
+class PooledMcpToolset(McpToolset):
+    """``McpToolset`` that reuses pooled servers and a cached tool list.
+
+    Takes the same arguments as ``McpToolset``, plus:
+
+    Args:
+        pool: Pool to borrow sessions from (the process-wide ``mcp_pool``
+            by default).
+        catalog: Where tool lists are cached (``tool_catalog`` by
+            default), ``None`` to call ``tools/list`` every time.
+    """
+
+    def __init__(
+        self,
+        *,
+        pool: McpPool = mcp_pool,
+        catalog: ToolCatalog | None = tool_catalog,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self._mcp_session_manager = PooledSessionManager(
+            pool, self._mcp_session_manager._connection_params, self._errlog
+        )
+        self._catalog = catalog
+        if catalog is not None:
+            pool.subscribe(catalog.observe)
+
+    async def session(self, headers: dict[str, str] | None = None) -> ClientSession:
+        """A pooled session on this toolset's server, for direct calls."""
+        return await self._mcp_session_manager.create_session(headers=headers)
+
+    @retry_on_closed_resource
+    async def get_tools(self, readonly_context=None) -> list[MCPTool]:
+        headers = (
+            self._header_provider(readonly_context)
+            if self._header_provider and readonly_context
+            else None
+        )
+        listing = None
+        if self._catalog is not None:
+            listing = self._catalog.get(self._mcp_session_manager.key(headers))
+        if listing is None:
+            session = await self._mcp_session_manager.create_session(headers=headers)
+            listing = (await session.list_tools()).tools
+            if self._catalog is not None:
+                self._catalog.put(self._mcp_session_manager.key(headers), listing)
+
+        tools = []
+        for tool in listing:
+            mcp_tool = MCPTool(
+                mcp_tool=tool,
+                mcp_session_manager=self._mcp_session_manager,
+                auth_scheme=self._auth_scheme,
+                auth_credential=self._auth_credential,
+                require_confirmation=self._require_confirmation,
+                header_provider=self._header_provider,
+            )
+            if self._is_tool_selected(mcp_tool, readonly_context):
+                tools.append(mcp_tool)
+        return tools
@@ -0,0 +1,198 @@
+"""Record-and-replay cache for model calls.
+
+``CachedLlm`` wraps a model (usually ``Gemini``) and stores every response
+in a ``ResponseCache`` keyed on a hash of the request: model name, system
+instruction, conversation contents, tool declarations and generation
+config. Re-running the same query replays the recorded response instead
+of hitting the model, which also makes the cache usable as an offline
+fixture store.
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from pydantic import model_validator
+
+
+def request_key(llm_request: LlmRequest, stream: bool = False) -> str:
+    """Content-addressed key for a model request.
+
+    ``http_options`` is left out since it only carries transport settings
+    (headers, retries) that don't change the response.
+    """
+    payload = {
+        "model": llm_request.model,
+        "stream": stream,
+        "config": llm_request.config.model_dump(
+            mode="json", exclude_none=True, exclude={"http_options"}
+        ),
+        "contents": [
+            content.model_dump(mode="json", exclude_none=True)
+            for content in llm_request.contents
+        ],
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class ResponseCache:
+    """On-disk response store with LRU eviction and a TTL.
+
+    Entries live in a single SQLite file. Once the stored payloads exceed
+    ``max_bytes`` the least recently read entries are evicted, and entries
+    older than ``ttl`` seconds count as misses.
+
+    Args:
+        path: SQLite file to use, created if missing.
+        max_bytes: Upper bound on the total size of stored responses.
+        ttl: Seconds an entry stays valid, ``None`` to keep it forever.
+    """
+
+    def __init__(
+        self,
+        path: str | Path = ".cache/model_responses.sqlite",
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl: float | None = 7 * 24 * 3600,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._db = sqlite3.connect(self.path)
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            )"""
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)"
+        )
+        self._db.commit()
+
+    def get(self, key: str) -> list[dict[str, Any]] | None:
+        """Returns the recorded responses for ``key``, or ``None`` on a miss."""
+        row = self._db.execute(
+            "SELECT payload, created FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        now = time.time()
+        if row is None or (self.ttl is not None and now - row[1] > self.ttl):
+            if row is not None:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+            self.misses += 1
+            return None
+
+        self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        self._db.commit()
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, responses: list[dict[str, Any]]) -> None:
+        """Records ``responses`` under ``key`` and evicts down to ``max_bytes``."""
+        payload = json.dumps(responses)
+        now = time.time()
+        self._db.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+            (key, payload, len(payload), now, now),
+        )
+        self._evict()
+        self._db.commit()
+
+    def _evict(self) -> None:
+        total = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute(
+            "SELECT key, size FROM responses ORDER BY accessed"
+        ).fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+
+    def clear(self) -> None:
+        """Drops every entry and resets the counters."""
+        self._db.execute("DELETE FROM responses")
+        self._db.commit()
+        self.hits = self.misses = 0
+
+    def stats(self) -> dict[str, int]:
+        """Hit/miss counters plus the number and total size of entries."""
+        entries, size = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": entries,
+            "bytes": size,
+        }
+
+
+class CachedLlm(BaseLlm):
+    """Serves repeated requests from a ``ResponseCache``.
+
+    Use it wherever a ``Gemini`` object goes:
+
+        model=CachedLlm(llm=Gemini(model="gemini-2.5-flash-lite"), cache=cache)
+
+    The model name is copied from the wrapped model so built-in tools
+    (``google_search``, code execution) still see a Gemini model. Error
+    responses are never recorded.
+    """
+
+    llm: BaseLlm
+    cache: ResponseCache
+
+    @model_validator(mode="before")
+    @classmethod
+    def _copy_model_name(cls, data: Any) -> Any:
+        if isinstance(data, dict) and "model" not in data and "llm" in data:
+            data["model"] = data["llm"].model
+        return data
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ):
+        key = request_key(llm_request, stream)
+        recorded = self.cache.get(key)
+        if recorded is not None:
+            for response in recorded:
+                response = LlmResponse.model_validate(response)
+                # Replayed usage costs nothing; helpers/usage.py reads this
+                response.custom_metadata = {
+                    **(response.custom_metadata or {}),
+                    "cache_hit": True,
+                }
+                yield response
+            return
+
+        responses = []
+        async for response in self.llm.generate_content_async(llm_request, stream):
+            responses.append(response)
+            yield response
+
+        if responses and not any(response.error_code for response in responses):
+            self.cache.put(
+                key,
+                [
+                    response.model_dump(mode="json", exclude_none=True)
+                    for response in responses
+                ],
+            )
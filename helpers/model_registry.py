@@ -0,0 +1,166 @@
+"""Shared, connection-pooled Gemini clients.
+
+``Gemini`` builds its own ``google.genai.Client`` on first use, and each
+client opens its own HTTP connections, so fifteen agents in a notebook
+pay for fifteen TLS handshakes and never reuse a warm connection.
+``ModelRegistry`` hands out one model object per (model, options) key,
+and every model it creates sends through a single bounded
+``httpx.AsyncClient`` with keep-alive (and HTTP/2 when the ``h2`` package
+is installed, so concurrent calls share one connection):
+
+    model=LimitedLlm(llm=model_registry.gemini("gemini-2.5-flash-lite", retry_options=retry_config))
+
+The genai clients and the connection pool belong to the event loop that
+first used them; when the loop changes (a new ``asyncio.run``) they are
+dropped and built again, since connections can't move between loops.
+"""
+
+import asyncio
+import importlib.util
+import json
+from typing import Any
+
+import httpx
+from google.adk.models.google_llm import Gemini
+from google.genai import Client, types
+from pydantic import BaseModel, Field
+
+
+class ModelRegistry:
+    """Process-wide registry of Gemini models sharing one connection pool.
+
+    Args:
+        max_connections: Most connections open at once, across every
+            model; further calls wait for a free one.
+        keepalive_expiry: Seconds an idle connection is kept open.
+        http2: Use HTTP/2; by default it is used when ``h2`` is installed.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 10,
+        keepalive_expiry: float = 60.0,
+        http2: bool | None = None,
+    ):
+        self.max_connections = max_connections
+        self.keepalive_expiry = keepalive_expiry
+        if http2 is None:
+            http2 = importlib.util.find_spec("h2") is not None
+        self.http2 = http2
+        self._models: dict[tuple[str, str], PooledGemini] = {}
+        self._clients: dict[str, Client] = {}
+        self._http: httpx.AsyncClient | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._stats = {"models": 0, "model_hits": 0, "clients": 0}
+
+    def _bind_loop(self) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if loop is not self._loop:
+            self._loop = loop
+            self._clients.clear()
+            self._http = None
+
+    def http_client(self) -> httpx.AsyncClient:
+        """The shared connection pool of the current event loop."""
+        self._bind_loop()
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                http2=self.http2,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+            )
+        return self._http
+
+    def api_client(
+        self,
+        headers: dict[str, str],
+        retry_options: types.HttpRetryOptions | None = None,
+    ) -> Client:
+        """The genai client for these HTTP options, built on first use."""
+        self._bind_loop()
+        key = options_key(headers=headers, retry_options=retry_options)
+        client = self._clients.get(key)
+        if client is None:
+            self._stats["clients"] += 1
+            client = self._clients[key] = Client(
+                http_options=types.HttpOptions(
+                    headers=headers,
+                    retry_options=retry_options,
+                    httpx_async_client=self.http_client(),
+                )
+            )
+        return client
+
+    def gemini(
+        self,
+        model: str,
+        retry_options: types.HttpRetryOptions | None = None,
+        **options: Any,
+    ) -> "PooledGemini":
+        """The shared model object for ``model`` and ``options``.
+
+        Args:
+            model: Model name, e.g. ``"gemini-2.5-flash-lite"``.
+            retry_options: Passed to ``Gemini``.
+            **options: Any other ``Gemini`` field.
+        """
+        key = (model, options_key(retry_options=retry_options, **options))
+        llm = self._models.get(key)
+        if llm is None:
+            self._stats["models"] += 1
+            llm = self._models[key] = PooledGemini(
+                model=model, retry_options=retry_options, registry=self, **options
+            )
+        else:
+            self._stats["model_hits"] += 1
+        return llm
+
+    async def aclose(self) -> None:
+        """Closes the pooled connections; models reconnect on their next call."""
+        if self._http is not None:
+            await self._http.aclose()
+        self._http = None
+        self._clients.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """Models and genai clients created, and models handed out again."""
+        return {**self._stats, "http2": self.http2}
+
+
+def options_key(**options: Any) -> str:
+    """Stable string for a set of model or client options."""
+    return json.dumps(
+        {
+            name: value.model_dump(mode="json", exclude_none=True)
+            if isinstance(value, BaseModel)
+            else value
+            for name, value in options.items()
+        },
+        sort_keys=True,
+        default=str,
+    )
+
+
+class PooledGemini(Gemini):
+    """``Gemini`` whose API client comes from a ``ModelRegistry``.
+
+    Get one from ``ModelRegistry.gemini`` rather than building it, so
+    agents asking for the same model share it.
+    """
+
+    registry: ModelRegistry = Field(
+        default_factory=lambda: model_registry, exclude=True, repr=False
+    )
+
+    @property
+    def api_client(self) -> Client:
+        return self.registry.api_client(self._tracking_headers, self.retry_options)
+
+
+model_registry = ModelRegistry()
@@ -0,0 +1,221 @@
+"""Overlapping the stages of a sequential pipeline, section by section.
+
+In day01's BlogPipeline the writer starts only once the outline is
+complete, and the editor only once the whole draft is. The outline comes
+out of the model a few words at a time though, and its first section is
+ready long before its last one. ``PipelinedAgent`` streams the first
+stage and, as soon as a section of its output is complete, runs the next
+stages on that section alone, while the first stage is still writing:
+
+    streaming_blog = pipelined(
+        root_agent3,
+        instructions={"WriterAgent": "Write this section of the post: {blog_outline}"},
+    )
+
+Each section goes through the later stages on its own, concurrently with
+the other sections, so the pipeline takes about as long as its longest
+stage instead of the sum of all of them. Every later stage must read the
+previous stage's ``output_key`` with a ``{placeholder}``: it gets one
+section of it per call. Its outputs are joined in order, written to its
+own ``output_key`` and reported as one event.
+
+This only suits stages that can work on a section without the rest,
+which usually means rewording their instructions (``instructions``
+replaces them by stage name). Sections are split before markdown
+headings by default; later stages see the conversation as it was when
+the pipeline started, not each other's calls.
+"""
+
+import asyncio
+import re
+from collections.abc import AsyncGenerator
+from contextlib import aclosing
+from typing import Any
+
+from google.adk.agents import BaseAgent, LlmAgent, SequentialAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from helpers.dag import reads
+
+
+def _text(event: Event) -> str:
+    if not (event.content and event.content.parts):
+        return ""
+    return "".join(part.text or "" for part in event.content.parts)
+
+
+def _total_usage(
+    usages: list[types.GenerateContentResponseUsageMetadata],
+) -> types.GenerateContentResponseUsageMetadata | None:
+    if not usages:
+        return None
+    return types.GenerateContentResponseUsageMetadata(
+        prompt_token_count=sum(u.prompt_token_count or 0 for u in usages),
+        candidates_token_count=sum(u.candidates_token_count or 0 for u in usages),
+        total_token_count=sum(u.total_token_count or 0 for u in usages),
+    )
+
+
+class PipelinedAgent(BaseAgent):
+    """Runs ``LlmAgent`` stages in order, handing output on section by section.
+
+    The first stage runs once, streamed. Every later stage runs once per
+    section of the first stage's output; see the module docstring.
+    """
+
+    section_break: str = r"\n(?=#{1,3} )"
+    """Regex splitting the first stage's output into sections."""
+    joiner: str = "\n\n"
+    """Put between the per-section outputs of a later stage."""
+
+    def model_post_init(self, context: Any) -> None:
+        super().model_post_init(context)
+        for stage in self.sub_agents:
+            if not (isinstance(stage, LlmAgent) and stage.output_key):
+                raise ValueError(
+                    f"Stage `{stage.name}` of `{self.name}` must be an LlmAgent"
+                    " with an output_key"
+                )
+        for previous, stage in zip(self.sub_agents, self.sub_agents[1:]):
+            if previous.output_key not in reads(stage):
+                raise ValueError(
+                    f"Stage `{stage.name}` must read {{{previous.output_key}}}"
+                    f" from `{previous.name}`"
+                )
+
+    def split(self, text: str) -> list[str]:
+        """Non-empty sections of ``text``."""
+        return [s for s in re.split(self.section_break, text) if s.strip()]
+
+    async def _run_section(
+        self,
+        ctx: InvocationContext,
+        history: list[Event],
+        index: int,
+        section: str,
+        outputs: list[dict[int, tuple[str, list]]],
+    ) -> None:
+        """Runs ``section`` through every stage after the first."""
+        value = section
+        for previous, stage, stage_outputs in zip(
+            self.sub_agents, self.sub_agents[1:], outputs
+        ):
+            # A private view of the session, with this section in place of
+            # the previous stage's whole output
+            session = ctx.session.model_copy(
+                update={
+                    "state": {**ctx.session.state, previous.output_key: value},
+                    "events": list(history),
+                }
+            )
+            branch = f"{self.name}.{stage.name}.{index}"
+            stage_ctx = ctx.model_copy(
+                update={
+                    "session": session,
+                    "branch": f"{ctx.branch}.{branch}" if ctx.branch else branch,
+                }
+            )
+            text, usages = "", []
+            async with aclosing(stage.run_async(stage_ctx)) as events:
+                async for event in events:
+                    if event.usage_metadata and not event.partial:
+                        usages.append(event.usage_metadata)
+                    if event.is_final_response():
+                        text = _text(event)
+            stage_outputs[index] = (text, usages)
+            value = text
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        if not self.sub_agents:
+            return
+        first = self.sub_agents[0]
+        run_config = ctx.run_config or RunConfig()
+        forward_partial = run_config.streaming_mode == StreamingMode.SSE
+        first_ctx = ctx.model_copy(
+            update={
+                "run_config": run_config.model_copy(
+                    update={"streaming_mode": StreamingMode.SSE}
+                )
+            }
+        )
+        history = list(ctx.session.events)
+        # Per later stage: section index -> (text, usage of its calls)
+        outputs: list[dict[int, tuple[str, list]]] = [{} for _ in self.sub_agents[1:]]
+
+        async with asyncio.TaskGroup() as group:
+            started = 0
+            streamed = ""
+
+            def start(sections: list[str]) -> None:
+                nonlocal started
+                for section in sections[started:]:
+                    group.create_task(
+                        self._run_section(ctx, history, started, section, outputs)
+                    )
+                    started += 1
+
+            async with aclosing(first.run_async(first_ctx)) as events:
+                async for event in events:
+                    if event.partial:
+                        streamed += _text(event)
+                        # The last section may still grow
+                        start(self.split(streamed)[:-1])
+                        if forward_partial:
+                            yield event
+                        continue
+                    if event.is_final_response():
+                        start(self.split(_text(event)))
+                    streamed = ""
+                    yield event
+
+        for stage, stage_outputs in zip(self.sub_agents[1:], outputs):
+            sections = [stage_outputs[i] for i in sorted(stage_outputs)]
+            text = self.joiner.join(text for text, _ in sections)
+            yield Event(
+                invocation_id=ctx.invocation_id,
+                author=stage.name,
+                branch=ctx.branch,
+                content=types.Content(role="model", parts=[types.Part(text=text)]),
+                actions=EventActions(state_delta={stage.output_key: text}),
+                usage_metadata=_total_usage(
+                    [usage for _, usages in sections for usage in usages]
+                ),
+            )
+
+    async def _run_live_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        raise NotImplementedError("PipelinedAgent does not support live runs.")
+        yield
+
+
+def pipelined(
+    agent: SequentialAgent,
+    name: str | None = None,
+    instructions: dict[str, str] | None = None,
+    **options: Any,
+) -> PipelinedAgent:
+    """``PipelinedAgent`` with the (cloned) stages of ``agent``.
+
+    Args:
+        agent: A ``SequentialAgent`` of ``LlmAgent`` stages, each reading
+            the previous one's ``output_key``.
+        name: Defaults to ``"Pipelined" + agent.name``.
+        instructions: Replacement instructions by stage name.
+        **options: ``PipelinedAgent`` fields, e.g. ``section_break``.
+    """
+    instructions = instructions or {}
+    stages = [
+        stage.clone(update={"instruction": instructions[stage.name]})
+        if stage.name in instructions
+        else stage.clone()
+        for stage in agent.sub_agents
+    ]
+    return PipelinedAgent(
+        name=name or f"Pipelined{agent.name}", sub_agents=stages, **options
+    )
@@ -0,0 +1,433 @@
+"""Process-wide rate limiting, retry budget and circuit breaker for models.
+
+Every agent in the notebooks builds its own ``Gemini(retry_options=...)``
+with ``exp_base=7``, so during a 429 storm each one retries on its own
+schedule (up to 7^4 seconds apart) and together they keep the endpoint
+overloaded. ``LimitedLlm`` wraps a model the way ``CachedLlm`` does and
+sends every call through one shared ``ModelLimiter``:
+
+    model=LimitedLlm(llm=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config))
+
+with ``retry_config`` set to a single attempt, so retrying happens here
+and nowhere else. The limiter combines:
+
+- token buckets for requests/min and (estimated) tokens/min. The request
+  rate is adaptive: a 429 halves it and pauses every caller for the
+  server's ``RetryInfo`` delay, and successes creep it back up;
+- a retry budget for 5xx and connection failures: those retries are
+  allowed only up to a fraction of recent requests, so an outage can't
+  multiply the load. A 429 is retried without drawing on it, once the
+  throttled request bucket lets the call through;
+- full-jitter exponential backoff for failures, honouring the server's
+  ``RetryInfo`` delay when it sends one;
+- a circuit breaker that fails calls fast after repeated 5xx or
+  connection failures and lets a single probe through once
+  ``reset_timeout`` passes. A 429 only slows the rate down: the endpoint
+  is up, just busy.
+
+``model_limiter`` is the shared instance; ``configure`` retunes it.
+"""
+
+import asyncio
+import random
+import re
+import time
+from collections.abc import AsyncGenerator, Callable
+from typing import Any
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from pydantic import Field, model_validator
+
+from helpers.stub_model import count_tokens, request_text
+
+RETRY_CODES = (429, 500, 502, 503, 504)
+
+
+class CircuitOpenError(RuntimeError):
+    """The model endpoint failed repeatedly; calls are refused for now."""
+
+
+class TokenBucket:
+    """Async token bucket refilled continuously at ``rate_per_min``.
+
+    Args:
+        rate_per_min: Sustained rate.
+        burst: Bucket size, i.e. how much can be taken at once after an
+            idle period; defaults to one second's worth at the current
+            rate (at least 1).
+        min_rate_per_min: Floor for the adaptive rate, see ``throttle``.
+    """
+
+    def __init__(
+        self,
+        rate_per_min: float,
+        burst: float | None = None,
+        min_rate_per_min: float | None = None,
+    ):
+        self.max_rate = rate_per_min / 60
+        self.rate = self.max_rate
+        self.min_rate = (min_rate_per_min or rate_per_min / 20) / 60
+        self.burst = burst
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._throttled = 0.0
+
+    @property
+    def capacity(self) -> float:
+        return self.burst or max(1.0, self.rate)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0) -> float:
+        """Waits until ``amount`` tokens are available and takes them.
+
+        Amounts larger than the bucket are capped at its size, so one big
+        request isn't blocked forever.
+
+        Returns:
+            Seconds spent waiting.
+        """
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return waited
+            delay = (amount - self.tokens) / self.rate
+            await asyncio.sleep(delay)
+            waited += delay
+
+    def adjust(self, amount: float) -> None:
+        """Takes (or, if negative, returns) tokens after the fact.
+
+        Used to settle estimated token counts against the actual usage;
+        the bucket may go into debt.
+        """
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+    def throttle(self, pause: float = 0.0) -> None:
+        """Halves the rate (down to the floor) after the server pushed back.
+
+        The bucket is emptied, and put ``pause`` seconds into debt, so
+        every queued call waits as well. Pushback arriving within a second
+        of the last counts once: calls sent in the same burst all fail
+        together.
+        """
+        self._refill()
+        self.tokens = min(self.tokens, -pause * self.rate)
+        now = time.monotonic()
+        if now - self._throttled >= 1.0:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._throttled = now
+
+    def recover(self) -> None:
+        """Raises the rate a step (up to the configured rate) after a success."""
+        self.rate = min(self.max_rate, self.rate + self.max_rate / 100)
+
+
+class RetryBudget:
+    """Allows retries up to ``ratio`` of the requests made recently.
+
+    Every first attempt deposits ``ratio`` into the budget and every retry
+    withdraws 1. A small time-based allowance (``min_per_sec``) keeps a
+    quiet process able to retry at all.
+
+    Args:
+        ratio: Retries allowed per request.
+        min_per_sec: Retries allowed per second regardless of traffic.
+        max_balance: Most retries that can be saved up.
+    """
+
+    def __init__(
+        self, ratio: float = 0.2, min_per_sec: float = 0.2, max_balance: float = 10
+    ):
+        self.ratio = ratio
+        self.min_per_sec = min_per_sec
+        self.max_balance = max_balance
+        self.balance = max_balance
+        self._updated = time.monotonic()
+
+    def _accrue(self, amount: float = 0.0) -> None:
+        now = time.monotonic()
+        accrued = (now - self._updated) * self.min_per_sec + amount
+        self.balance = min(self.max_balance, self.balance + accrued)
+        self._updated = now
+
+    def deposit(self) -> None:
+        self._accrue(self.ratio)
+
+    def withdraw(self) -> bool:
+        """Takes one retry from the budget, if there is one."""
+        self._accrue()
+        if self.balance < 1:
+            return False
+        self.balance -= 1
+        return True
+
+
+class CircuitBreaker:
+    """Closed -> open after ``failure_threshold`` failures in a row.
+
+    While open, calls are refused until ``reset_timeout`` has passed; then
+    one probe call is let through (half open). Its success closes the
+    breaker, its failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 8, reset_timeout: float = 20.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self._opened = 0.0
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if (
+            self.state == "open"
+            and time.monotonic() - self._opened >= self.reset_timeout
+        ):
+            self.state = "half_open"
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.state = "open"
+            self._opened = time.monotonic()
+
+
+def _status_code(error: BaseException) -> int | None:
+    code = getattr(error, "code", None)
+    return code if isinstance(code, int) else None
+
+
+def _retry_after(error: BaseException) -> float | None:
+    """The ``RetryInfo`` delay of a Gemini error, e.g. ``"7s"`` -> 7.0."""
+    details = getattr(error, "details", None)
+    if not isinstance(details, dict):
+        return None
+    for detail in details.get("error", {}).get("details", []):
+        if str(detail.get("@type", "")).endswith("RetryInfo"):
+            match = re.fullmatch(r"([\d.]+)s", str(detail.get("retryDelay", "")))
+            if match:
+                return float(match.group(1))
+    return None
+
+
+class ModelLimiter:
+    """Shared admission control and retry policy for model calls.
+
+    Args:
+        requests_per_min: Request rate across every model using this
+            limiter (adaptive, see ``TokenBucket.throttle``).
+        tokens_per_min: Prompt + output token rate; ``None`` for no limit.
+        max_attempts: Attempts per call, the first one included.
+        base_delay: Backoff before the first retry, doubled per retry and
+            fully jittered.
+        max_delay: Cap on a single backoff.
+        retry_ratio: Retries after 5xx or connection failures allowed per
+            request, see ``RetryBudget``.
+        failure_threshold: 5xx or connection failures in a row that open
+            the circuit breaker.
+        reset_timeout: Seconds the breaker stays open before a probe.
+    """
+
+    def __init__(
+        self,
+        requests_per_min: float = 60,
+        tokens_per_min: float | None = 250_000,
+        max_attempts: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        retry_ratio: float = 0.2,
+        failure_threshold: int = 8,
+        reset_timeout: float = 20.0,
+    ):
+        self.configure(
+            requests_per_min=requests_per_min,
+            tokens_per_min=tokens_per_min,
+            max_attempts=max_attempts,
+            base_delay=base_delay,
+            max_delay=max_delay,
+            retry_ratio=retry_ratio,
+            failure_threshold=failure_threshold,
+            reset_timeout=reset_timeout,
+        )
+
+    def configure(
+        self,
+        requests_per_min: float = 60,
+        tokens_per_min: float | None = 250_000,
+        max_attempts: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        retry_ratio: float = 0.2,
+        failure_threshold: int = 8,
+        reset_timeout: float = 20.0,
+    ) -> None:
+        """Replaces the limits and resets the counters.
+
+        Takes the same arguments as the constructor.
+        """
+        self.requests = TokenBucket(requests_per_min)
+        self.tokens = TokenBucket(tokens_per_min) if tokens_per_min else None
+        self.budget = RetryBudget(ratio=retry_ratio)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._stats = {
+            "calls": 0,
+            "attempts": 0,
+            "retries": 0,
+            "throttled": 0,
+            "budget_exhausted": 0,
+            "rejected": 0,
+            "failed": 0,
+            "wait_s": 0.0,
+        }
+
+    def _backoff(self, retry: int, error: BaseException) -> float:
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2**retry))
+        server_delay = _retry_after(error)
+        if server_delay is not None:
+            delay = max(delay, min(server_delay, self.max_delay))
+        return delay
+
+    async def run(
+        self,
+        call: Callable[[], AsyncGenerator[LlmResponse, None]],
+        tokens: int = 0,
+    ) -> AsyncGenerator[LlmResponse, None]:
+        """Runs ``call`` under the limits, retrying retryable errors.
+
+        A streamed call is only retried if it failed before yielding
+        anything, so callers never see a response twice.
+
+        Args:
+            call: Starts one attempt, e.g. ``lambda: llm.generate_content_async(...)``.
+            tokens: Estimated prompt tokens, charged to the token bucket
+                up front and settled against the reported usage.
+
+        Raises:
+            CircuitOpenError: If the breaker is open.
+        """
+        self._stats["calls"] += 1
+        self.budget.deposit()
+        for attempt in range(self.max_attempts):
+            if not self.breaker.allow():
+                self._stats["rejected"] += 1
+                raise CircuitOpenError(
+                    "Model endpoint is failing; not calling it for "
+                    f"{self.breaker.reset_timeout:g}s"
+                )
+            waited = await self.requests.acquire()
+            if self.tokens is not None:
+                waited += await self.tokens.acquire(tokens)
+            self._stats["wait_s"] += waited
+            self._stats["attempts"] += 1
+
+            yielded = False
+            usage = 0
+            try:
+                async for response in call():
+                    yielded = True
+                    if response.usage_metadata:
+                        usage = response.usage_metadata.total_token_count or usage
+                    yield response
+            except Exception as e:
+                code = _status_code(e)
+                if code not in RETRY_CODES:
+                    # The endpoint answered (e.g. a 400), so it is up; an
+                    # error without a status never reached it
+                    if code is None:
+                        self.breaker.record_failure()
+                    else:
+                        self.breaker.record_success()
+                    raise
+                if code == 429:
+                    # Busy, not down: slow down but keep the breaker closed
+                    self._stats["throttled"] += 1
+                    self.requests.throttle(_retry_after(e) or 0.0)
+                    self.breaker.record_success()
+                else:
+                    self.breaker.record_failure()
+                if yielded or attempt + 1 == self.max_attempts:
+                    self._stats["failed"] += 1
+                    raise
+                if code == 429:
+                    # The throttled request bucket paces this retry, with
+                    # every other call; the budget is kept for failures
+                    self._stats["retries"] += 1
+                    continue
+                if not self.budget.withdraw():
+                    self._stats["budget_exhausted"] += 1
+                    self._stats["failed"] += 1
+                    raise
+                self._stats["retries"] += 1
+                await asyncio.sleep(self._backoff(attempt, e))
+                continue
+
+            self.breaker.record_success()
+            self.requests.recover()
+            if self.tokens is not None and usage:
+                self.tokens.adjust(usage - min(tokens, self.tokens.capacity))
+            return
+
+    def stats(self) -> dict[str, Any]:
+        """Counters plus the current request rate and breaker state."""
+        return {
+            **self._stats,
+            "requests_per_min": round(self.requests.rate * 60, 1),
+            "breaker": self.breaker.state,
+        }
+
+
+model_limiter = ModelLimiter()
+
+
+class LimitedLlm(BaseLlm):
+    """Sends a model's calls through a shared ``ModelLimiter``.
+
+    Use it wherever a ``Gemini`` object goes (inside ``CachedLlm``, so
+    cache hits don't use up the rate):
+
+        model=LimitedLlm(llm=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config))
+
+    Give the wrapped model a single attempt (``HttpRetryOptions(attempts=1)``)
+    so it doesn't retry on its own as well.
+    """
+
+    llm: BaseLlm
+    limiter: ModelLimiter = Field(default_factory=lambda: model_limiter)
+
+    @model_validator(mode="before")
+    @classmethod
+    def _copy_model_name(cls, data: Any) -> Any:
+        if isinstance(data, dict) and "model" not in data and "llm" in data:
+            data["model"] = data["llm"].model
+        return data
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ):
+        tokens = count_tokens(request_text(llm_request))
+        async for response in self.limiter.run(
+            lambda: self.llm.generate_content_async(llm_request, stream), tokens
+        ):
+            yield response
@@ -0,0 +1,260 @@
+"""Local code execution in a pool of warm, sandboxed Python workers.
+
+``BuiltInCodeExecutor`` runs the code an agent writes on the model side.
+``SandboxedCodeExecutor`` runs it here instead, next to local data, in
+worker processes that were started ahead of time:
+
+    calculation_agent = LlmAgent(..., code_executor=SandboxedCodeExecutor())
+
+Each worker (``helpers/sandbox_worker.py``) is an isolated-mode
+interpreter with resource limits, no network, no new processes, and
+file access confined to its own scratch directory (plus reading the
+Python installation); see that module for the details. Workers are
+started when the pool is created and kept warm between executions, and
+run every snippet in a child forked for it, so a snippet costs a fork
+and a pipe round trip rather than an interpreter start, and can't leave
+anything behind for the next one. A snippet that runs past ``timeout``
+is killed by its worker; a worker that stops answering is killed and
+replaced, and every worker is replaced after ``max_executions``
+snippets. Each execution is an ``execute_code`` span (see
+``helpers/tracing.py``).
+"""
+
+import contextlib
+import json
+import os
+import select
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+from collections import deque
+from pathlib import Path
+
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.code_executors import BaseCodeExecutor
+from google.adk.code_executors.code_execution_utils import (
+    CodeExecutionInput,
+    CodeExecutionResult,
+)
+from opentelemetry import trace
+from pydantic import Field, PrivateAttr
+
+WORKER_PATH = Path(__file__).with_name("sandbox_worker.py")
+# Seconds past the snippet's timeout before the worker itself is given up on
+KILL_GRACE = 2.0
+
+tracer = trace.get_tracer(__name__)
+
+
+class SandboxWorker:
+    """One warm worker process and its scratch directory."""
+
+    def __init__(self, memory_mb: int, file_mb: int):
+        self._scratch = tempfile.TemporaryDirectory(prefix="sandbox-")
+        config = {
+            "scratch": self._scratch.name,
+            "memory_mb": memory_mb,
+            "file_mb": file_mb,
+        }
+        self.process = subprocess.Popen(
+            [sys.executable, "-I", str(WORKER_PATH), json.dumps(config)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd=self._scratch.name,
+            start_new_session=True,
+        )
+        self.executions = 0
+        self._ready = False
+
+    def _read(self, timeout: float) -> dict:
+        readable, _, _ = select.select([self.process.stdout], [], [], timeout)
+        if not readable:
+            raise TimeoutError
+        line = self.process.stdout.readline()
+        if not line:
+            raise EOFError("Sandbox worker exited")
+        return json.loads(line)
+
+    def run(self, code: str, timeout: float, startup_timeout: float) -> dict:
+        """Executes ``code`` and returns ``{"stdout": ..., "stderr": ...}``.
+
+        Raises:
+            TimeoutError: If the worker didn't answer within ``timeout``.
+            EOFError: If the worker died (e.g. killed by a resource limit).
+        """
+        if not self._ready:
+            self._read(startup_timeout)
+            self._ready = True
+        request = {"code": code, "timeout": timeout}
+        self.process.stdin.write(json.dumps(request).encode() + b"\n")
+        self.process.stdin.flush()
+        self.executions += 1
+        # The worker kills the snippet itself; this is for a stuck worker
+        return self._read(timeout + KILL_GRACE)
+
+    def kill(self) -> None:
+        # The whole process group: the worker and a snippet's child
+        with contextlib.suppress(ProcessLookupError):
+            os.killpg(self.process.pid, signal.SIGKILL)
+        self.process.wait()
+        for stream in (self.process.stdin, self.process.stdout):
+            stream.close()
+        self._scratch.cleanup()
+
+
+class SandboxPool:
+    """Keeps ``size`` warm workers and hands one to each execution.
+
+    Args:
+        size: Workers kept warm. An execution that finds none idle starts
+            one on the spot (a cold start).
+        timeout: Seconds a snippet may run before it is killed.
+        memory_mb: Address space limit of a worker.
+        file_mb: Largest file a snippet may write.
+        max_executions: Snippets a worker runs before it is replaced.
+        startup_timeout: Seconds to wait for a new worker to be ready.
+    """
+
+    def __init__(
+        self,
+        size: int = 2,
+        timeout: float = 10.0,
+        memory_mb: int = 512,
+        file_mb: int = 16,
+        max_executions: int = 100,
+        startup_timeout: float = 10.0,
+    ):
+        self.size = size
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self.file_mb = file_mb
+        self.max_executions = max_executions
+        self.startup_timeout = startup_timeout
+        self._idle: deque[SandboxWorker] = deque()
+        self._lock = threading.Lock()
+        self._stats = {"executions": 0, "cold_starts": 0, "timeouts": 0, "crashes": 0}
+        for _ in range(size):
+            self._idle.append(self._spawn())
+
+    def _spawn(self) -> SandboxWorker:
+        return SandboxWorker(self.memory_mb, self.file_mb)
+
+    def _acquire(self) -> SandboxWorker:
+        with self._lock:
+            if self._idle:
+                return self._idle.popleft()
+            self._stats["cold_starts"] += 1
+        return self._spawn()
+
+    def _release(self, worker: SandboxWorker | None) -> None:
+        # A dead or worn-out worker is replaced right away, so the next
+        # execution still finds a warm one
+        if worker is not None and worker.executions >= self.max_executions:
+            worker.kill()
+            worker = None
+        with self._lock:
+            if len(self._idle) >= self.size:
+                if worker is not None:
+                    worker.kill()
+                return
+            self._idle.append(worker or self._spawn())
+
+    def execute(self, code: str) -> tuple[str, str]:
+        """Runs ``code`` in a warm worker.
+
+        Returns:
+            ``(stdout, stderr)``; timeouts and crashed workers are
+            reported in ``stderr``.
+        """
+        worker = self._acquire()
+        self._stats["executions"] += 1
+        try:
+            result = worker.run(code, self.timeout, self.startup_timeout)
+        except TimeoutError:
+            self._stats["timeouts"] += 1
+            worker.kill()
+            self._release(None)
+            return "", f"Execution timed out after {self.timeout:g} seconds"
+        except (EOFError, OSError, ValueError):
+            self._stats["crashes"] += 1
+            worker.kill()
+            self._release(None)
+            return "", "Execution failed: the sandbox worker exited"
+        if result.get("timed_out"):
+            self._stats["timeouts"] += 1
+        self._release(worker)
+        return result["stdout"], result["stderr"]
+
+    def stats(self) -> dict[str, int]:
+        """Execution, cold start, timeout and crash counts, and idle workers."""
+        return {**self._stats, "idle": len(self._idle)}
+
+    def close(self) -> None:
+        """Stops every idle worker."""
+        with self._lock:
+            while self._idle:
+                self._idle.popleft().kill()
+
+
+class SandboxedCodeExecutor(BaseCodeExecutor):
+    """Runs agent-written code in a local pool of sandboxed workers.
+
+    Like ``UnsafeLocalCodeExecutor`` it is stateless: every code block
+    runs in fresh globals. Unlike it, the code runs in a separate, locked
+    down process with a timeout, and the worker processes are started
+    once up front (``pool_size`` of them) instead of per execution.
+
+    ``execute_code`` is synchronous, as ADK calls it, so the event loop
+    waits for the snippet; ``timeout`` bounds that wait.
+    """
+
+    stateful: bool = Field(default=False, frozen=True, exclude=True)
+    optimize_data_file: bool = Field(default=False, frozen=True, exclude=True)
+
+    pool_size: int = 2
+    """Workers kept warm."""
+    timeout: float = 10.0
+    """Seconds a code block may run."""
+    memory_mb: int = 512
+    """Address space limit of a worker."""
+    max_executions: int = 100
+    """Code blocks a worker runs before it is replaced."""
+
+    _pool: SandboxPool = PrivateAttr()
+
+    def __init__(self, **data):
+        if data.get("stateful"):
+            raise ValueError("Cannot set `stateful=True` in SandboxedCodeExecutor.")
+        if data.get("optimize_data_file"):
+            raise ValueError(
+                "Cannot set `optimize_data_file=True` in SandboxedCodeExecutor."
+            )
+        super().__init__(**data)
+        self._pool = SandboxPool(
+            size=self.pool_size,
+            timeout=self.timeout,
+            memory_mb=self.memory_mb,
+            max_executions=self.max_executions,
+        )
+
+    def execute_code(
+        self,
+        invocation_context: InvocationContext,
+        code_execution_input: CodeExecutionInput,
+    ) -> CodeExecutionResult:
+        with tracer.start_as_current_span("execute_code") as span:
+            span.set_attribute("code.lines", code_execution_input.code.count("\n") + 1)
+            stdout, stderr = self._pool.execute(code_execution_input.code)
+            span.set_attribute("code.failed", bool(stderr))
+        return CodeExecutionResult(stdout=stdout, stderr=stderr, output_files=[])
+
+    def stats(self) -> dict[str, int]:
+        """See ``SandboxPool.stats``."""
+        return self._pool.stats()
+
+    def close(self) -> None:
+        """Stops the worker processes."""
+        self._pool.close()
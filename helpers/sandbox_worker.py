@@ -0,0 +1,275 @@
+"""Warm Python worker process for ``helpers.sandbox``.
+
+Run as a script in isolated mode (``python -I sandbox_worker.py CONFIG``)
+by ``SandboxPool``, never imported. It locks itself down once at startup
+and imports commonly used modules up front, then forks a child per
+request to execute the snippet. Nothing a snippet changes (builtins,
+``sys.modules``, globals) outlives its child, and forking the warm worker
+costs far less than starting an interpreter. The lockdown:
+
+- resource limits (address space, file size, open files) via
+  ``setrlimit``, and no new processes in the child (``RLIMIT_NPROC`` 0,
+  which the kernel doesn't enforce for root);
+- no network: a fresh network namespace where the kernel allows it, and
+  in any case an audit hook that refuses sockets, subprocesses, ``ctypes``
+  and ``_posixsubprocess``, writes outside the scratch directory, and
+  reads outside it and the Python installation (so no ``.env`` files or
+  credentials).
+
+Requests and responses are single JSON lines: ``{"code": ..., "timeout":
+...}`` on stdin, ``{"stdout": ..., "stderr": ...}`` on the original
+stdout, plus ``"timed_out": true`` if the child was killed for running
+past ``timeout``. The snippet's own output is captured, file
+descriptors 1 and 2 point at ``/dev/null``, and the child closes every
+other descriptor but its results pipe, so stray writes can't corrupt
+the protocol; whatever comes back on that pipe is validated.
+
+Only the standard library may be imported here.
+"""
+
+import contextlib
+import io
+import json
+import os
+import resource
+import select
+import signal
+import sys
+import time
+import traceback
+
+PRELOAD = ("math", "decimal", "fractions", "statistics", "datetime", "json", "re")
+MAX_OUTPUT = 64 * 1024  # characters of stdout/stderr sent back
+MAX_REPLY = 4 * MAX_OUTPUT  # bytes a child may send before it is killed
+
+# Audit events refused outright (exact names or prefixes ending in ".")
+BLOCKED_EVENTS = (
+    "socket.",
+    "ctypes.",
+    "subprocess.Popen",
+    "os.system",
+    "os.exec",
+    "os.posix_spawn",
+    "os.spawn",
+    "os.fork",
+    "os.forkpty",
+    "os.kill",
+    "os.killpg",
+    "pty.spawn",
+)
+# Modules that may not be imported: ``_posixsubprocess.fork_exec`` starts
+# programs without raising any audit event
+BLOCKED_MODULES = {"_posixsubprocess"}
+# Audit events reading a path, allowed inside the scratch directory and
+# the Python installation only
+READ_EVENTS = {"os.listdir", "os.scandir"}
+# Audit events allowed only for paths inside the scratch directory
+PATH_EVENTS = {
+    "os.remove",
+    "os.rename",
+    "os.rmdir",
+    "os.mkdir",
+    "os.chmod",
+    "os.chown",
+    "os.link",
+    "os.symlink",
+    "os.truncate",
+    "os.utime",
+    "shutil.rmtree",
+}
+WRITE_FLAGS = os.O_WRONLY | os.O_RDWR | os.O_CREAT | os.O_APPEND | os.O_TRUNC
+
+
+def _limit(kind: int, value: int) -> None:
+    # Lowering the hard limit too, so the snippet can't raise it again
+    _, hard = resource.getrlimit(kind)
+    if hard != resource.RLIM_INFINITY:
+        value = min(value, hard)
+    resource.setrlimit(kind, (value, value))
+
+
+def _isolate_network() -> None:
+    # An empty network namespace (only a down loopback) where unprivileged
+    # user namespaces are enabled; the audit hook covers the rest
+    with contextlib.suppress(AttributeError, OSError):
+        os.unshare(os.CLONE_NEWUSER | os.CLONE_NEWNET)
+
+
+def _python_paths() -> tuple[str, ...]:
+    # In isolated mode sys.path is only the standard library, its
+    # extension modules and site-packages
+    return tuple({os.path.realpath(path) for path in sys.path if os.path.isdir(path)})
+
+
+def _audit_hook(scratch: str, worker_pid: int):
+    readable = (scratch, *_python_paths())
+
+    def under(path, roots: tuple[str, ...]) -> bool:
+        if isinstance(path, int):
+            return True
+        if isinstance(path, bytes):
+            path = os.fsdecode(path)
+        real = os.path.realpath(os.fspath(path))
+        return any(real == root or real.startswith(root + os.sep) for root in roots)
+
+    def inside(path) -> bool:
+        return under(path, (scratch,))
+
+    def hook(event: str, args: tuple) -> None:
+        if event in ("os.fork", "os.kill") and os.getpid() == worker_pid:
+            return  # the worker forking (or killing) a snippet's child
+        if event.startswith(BLOCKED_EVENTS):
+            raise PermissionError(f"{event} is not allowed in the sandbox")
+        if event == "import" and args[0] in BLOCKED_MODULES:
+            raise PermissionError(f"Importing {args[0]} is not allowed")
+        if event == "open":
+            path, mode, flags = args
+            if path is None:
+                return
+            writing = (mode and any(c in mode for c in "wax+")) or (flags & WRITE_FLAGS)
+            if writing and not inside(path):
+                raise PermissionError(f"Writing to {path} is not allowed")
+            if not under(path, readable):
+                raise PermissionError(f"Reading {path} is not allowed")
+        elif event in READ_EVENTS:
+            if args[0] is not None and not under(args[0], readable):
+                raise PermissionError(f"Reading {args[0]} is not allowed")
+        elif event in PATH_EVENTS:
+            paths = [arg for arg in args if isinstance(arg, (str, bytes, os.PathLike))]
+            if not all(inside(path) for path in paths):
+                raise PermissionError(f"{event} outside the sandbox is not allowed")
+
+    return hook
+
+
+def _truncate(text: str) -> str:
+    if len(text) <= MAX_OUTPUT:
+        return text
+    return text[:MAX_OUTPUT] + f"\n... ({len(text) - MAX_OUTPUT} characters cut)"
+
+
+def execute(code: str) -> dict:
+    """Runs one snippet in fresh globals and captures its output.
+
+    Only ever called in a forked child, which exits afterwards.
+    """
+    globals_ = {"__name__": "__main__", "__builtins__": __builtins__}
+    stdout, stderr = io.StringIO(), io.StringIO()
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        try:
+            exec(compile(code, "<sandbox>", "exec"), globals_)
+        except BaseException:
+            # Keep the frames of the snippet, not the worker's own
+            lines = traceback.format_exc().splitlines()
+            start = next((i for i, line in enumerate(lines) if "<sandbox>" in line), 1)
+            stderr.write("\n".join(lines[:1] + lines[start:]) + "\n")
+    return {
+        "stdout": _truncate(stdout.getvalue()),
+        "stderr": _truncate(stderr.getvalue()),
+    }
+
+
+def _child(code: str, results: int) -> None:
+    try:
+        # Only the results pipe and /dev/null on 0-2 stay open: the
+        # worker's protocol descriptors would let a snippet forge replies
+        os.closerange(3, results)
+        os.closerange(results + 1, resource.getrlimit(resource.RLIMIT_NOFILE)[0])
+        # No fork, no exec: nothing else may run as this user from here on
+        resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+        response = execute(code)
+        with os.fdopen(results, "w", encoding="utf-8") as out:
+            out.write(json.dumps(response))
+    finally:
+        os._exit(0)
+
+
+def run_forked(code: str, timeout: float) -> dict:
+    """Executes ``code`` in a child of this worker, killed after ``timeout``."""
+    results, child_results = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(results)
+        _child(code, child_results)
+    os.close(child_results)
+
+    chunks = []
+    size = 0
+    timed_out = too_long = False
+    with os.fdopen(results, "rb") as pipe:
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([pipe], [], [], remaining)[0]:
+                timed_out = True
+                os.kill(pid, signal.SIGKILL)
+                break
+            chunk = os.read(pipe.fileno(), 65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            size += len(chunk)
+            if size > MAX_REPLY:
+                too_long = True
+                os.kill(pid, signal.SIGKILL)
+                break
+    _, status = os.waitpid(pid, 0)
+
+    if timed_out:
+        return {
+            "stdout": "",
+            "stderr": f"Execution timed out after {timeout:g} seconds",
+            "timed_out": True,
+        }
+    if not chunks:
+        reason = (
+            f"signal {os.WTERMSIG(status)}"
+            if os.WIFSIGNALED(status)
+            else f"status {os.waitstatus_to_exitcode(status)}"
+        )
+        return {"stdout": "", "stderr": f"Execution failed: killed by {reason}"}
+    # The snippet can write to the pipe itself, so the reply is checked
+    try:
+        response = None if too_long else json.loads(b"".join(chunks))
+    except ValueError:
+        response = None
+    if not (
+        isinstance(response, dict)
+        and isinstance(response.get("stdout"), str)
+        and isinstance(response.get("stderr"), str)
+    ):
+        return {"stdout": "", "stderr": "Execution failed: malformed result"}
+    return {"stdout": response["stdout"], "stderr": response["stderr"]}
+
+
+def main() -> None:
+    config = json.loads(sys.argv[1])
+    scratch = os.path.realpath(config["scratch"])
+    os.chdir(scratch)
+
+    # Protocol channel on private descriptors; 1 and 2 go to /dev/null
+    requests = os.fdopen(os.dup(0), "r", encoding="utf-8")
+    responses = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+
+    _limit(resource.RLIMIT_AS, config["memory_mb"] * 1024 * 1024)
+    _limit(resource.RLIMIT_FSIZE, config["file_mb"] * 1024 * 1024)
+    _limit(resource.RLIMIT_NOFILE, 64)
+    _isolate_network()
+    for name in PRELOAD:
+        __import__(name)
+    sys.addaudithook(_audit_hook(scratch, os.getpid()))
+
+    responses.write('{"ready": true}\n')
+    responses.flush()
+    for line in requests:
+        request = json.loads(line)
+        response = run_forked(request["code"], request["timeout"])
+        responses.write(json.dumps(response) + "\n")
+        responses.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Streaming access to a runner turn as typed deltas.
+
+``stream_turn`` runs one user message with SSE streaming switched on and
+yields a ``Delta`` for every text chunk, tool call and tool result as
+soon as it arrives, instead of waiting for whole events (or the whole
+turn). It also records time-to-first-token for the turn.
+
+    stream = stream_turn(runner, "user", session.id, "Hi!")
+    async for delta in stream:
+        if delta.kind == "text":
+            print(delta.text, end="", flush=True)
+    print(stream.time_to_first_token)
+"""
+
+import time
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from typing import Any, Literal
+
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.runners import Runner
+from google.genai import types
+
+
+@dataclass
+class Delta:
+    """One incremental piece of a turn.
+
+    Attributes:
+        kind: ``"text"``, ``"tool_call"`` or ``"tool_result"``.
+        author: Agent that produced the piece.
+        elapsed: Seconds since the turn started.
+        text: The text chunk, for ``"text"`` deltas.
+        name: Tool name, for tool deltas.
+        data: Call arguments or tool response, for tool deltas.
+    """
+
+    kind: Literal["text", "tool_call", "tool_result"]
+    author: str
+    elapsed: float
+    text: str | None = None
+    name: str | None = None
+    data: dict[str, Any] = field(default_factory=dict)
+
+
+class TurnStream:
+    """Async iterator of ``Delta`` for one turn; see ``stream_turn``.
+
+    Attributes:
+        time_to_first_token: Seconds until the first text chunk, or
+            ``None`` if the turn produced no text.
+        elapsed: Total seconds the turn took, set once iteration ends.
+        final_text: The complete text of the turn.
+    """
+
+    def __init__(
+        self,
+        runner: Runner,
+        user_id: str,
+        session_id: str,
+        message: str | types.Content,
+        streaming: bool = True,
+    ):
+        if isinstance(message, str):
+            message = types.Content(role="user", parts=[types.Part(text=message)])
+        self._runner = runner
+        self._user_id = user_id
+        self._session_id = session_id
+        self._message = message
+        self._run_config = RunConfig(
+            streaming_mode=StreamingMode.SSE if streaming else StreamingMode.NONE
+        )
+        self.time_to_first_token: float | None = None
+        self.elapsed: float | None = None
+        self.final_text = ""
+
+    async def __aiter__(self) -> AsyncIterator[Delta]:
+        start = time.perf_counter()
+        # Text already streamed as partial chunks is repeated in the final,
+        # aggregated event; remember it so it is only emitted once.
+        streamed_authors = set()
+
+        async for event in self._runner.run_async(
+            user_id=self._user_id,
+            session_id=self._session_id,
+            new_message=self._message,
+            run_config=self._run_config,
+        ):
+            if not (event.content and event.content.parts):
+                continue
+            now = time.perf_counter() - start
+            if event.partial:
+                streamed_authors.add(event.author)
+                already_streamed = False
+            else:
+                already_streamed = event.author in streamed_authors
+                streamed_authors.discard(event.author)
+
+            for part in event.content.parts:
+                if part.text and part.text != "None":
+                    if not event.partial:
+                        self.final_text += part.text
+                    if already_streamed:
+                        continue
+                    if self.time_to_first_token is None:
+                        self.time_to_first_token = now
+                    yield Delta("text", event.author, now, text=part.text)
+                elif part.function_call:
+                    yield Delta(
+                        "tool_call",
+                        event.author,
+                        now,
+                        name=part.function_call.name,
+                        data=part.function_call.args or {},
+                    )
+                elif part.function_response:
+                    yield Delta(
+                        "tool_result",
+                        event.author,
+                        now,
+                        name=part.function_response.name,
+                        data=part.function_response.response or {},
+                    )
+        self.elapsed = time.perf_counter() - start
+
+
+def stream_turn(
+    runner: Runner,
+    user_id: str,
+    session_id: str,
+    message: str | types.Content,
+    streaming: bool = True,
+) -> TurnStream:
+    """Streams one turn of ``runner`` as ``Delta`` objects.
+
+    Args:
+        runner: Runner to send the message through.
+        user_id: User the session belongs to.
+        session_id: Existing session to continue.
+        message: User message, as text or ``types.Content``.
+        streaming: Ask the model for SSE streaming. With ``False`` each
+            text part still arrives as one delta per event.
+
+    Returns:
+        A ``TurnStream``; iterate it with ``async for``.
+    """
+    return TurnStream(runner, user_id, session_id, message, streaming)
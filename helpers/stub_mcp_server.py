@@ -0,0 +1,119 @@
+"""Local stand-in for the "everything" MCP server used in day02.
+
+Speaks MCP over stdio like ``npx -y @modelcontextprotocol/server-everything``
+but needs no Node toolchain or network, so the MCP helpers can be run and
+benchmarked offline:
+
+    StdioServerParameters(
+        command=sys.executable,
+        args=["-m", "helpers.stub_mcp_server", "--startup-delay", "2"],
+    )
+
+``--startup-delay`` stands in for npx resolving the package and Node
+booting, which is what a fresh server costs in the notebooks.
+``registerTool`` adds a tool at runtime and sends
+``notifications/tools/list_changed``, for exercising tool-list caches.
+"""
+
+import argparse
+import random
+import struct
+import time
+import zlib
+
+import anyio
+from mcp.server.fastmcp import Context, FastMCP, Image
+
+
+def tiny_png(size: int = 16, rgb: tuple[int, int, int] = (66, 133, 244)) -> bytes:
+    """A solid ``size`` x ``size`` PNG, built without any imaging library."""
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+    row = b"\x00" + bytes(rgb) * size
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(row * size))
+        + chunk(b"IEND", b"")
+    )
+
+
+server = FastMCP("stub-everything")
+
+# Set from the command line: per-image latency and the share of image
+# calls that fail, to exercise batching and retries
+image_latency = 0.0
+failure_rate = 0.0
+
+
+@server.tool()
+async def getTinyImage() -> list:
+    """Returns the MCP_TINY_IMAGE."""
+    if image_latency:
+        await anyio.sleep(image_latency)
+    if random.random() < failure_rate:
+        raise RuntimeError("Image backend unavailable, try again")
+    return [
+        "This is a tiny image:",
+        Image(data=tiny_png(), format="png"),
+        "The image above is the MCP tiny image.",
+    ]
+
+
+@server.tool()
+def echo(message: str) -> str:
+    """Echoes back the input."""
+    return f"Echo: {message}"
+
+
+@server.tool()
+def add(a: float, b: float) -> float:
+    """Adds two numbers."""
+    return a + b
+
+
+@server.tool()
+async def registerTool(name: str, ctx: Context) -> str:
+    """Adds an echo tool called ``name`` and announces the new tool list."""
+
+    def extra(message: str) -> str:
+        return f"{name}: {message}"
+
+    server.add_tool(extra, name=name, description=f"Echo tool {name}.")
+    await ctx.session.send_tool_list_changed()
+    return f"Registered {name}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--startup-delay",
+        type=float,
+        default=0.0,
+        help="seconds to sleep before serving, to mimic npx/Node startup",
+    )
+    parser.add_argument(
+        "--image-latency",
+        type=float,
+        default=0.0,
+        help="seconds each getTinyImage call takes",
+    )
+    parser.add_argument(
+        "--failure-rate",
+        type=float,
+        default=0.0,
+        help="share of getTinyImage calls that fail (0-1)",
+    )
+    args = parser.parse_args()
+
+    global image_latency, failure_rate
+    image_latency, failure_rate = args.image_latency, args.failure_rate
+    time.sleep(args.startup_delay)
+    server.run("stdio")
+
+
+if __name__ == "__main__":
+    main()
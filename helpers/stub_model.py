@@ -0,0 +1,226 @@
+"""Deterministic, offline stand-in for the ``Gemini`` model.
+
+``ScriptedLlm`` plugs into any ``Agent(model=...)`` and replays a fixed
+script of responses instead of calling the network. It lets us run the
+day01 pipelines end to end and measure how much time the runner and the
+orchestration agents spend on their own, separately from model latency.
+"""
+
+import asyncio
+import random
+from collections.abc import Callable, Mapping
+from typing import Any
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.tools import AgentTool
+from google.genai import types
+from pydantic import Field, PrivateAttr
+
+# A scripted response can be plain text, one or more parts, a full
+# Content, or a callable that builds any of those from the request.
+Response = Any
+
+
+def function_call(name: str, /, **args) -> types.Part:
+    """Builds a function call part, e.g. to call a tool or an AgentTool.
+
+    Args:
+        name: Name of the tool (for an ``AgentTool``, the agent's name).
+        **args: Arguments passed to the tool.
+
+    Returns:
+        A ``types.Part`` holding the function call.
+    """
+    return types.Part.from_function_call(name=name, args=args)
+
+
+def count_tokens(text: str) -> int:
+    """Rough, deterministic token estimate (~4 characters per token)."""
+    return max(1, len(text) // 4) if text else 0
+
+
+def request_text(llm_request: LlmRequest) -> str:
+    """Concatenates the system instruction and every text part of a request."""
+    chunks = []
+    instruction = llm_request.config.system_instruction
+    if isinstance(instruction, str):
+        chunks.append(instruction)
+    for content in llm_request.contents:
+        for part in content.parts or []:
+            if part.text:
+                chunks.append(part.text)
+    return "\n".join(chunks)
+
+
+def _turn_index(llm_request: LlmRequest) -> int:
+    """Counts the model turns taken since the last user/context message.
+
+    Function responses are sent back with the ``user`` role but carry no
+    text, so they don't reset the count. This keeps the position in the
+    script a pure function of the request, which makes it safe to share
+    one stub across concurrent sessions.
+    """
+    turn = 0
+    for content in reversed(llm_request.contents):
+        if content.role == "model":
+            turn += 1
+        elif any(part.text for part in content.parts or []):
+            break
+    return turn
+
+
+def _to_content(response: Response) -> types.Content:
+    if isinstance(response, types.Content):
+        return response
+    if isinstance(response, str):
+        return types.Content(role="model", parts=[types.Part(text=response)])
+    if isinstance(response, types.Part):
+        return types.Content(role="model", parts=[response])
+    return types.Content(role="model", parts=list(response))
+
+
+class ScriptedLlm(BaseLlm):
+    """Replays a fixed list of responses, one per model turn.
+
+    The n-th model call within an agent's turn gets ``responses[n]``; once
+    the script runs out the last response is repeated. A typical script for
+    an agent that calls a tool and then answers is
+    ``[function_call("get_exchange_rate", ...), "The rate is 0.93."]``.
+
+    The model name defaults to a Gemini name so that built-in tools such as
+    ``google_search`` accept the request.
+    """
+
+    model: str = "gemini-2.5-flash-lite"
+    responses: list[Response] = Field(default_factory=lambda: ["OK"])
+    latency: float = 0.0
+    """Simulated model latency in seconds, added to every call."""
+    latency_per_token: float = 0.0
+    """Simulated prefill cost in seconds per prompt token."""
+    straggler_rate: float = 0.0
+    """Share of calls that take ``straggler_latency`` instead of ``latency``."""
+    straggler_latency: float = 0.0
+    """Simulated latency in seconds of a straggling call."""
+    chunk_size: int = 4
+    """Words per partial response when called with ``stream=True``."""
+    chunk_latency: float = 0.0
+    """Simulated delay in seconds between two streamed chunks."""
+
+    _calls: int = PrivateAttr(default=0)
+
+    @property
+    def calls(self) -> int:
+        """Number of ``generate_content_async`` calls served so far."""
+        return self._calls
+
+    def _respond(self, llm_request: LlmRequest) -> types.Content:
+        index = min(_turn_index(llm_request), len(self.responses) - 1)
+        response = self.responses[index]
+        if callable(response):
+            response = response(llm_request)
+        return _to_content(response)
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ):
+        self._calls += 1
+        prompt_tokens = count_tokens(request_text(llm_request))
+        latency = self.latency
+        if self.straggler_rate and random.random() < self.straggler_rate:
+            latency = self.straggler_latency
+        delay = latency + self.latency_per_token * prompt_tokens
+        if delay:
+            await asyncio.sleep(delay)
+
+        content = self._respond(llm_request)
+        if stream:
+            async for chunk in self._stream_chunks(content):
+                yield chunk
+
+        output_tokens = sum(count_tokens(part.text or "") for part in content.parts)
+        yield LlmResponse(
+            content=content,
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=prompt_tokens,
+                candidates_token_count=output_tokens,
+                total_token_count=prompt_tokens + output_tokens,
+            ),
+        )
+
+    async def _stream_chunks(self, content: types.Content):
+        """Yields the text of ``content`` as partial responses.
+
+        Mirrors Gemini's SSE streaming: the partial chunks are followed by
+        the aggregated response, which the caller sends.
+        """
+        text = "".join(part.text or "" for part in content.parts)
+        if not text:
+            return
+        words = text.split(" ")
+        for start in range(0, len(words), self.chunk_size):
+            if start and self.chunk_latency:
+                await asyncio.sleep(self.chunk_latency)
+            chunk = " ".join(words[start : start + self.chunk_size])
+            if start + self.chunk_size < len(words):
+                chunk += " "
+            yield LlmResponse(
+                content=types.Content(role="model", parts=[types.Part(text=chunk)]),
+                partial=True,
+            )
+
+
+def script_factory(
+    scripts: Mapping[str, list[Response]], latency: float = 0.0
+) -> Callable[[LlmAgent], ScriptedLlm]:
+    """Returns a ``make_model`` callback for ``with_model``.
+
+    Agents listed in ``scripts`` replay their own script; every other agent
+    answers with a short ``"<agent name> output"`` text.
+
+    Args:
+        scripts: Mapping of agent name to its list of responses.
+        latency: Simulated latency in seconds for every model call.
+    """
+
+    def make_model(agent: LlmAgent) -> ScriptedLlm:
+        responses = scripts.get(agent.name, [f"{agent.name} output"])
+        return ScriptedLlm(responses=list(responses), latency=latency)
+
+    return make_model
+
+
+def with_model(
+    agent: BaseAgent, make_model: Callable[[LlmAgent], BaseLlm]
+) -> BaseAgent:
+    """Clones an agent tree, swapping the model of every ``LlmAgent``.
+
+    Sub-agents and agents wrapped in ``AgentTool`` are cloned as well, so
+    the original tree (and its ``Gemini`` models) is left untouched.
+
+    Args:
+        agent: Root of the agent tree, e.g. ``research_root_agent``.
+        make_model: Called once per ``LlmAgent`` to build its new model.
+
+    Returns:
+        The cloned agent tree.
+    """
+    update: dict[str, Any] = {
+        "sub_agents": [
+            with_model(sub_agent, make_model) for sub_agent in agent.sub_agents
+        ]
+    }
+    if isinstance(agent, LlmAgent):
+        update["model"] = make_model(agent)
+        update["tools"] = [
+            AgentTool(
+                agent=with_model(tool.agent, make_model),
+                skip_summarization=tool.skip_summarization,
+            )
+            if isinstance(tool, AgentTool)
+            else tool
+            for tool in agent.tools
+        ]
+    return agent.clone(update=update)
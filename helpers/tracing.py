@@ -0,0 +1,339 @@
+"""Span tracing of agent runs, exported to a file or an OTLP collector.
+
+ADK already wraps its work in OpenTelemetry spans: ``invocation`` for a
+runner turn, ``invoke_agent <name>`` for every agent, ``call_llm`` for
+every model request and ``execute_tool <name>`` for every tool call. An
+``AgentTool`` runs its agent in a runner of its own, so that agent's
+spans nest under the ``execute_tool`` span that called it. The MCP pool
+(``helpers/mcp_pool.py``) adds a span per MCP request and
+``SandboxedCodeExecutor`` one per code execution. Without an SDK tracer
+provider all of these are no-ops; ``enable_tracing`` installs one:
+
+    tracing = enable_tracing(path=".cache/day02_spans.jsonl")
+    await runner.run_debug("Convert 1,250 USD to INR ...")
+    print(tracing.flame_graph())    # where the time went, as a tree
+
+Spans are kept in memory (the last ``max_spans``) for ``flame_graph``
+and ``folded``, appended to ``path`` as one JSON object per line, and
+sent to ``otlp_endpoint`` over OTLP/HTTP when set, e.g. a local
+collector or ``helpers/fake_collector.py``. ``folded`` writes the
+"folded stacks" format flamegraph.pl and speedscope read.
+
+Prompts and responses are left out of the spans unless
+``capture_content`` is set. One tracing is active at a time: calling
+``enable_tracing`` again (re-running a notebook cell) closes the
+previous one, so spans are never recorded twice.
+"""
+
+import json
+import logging
+import os
+import threading
+from collections import deque
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from opentelemetry import context, trace
+from opentelemetry.sdk.trace import ReadableSpan, SpanProcessor, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    SimpleSpanProcessor,
+    SpanExporter,
+    SpanExportResult,
+)
+
+
+class _PlaceholderFilter(logging.Filter):
+    """Drops the warnings about ADK's ``{}`` placeholder attributes.
+
+    With content capture off ADK sets some ``gcp.vertex.agent.*``
+    attributes to an empty dict, which OpenTelemetry rejects, with a
+    warning per span.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return not (
+            record.getMessage().startswith("Invalid type dict for attribute")
+            and "'gcp.vertex.agent." in record.getMessage()
+        )
+
+
+def span_record(span: ReadableSpan) -> dict[str, Any]:
+    """``span`` as a dict with the OTLP/JSON field names."""
+    context = span.get_span_context()
+    return {
+        "traceId": format(context.trace_id, "032x"),
+        "spanId": format(context.span_id, "016x"),
+        "parentSpanId": format(span.parent.span_id, "016x") if span.parent else "",
+        "name": span.name,
+        "startTimeUnixNano": span.start_time,
+        "endTimeUnixNano": span.end_time,
+        "status": span.status.status_code.name,
+        "attributes": dict(span.attributes or {}),
+    }
+
+
+class SpanBuffer(SpanExporter):
+    """Keeps the last ``max_spans`` finished spans in memory."""
+
+    def __init__(self, max_spans: int = 10_000):
+        self._spans: deque[dict[str, Any]] = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        if self._closed:
+            return SpanExportResult.FAILURE
+        records = [span_record(span) for span in spans]
+        with self._lock:
+            self._spans.extend(records)
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        self._closed = True
+
+    def spans(self) -> list[dict[str, Any]]:
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._spans.clear()
+
+
+class JsonLinesSpanExporter(SpanExporter):
+    """Appends finished spans to ``path``, one JSON object per line."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        with self.path.open("a") as file:
+            for span in spans:
+                file.write(json.dumps(span_record(span), default=str) + "\n")
+        return SpanExportResult.SUCCESS
+
+
+@dataclass
+class FlameNode:
+    """Spans sharing one stack of span names, and their total time."""
+
+    name: str
+    calls: int = 0
+    total_ms: float = 0.0
+    self_ms: float = 0.0
+    children: dict[str, "FlameNode"] = field(default_factory=dict)
+
+
+def _covered(intervals: list[tuple[int, int]]) -> int:
+    """Length of the union of ``intervals``."""
+    covered, end = 0, None
+    for low, high in sorted(intervals):
+        if end is None or low > end:
+            covered += high - low
+            end = high
+        elif high > end:
+            covered += high - end
+            end = high
+    return covered
+
+
+def flame_tree(spans: list[dict[str, Any]]) -> FlameNode:
+    """Merges ``spans`` by their stack of span names into one tree.
+
+    A span's self time is its duration minus the time covered by its
+    children; children that ran concurrently are only counted once.
+    Spans whose parent isn't in ``spans`` are roots.
+    """
+    by_id = {span["spanId"]: span for span in spans}
+    children: dict[str, list[dict[str, Any]]] = {}
+    roots = []
+    for span in spans:
+        if span["parentSpanId"] in by_id:
+            children.setdefault(span["parentSpanId"], []).append(span)
+        else:
+            roots.append(span)
+
+    root = FlameNode(name="all")
+    pending = [(root, span) for span in roots]
+    while pending:
+        parent, span = pending.pop()
+        node = parent.children.setdefault(span["name"], FlameNode(name=span["name"]))
+        duration = span["endTimeUnixNano"] - span["startTimeUnixNano"]
+        nested = children.get(span["spanId"], [])
+        covered = _covered(
+            [
+                (
+                    max(child["startTimeUnixNano"], span["startTimeUnixNano"]),
+                    min(child["endTimeUnixNano"], span["endTimeUnixNano"]),
+                )
+                for child in nested
+            ]
+        )
+        node.calls += 1
+        node.total_ms += duration / 1e6
+        node.self_ms += max(duration - covered, 0) / 1e6
+        pending += [(node, child) for child in nested]
+    root.total_ms = sum(node.total_ms for node in root.children.values())
+    return root
+
+
+class _ActiveTracing(SpanProcessor):
+    """Forwards spans to the processors of the active ``Tracing``.
+
+    Added to the tracer provider once: the SDK can't remove a processor,
+    so ``enable_tracing`` swaps the ``Tracing`` this forwards to instead.
+    """
+
+    def __init__(self):
+        self.tracing: Tracing | None = None
+
+    def _processors(self) -> list[SpanProcessor]:
+        return self.tracing.processors if self.tracing else []
+
+    def on_start(self, span, parent_context: context.Context | None = None) -> None:
+        for processor in self._processors():
+            processor.on_start(span, parent_context=parent_context)
+
+    def on_end(self, span: ReadableSpan) -> None:
+        for processor in self._processors():
+            processor.on_end(span)
+
+    def shutdown(self) -> None:
+        if self.tracing:
+            self.tracing.close()
+
+    def force_flush(self, timeout_millis: int = 30_000) -> bool:
+        return all(
+            processor.force_flush(timeout_millis) for processor in self._processors()
+        )
+
+
+_active = _ActiveTracing()
+_providers: list[TracerProvider] = []  # the ones ``_active`` was added to
+
+
+class Tracing:
+    """Handle returned by ``enable_tracing``."""
+
+    def __init__(self, buffer: SpanBuffer, processors: list[SpanProcessor]):
+        self.buffer = buffer
+        self.processors = processors
+
+    def flush(self) -> None:
+        """Exports every finished span, to the file and collector too."""
+        for processor in self.processors:
+            processor.force_flush()
+
+    def spans(self) -> list[dict[str, Any]]:
+        """Finished spans kept in memory, oldest first."""
+        return self.buffer.spans()
+
+    def clear(self) -> None:
+        """Forgets the spans kept in memory."""
+        self.buffer.clear()
+
+    def flame_graph(self, width: int = 30, min_ms: float = 0.0) -> str:
+        """Indented tree of span names with their calls and times.
+
+        Children are sorted by total time; the bar is the share of the
+        total time of all spans. Nodes below ``min_ms`` are left out.
+        """
+        root = flame_tree(self.spans())
+        header = f"{'span':<48}{'calls':>6}{'total ms':>11}{'self ms':>10}"
+        lines = [header]
+        pending = [(node, 0) for node in _by_total(root.children)]
+        while pending:
+            node, depth = pending.pop(0)
+            if node.total_ms < min_ms:
+                continue
+            share = node.total_ms / root.total_ms if root.total_ms else 0.0
+            label = f"{'  ' * depth}{node.name}"[:47]
+            lines.append(
+                f"{label:<48}{node.calls:>6}{node.total_ms:>11.1f}"
+                f"{node.self_ms:>10.1f}  {'█' * round(share * width)}"
+            )
+            pending[:0] = [(child, depth + 1) for child in _by_total(node.children)]
+        return "\n".join(lines)
+
+    def folded(self) -> str:
+        """Folded stacks (``a;b;c <self µs>``) for flamegraph tools."""
+        lines = []
+        pending = [((), node) for node in flame_tree(self.spans()).children.values()]
+        while pending:
+            stack, node = pending.pop()
+            stack = (*stack, node.name.replace(";", ":"))
+            if self_us := round(node.self_ms * 1000):
+                lines.append(f"{';'.join(stack)} {self_us}")
+            pending += [(stack, child) for child in node.children.values()]
+        return "\n".join(sorted(lines))
+
+    def close(self) -> None:
+        """Flushes and stops the exporters; spans are no longer recorded.
+
+        The tracer provider stays installed, for the next
+        ``enable_tracing``.
+        """
+        if _active.tracing is self:
+            _active.tracing = None
+        for processor in self.processors:
+            processor.shutdown()
+
+
+def _by_total(nodes: dict[str, FlameNode]) -> list[FlameNode]:
+    return sorted(nodes.values(), key=lambda node: -node.total_ms)
+
+
+def enable_tracing(
+    path: str | Path | None = None,
+    otlp_endpoint: str | None = None,
+    max_spans: int = 10_000,
+    capture_content: bool = False,
+) -> Tracing:
+    """Records ADK's spans, and the helpers', from now on.
+
+    Installs an SDK ``TracerProvider`` as the global one, or adds to it
+    if one is installed already. Replaces the tracing enabled by an
+    earlier call, which is closed (its spans flushed) first.
+
+    Args:
+        path: File finished spans are appended to, one JSON object per
+            line.
+        otlp_endpoint: Base URL of an OTLP/HTTP collector, e.g.
+            ``http://localhost:4318``; spans go to ``/v1/traces``.
+        max_spans: Finished spans kept in memory for ``flame_graph``.
+        capture_content: Whether ADK attaches prompts, responses and
+            tool arguments to its spans.
+    """
+    os.environ["ADK_CAPTURE_MESSAGE_CONTENT_IN_SPANS"] = str(capture_content).lower()
+    attributes_logger = logging.getLogger("opentelemetry.attributes")
+    if not any(isinstance(f, _PlaceholderFilter) for f in attributes_logger.filters):
+        attributes_logger.addFilter(_PlaceholderFilter())
+    provider = trace.get_tracer_provider()
+    if not isinstance(provider, TracerProvider):
+        provider = TracerProvider()
+        trace.set_tracer_provider(provider)
+
+    if _active.tracing:
+        _active.tracing.close()
+    if provider not in _providers:
+        provider.add_span_processor(_active)
+        _providers.append(provider)
+
+    buffer = SpanBuffer(max_spans)
+    processors: list[SpanProcessor] = [SimpleSpanProcessor(buffer)]
+    if path:
+        processors.append(BatchSpanProcessor(JsonLinesSpanExporter(path)))
+    if otlp_endpoint:
+        # Imported here: only needed, and only pulls in requests, when used
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+            OTLPSpanExporter,
+        )
+
+        exporter = OTLPSpanExporter(endpoint=f"{otlp_endpoint.rstrip('/')}/v1/traces")
+        processors.append(BatchSpanProcessor(exporter))
+    _active.tracing = Tracing(buffer, processors)
+    return _active.tracing
@@ -0,0 +1,328 @@
+"""Token, cost and latency accounting for whole agent trees.
+
+``run_debug`` prints what the agents said, not what it cost. The Gemini
+responses carry usage metadata though, and ``UsageTracker`` is a runner
+plugin that adds it up for every model call, whichever agent of the tree
+made it: sub-agents of sequential, parallel and loop agents, and agents
+called through an ``AgentTool`` (which run in a runner of their own and
+are counted towards the session and invocation that called them):
+
+    usage_tracker = UsageTracker(jsonl_path=".cache/day01_usage.jsonl")
+    runner = InMemoryRunner(agent=research_root_agent, plugins=[usage_tracker])
+    ...
+    print(usage_tracker.report())        # per agent, most expensive first
+    usage_tracker.write_prometheus(".cache/usage.prom")
+
+Totals are kept per agent (and model), per invocation and per session.
+Every model call, and the total of every finished invocation, is also
+appended to ``jsonl_path`` as one JSON object per line when it is set;
+``write_prometheus`` writes the per-agent counters in the Prometheus text
+format, for a node exporter's textfile collector or a quick ``grep``.
+
+Cost is estimated from ``prices``. Responses replayed by ``CachedLlm``
+count as cache hits and cost nothing. Requests ``HedgedLlm`` cancelled
+count as ``hedges_cancelled``, with the prompt of the call that won
+(their output, if any, is never seen).
+"""
+
+import json
+import os
+import time
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, fields
+from pathlib import Path
+from typing import Any
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.plugins.base_plugin import BasePlugin
+
+
+@dataclass(frozen=True)
+class Price:
+    """USD per million tokens."""
+
+    input: float
+    output: float
+    cached_input: float
+
+
+# List prices for prompts up to 200k tokens when this was written; pass
+# ``prices`` to use your own. Models are matched by the longest prefix.
+PRICES = {
+    "gemini-2.5-flash-lite": Price(input=0.10, output=0.40, cached_input=0.025),
+    "gemini-2.5-flash": Price(input=0.30, output=2.50, cached_input=0.075),
+    "gemini-2.5-pro": Price(input=1.25, output=10.00, cached_input=0.31),
+}
+
+
+@dataclass
+class Usage:
+    """Usage of one or more model calls."""
+
+    calls: int = 0
+    cache_hits: int = 0
+    hedges_cancelled: int = 0
+    input_tokens: int = 0
+    cached_tokens: int = 0
+    output_tokens: int = 0
+    cost_usd: float = 0.0
+    model_seconds: float = 0.0
+
+    def add(self, other: "Usage") -> None:
+        for field in fields(self):
+            setattr(
+                self, field.name, getattr(self, field.name) + getattr(other, field.name)
+            )
+
+
+# (session id, invocation id) of the outermost run in progress, so that an
+# AgentTool's nested run is counted towards the run that called it
+_root_run: ContextVar[tuple[str, str] | None] = ContextVar("_root_run", default=None)
+
+# Prometheus metric -> (Usage field, help text)
+_METRICS = {
+    "adk_model_calls_total": ("calls", "Model calls."),
+    "adk_model_cache_hits_total": ("cache_hits", "Model calls served from a cache."),
+    "adk_model_hedges_cancelled_total": (
+        "hedges_cancelled",
+        "Duplicate model requests cancelled by hedging.",
+    ),
+    "adk_input_tokens_total": ("input_tokens", "Prompt tokens, cached ones included."),
+    "adk_cached_tokens_total": (
+        "cached_tokens",
+        "Prompt tokens read from a context cache.",
+    ),
+    "adk_output_tokens_total": ("output_tokens", "Output tokens, thinking included."),
+    "adk_cost_usd_total": ("cost_usd", "Estimated cost in USD."),
+    "adk_model_seconds_total": ("model_seconds", "Seconds spent in model calls."),
+}
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class UsageTracker(BasePlugin):
+    """Runner plugin aggregating model usage per agent, invocation and session.
+
+    Args:
+        name: Plugin name, unique within a runner.
+        prices: Model name (prefix) -> ``Price``; defaults to ``PRICES``.
+        jsonl_path: File every model call and finished invocation is
+            appended to, one JSON object per line.
+    """
+
+    def __init__(
+        self,
+        name: str = "usage_tracker",
+        prices: dict[str, Price] | None = None,
+        jsonl_path: str | Path | None = None,
+    ):
+        super().__init__(name=name)
+        self.prices = PRICES if prices is None else prices
+        self.jsonl_path = Path(jsonl_path) if jsonl_path else None
+        self.by_agent: dict[tuple[str, str], Usage] = {}
+        self.by_invocation: dict[str, Usage] = {}
+        self.by_session: dict[str, Usage] = {}
+        self.agent_seconds: dict[str, float] = {}
+        self.agent_runs: dict[str, int] = {}
+        self._roots: dict[str, tuple[str, str]] = {}
+        self._outer: dict[str, tuple[str, str] | None] = {}
+        self._started: dict[tuple[str, ...], float] = {}
+
+    def price(self, model: str) -> Price | None:
+        """Price of ``model``, by the longest matching prefix."""
+        matches = [name for name in self.prices if model.startswith(name)]
+        return self.prices[max(matches, key=len)] if matches else None
+
+    def reset(self) -> None:
+        """Forgets every total."""
+        for totals in (
+            self.by_agent,
+            self.by_invocation,
+            self.by_session,
+            self.agent_seconds,
+            self.agent_runs,
+        ):
+            totals.clear()
+
+    def _write(self, record: dict[str, Any]) -> None:
+        if self.jsonl_path is None:
+            return
+        self.jsonl_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.jsonl_path.open("a") as file:
+            file.write(json.dumps(record) + "\n")
+
+    def _root(self, invocation_context: InvocationContext) -> tuple[str, str]:
+        invocation_id = invocation_context.invocation_id
+        return self._roots.get(
+            invocation_id, (invocation_context.session.id, invocation_id)
+        )
+
+    @staticmethod
+    def _key(callback_context: CallbackContext, *parts: str) -> tuple[str, ...]:
+        return (
+            callback_context.invocation_id,
+            callback_context._invocation_context.branch or "",
+            *parts,
+        )
+
+    async def before_run_callback(
+        self, *, invocation_context: InvocationContext
+    ) -> None:
+        outer = _root_run.get()
+        root = outer or (
+            invocation_context.session.id,
+            invocation_context.invocation_id,
+        )
+        self._roots[invocation_context.invocation_id] = root
+        self._outer[invocation_context.invocation_id] = outer
+        _root_run.set(root)
+
+    async def after_run_callback(
+        self, *, invocation_context: InvocationContext
+    ) -> None:
+        invocation_id = invocation_context.invocation_id
+        _root_run.set(self._outer.pop(invocation_id, None))
+        session_id, root_invocation_id = self._roots.pop(
+            invocation_id, (invocation_context.session.id, invocation_id)
+        )
+        if root_invocation_id == invocation_id:
+            self._write(
+                {
+                    "type": "invocation",
+                    "time": time.time(),
+                    "session_id": session_id,
+                    "invocation_id": invocation_id,
+                    **asdict(self.by_invocation.get(invocation_id, Usage())),
+                }
+            )
+
+    async def before_agent_callback(
+        self, *, agent: BaseAgent, callback_context: CallbackContext
+    ) -> None:
+        self._started[self._key(callback_context, "agent", agent.name)] = (
+            time.perf_counter()
+        )
+
+    async def after_agent_callback(
+        self, *, agent: BaseAgent, callback_context: CallbackContext
+    ) -> None:
+        start = self._started.pop(
+            self._key(callback_context, "agent", agent.name), None
+        )
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        self.agent_seconds[agent.name] = (
+            self.agent_seconds.get(agent.name, 0.0) + elapsed
+        )
+        self.agent_runs[agent.name] = self.agent_runs.get(agent.name, 0) + 1
+
+    async def before_model_callback(
+        self, *, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> None:
+        self._started[self._key(callback_context, "model")] = time.perf_counter()
+
+    async def after_model_callback(
+        self, *, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> None:
+        # Streamed chunks are followed by the whole response, counted once
+        if llm_response.partial:
+            return
+        start = self._started.pop(self._key(callback_context, "model"), None)
+        invocation_context = callback_context._invocation_context
+        model = invocation_context.agent.canonical_model.model
+        usage = Usage(
+            calls=1,
+            model_seconds=time.perf_counter() - start if start is not None else 0.0,
+        )
+        if (llm_response.custom_metadata or {}).get("cache_hit"):
+            usage.cache_hits = 1
+        elif metadata := llm_response.usage_metadata:
+            # Cancelled hedges sent the same prompt
+            usage.hedges_cancelled = (llm_response.custom_metadata or {}).get(
+                "hedges_cancelled", 0
+            )
+            requests = 1 + usage.hedges_cancelled
+            usage.input_tokens = requests * (
+                (metadata.prompt_token_count or 0)
+                + (metadata.tool_use_prompt_token_count or 0)
+            )
+            usage.cached_tokens = requests * (metadata.cached_content_token_count or 0)
+            usage.output_tokens = (metadata.candidates_token_count or 0) + (
+                metadata.thoughts_token_count or 0
+            )
+            if price := self.price(model):
+                usage.cost_usd = (
+                    (usage.input_tokens - usage.cached_tokens) * price.input
+                    + usage.cached_tokens * price.cached_input
+                    + usage.output_tokens * price.output
+                ) / 1e6
+
+        agent = callback_context.agent_name
+        session_id, invocation_id = self._root(invocation_context)
+        for totals, key in (
+            (self.by_agent, (agent, model)),
+            (self.by_invocation, invocation_id),
+            (self.by_session, session_id),
+        ):
+            totals.setdefault(key, Usage()).add(usage)
+        self._write(
+            {
+                "type": "model_call",
+                "time": time.time(),
+                "session_id": session_id,
+                "invocation_id": invocation_id,
+                "agent": agent,
+                "model": model,
+                **asdict(usage),
+            }
+        )
+
+    def prometheus(self) -> str:
+        """Per-agent counters in the Prometheus text exposition format."""
+        lines = []
+        for metric, (field, help_text) in _METRICS.items():
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+            for (agent, model), usage in sorted(self.by_agent.items()):
+                lines.append(
+                    f'{metric}{{agent="{_label(agent)}",model="{_label(model)}"}}'
+                    f" {getattr(usage, field)}"
+                )
+        for metric, totals, help_text in (
+            ("adk_agent_seconds_total", self.agent_seconds, "Seconds agents ran."),
+            ("adk_agent_runs_total", self.agent_runs, "Agent runs."),
+        ):
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+            for agent, value in sorted(totals.items()):
+                lines.append(f'{metric}{{agent="{_label(agent)}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str | Path) -> None:
+        """Writes ``prometheus()`` to ``path``, atomically."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(path.name + ".tmp")
+        partial.write_text(self.prometheus())
+        os.replace(partial, path)
+
+    def report(self) -> str:
+        """Table of per-agent usage, most expensive first."""
+        header = (
+            f"{'agent':<24}{'model':<24}{'calls':>6}{'input':>9}{'output':>9}"
+            f"{'cost $':>10}{'model s':>9}{'agent s':>9}"
+        )
+        lines = [header]
+        rows = sorted(self.by_agent.items(), key=lambda item: -item[1].cost_usd)
+        for (agent, model), usage in rows:
+            lines.append(
+                f"{agent:<24}{model:<24}{usage.calls:>6}{usage.input_tokens:>9}"
+                f"{usage.output_tokens:>9}{usage.cost_usd:>10.5f}"
+                f"{usage.model_seconds:>9.2f}{self.agent_seconds.get(agent, 0.0):>9.2f}"
+            )
+        return "\n".join(lines)